@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 18:04:12 2026
+
+@author: justice
+"""
+
+'''
+Aircraft model with a lightweight overlay for the horizontal tail mounting angle.
+
+Changing the all flying tail used to mean copy.deepcopy of the whole aircraft dictionary
+(every wing definition and the airfoils dictionary with its functions) and of the tail
+twist, just to add the elevator angle to the tail twist rows. The AircraftModel keeps the
+base aircraft dictionary as it was given and never changes it. overlay(elevator) returns
+a new dictionary that shares everything with the base dictionary except the path down to
+the one value that changes:
+
+    overlay          -> new top level dictionary
+      ["wings"]      -> new dictionary of wings (the other wings are the base ones)
+        [tail]       -> new (shallow) copy of the horizontal tail
+          ["twist"]  -> new twist rows with the elevator added
+
+So each overlay costs a few small dictionaries and one list of twist rows instead of a
+full copy. MachUpX only reads the aircraft dictionary it is given, so sharing the rest of
+the base dictionary between scenes is safe. The angle of attack is not part of the aircraft
+dictionary (it is applied through the aircraft state), so it needs no copy at all.
+'''
+
+class AircraftModel:
+    '''
+    Immutable base aircraft dictionary with an overlay for the tail mounting angle.
+
+    Parameters
+    ----------
+    aircraft_dict : dictionary
+        The base aircraft dictionary (not changed).
+    tail_name : string, optional
+        Name of the all flying tail in aircraft_dict["wings"]. The default is "horizontal_tail".
+    '''
+    def __init__(self, aircraft_dict, tail_name = "horizontal_tail"):
+        self.base = aircraft_dict
+        self.tail_name = tail_name
+        base_twist = aircraft_dict["wings"][tail_name].get("twist", 0.0)
+        if isinstance(base_twist, (int, float)):
+            self._base_twist = float(base_twist)
+        else:
+            self._base_twist = tuple((float(row[0]), float(row[1])) for row in base_twist)
+
+    def tail_twist(self, elevator):
+        '''
+        Returns the tail twist with the elevator added (a new list of [span location, twist]
+        rows, or a float if the base twist is a constant).
+
+        Parameters
+        ----------
+        elevator : float
+            Horizontal tail mounting angle (deg).
+        '''
+        if isinstance(self._base_twist, float):
+            return self._base_twist + elevator                                      # deg
+        return [[span, twist + elevator] for span, twist in self._base_twist]       # deg
+
+    def overlay(self, elevator):
+        '''
+        Returns an aircraft dictionary with the tail twist for the elevator. Everything except
+        the path down to the tail twist is shared with the base dictionary, so the returned
+        dictionary must only be read.
+
+        Parameters
+        ----------
+        elevator : float
+            Horizontal tail mounting angle (deg).
+        '''
+        tail = dict(self.base["wings"][self.tail_name])
+        tail["twist"] = self.tail_twist(elevator)
+        wings = dict(self.base["wings"])
+        wings[self.tail_name] = tail
+        aircraft_dict = dict(self.base)
+        aircraft_dict["wings"] = wings
+        return aircraft_dict
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:58:12 2026
+
+@author: justice
+"""
+
+from timeit import repeat
+import numpy as np
+from Ikhana_main_wing_functions import get_Ikhana_CL, get_Ikhana_CD, get_Ikhana_Cm
+from Ikhana_main_wing_functions_vectorized import get_Ikhana_CL_vectorized, get_Ikhana_CD_vectorized, get_Ikhana_Cm_vectorized
+from Ikhana_airfoil_tables import tabulate_functions, AirfoilTableFunction
+
+'''
+Microbenchmark of the functional airfoil callbacks. Three ways of getting CL, CD, and
+Cm for every section of the main wing are timed:
+    - scalar      : the original functions called once per section with floats
+    - array       : the original functions called once with arrays of all sections
+    - vectorized  : the vectorized functions called once with arrays of all sections
+The table callbacks (Ikhana_airfoil_tables.py, bilinear and cubic on the default grid) are
+timed the same way as the vectorized functions, along with their largest difference from
+the vectorized values.
+
+Run this file directly to print the timings, or call benchmark_airfoil_callbacks.
+'''
+
+def _section_inputs(num_sections, seed = 0):
+    # Random section angles of attack and flap deflections (radians) in the range seen during the optimization
+    rng = np.random.default_rng(seed)
+    alpha = rng.uniform(-0.1, 0.25, num_sections)
+    flap = rng.uniform(-0.1, 0.1, num_sections)
+    return alpha, flap
+
+def _scalar_pass(alpha, flap):
+    for a, c in zip(alpha.tolist(), flap.tolist()):
+        get_Ikhana_CL(alpha = a, trailing_flap_deflection = c)
+        get_Ikhana_CD(alpha = a, trailing_flap_deflection = c)
+        get_Ikhana_Cm(alpha = a, trailing_flap_deflection = c)
+
+def _array_pass(alpha, flap):
+    get_Ikhana_CL(alpha = alpha, trailing_flap_deflection = flap)
+    get_Ikhana_CD(alpha = alpha, trailing_flap_deflection = flap)
+    get_Ikhana_Cm(alpha = alpha, trailing_flap_deflection = flap)
+
+def _vectorized_pass(alpha, flap):
+    get_Ikhana_CL_vectorized(alpha = alpha, trailing_flap_deflection = flap)
+    get_Ikhana_CD_vectorized(alpha = alpha, trailing_flap_deflection = flap)
+    get_Ikhana_Cm_vectorized(alpha = alpha, trailing_flap_deflection = flap)
+
+def _table_callbacks(method):
+    table = tabulate_functions(get_Ikhana_CL_vectorized, get_Ikhana_CD_vectorized, get_Ikhana_Cm_vectorized)
+    return [AirfoilTableFunction(table, coefficient, method) for coefficient in ["CL", "CD", "Cm"]]
+
+def _callbacks_pass(callbacks, alpha, flap):
+    for callback in callbacks:
+        callback(alpha = alpha, trailing_flap_deflection = flap)
+
+def max_callback_difference(num_sections = 200):
+    '''
+    Returns the largest difference between the original and vectorized CL, CD, and Cm over
+    num_sections random sections.
+    '''
+    alpha, flap = _section_inputs(num_sections)
+    difference = 0.0
+    for original, vectorized in [(get_Ikhana_CL, get_Ikhana_CL_vectorized),
+                                 (get_Ikhana_CD, get_Ikhana_CD_vectorized),
+                                 (get_Ikhana_Cm, get_Ikhana_Cm_vectorized)]:
+        original_values = original(alpha = alpha, trailing_flap_deflection = flap)
+        vectorized_values = vectorized(alpha = alpha, trailing_flap_deflection = flap)
+        difference = max(difference, float(np.max(np.abs(original_values - vectorized_values))))
+    return difference
+
+def benchmark_airfoil_callbacks(num_sections = 200, number = 200, repeats = 5, print_results = True):
+    '''
+    Times one CL, CD, Cm evaluation of every section with each of the three methods.
+
+    Parameters
+    ----------
+    num_sections : int, optional
+        Number of sections (control points) per evaluation. The default is 200 (100 per side of the main wing).
+    number : int, optional
+        Number of evaluations per timing. The default is 200.
+    repeats : int, optional
+        Number of timings; the fastest is kept. The default is 5.
+    print_results : boolean, optional
+        Whether or not to print the results. The default is True.
+
+    Returns
+    -------
+    results : dictionary
+        Seconds per evaluation for 'scalar', 'array', and 'vectorized', the speedups of the
+        vectorized functions, the largest difference between the original and vectorized values, and the
+        same for the bilinear and cubic table callbacks ('table_bilinear', 'table_cubic').
+    '''
+    alpha, flap = _section_inputs(num_sections)
+    results = {"num_sections" : num_sections}
+    for name, function in [("scalar", _scalar_pass), ("array", _array_pass), ("vectorized", _vectorized_pass)]:
+        results[name] = min(repeat(lambda: function(alpha, flap), number = number, repeat = repeats))/number
+    results["speedup_vs_scalar"] = results["scalar"]/results["vectorized"]
+    results["speedup_vs_array"] = results["array"]/results["vectorized"]
+    results["max_difference"] = max_callback_difference(num_sections)
+
+    for method in ["bilinear", "cubic"]:
+        callbacks = _table_callbacks(method)
+        results["table_" + method] = min(repeat(lambda: _callbacks_pass(callbacks, alpha, flap), number = number, repeat = repeats))/number
+        results["table_" + method + "_max_difference"] = max(float(np.max(np.abs(callback(alpha = alpha, trailing_flap_deflection = flap) - vectorized(alpha = alpha, trailing_flap_deflection = flap))))
+                                                            for callback, vectorized in zip(callbacks, [get_Ikhana_CL_vectorized, get_Ikhana_CD_vectorized, get_Ikhana_Cm_vectorized]))
+
+    if print_results:
+        print("Airfoil callbacks, " + str(num_sections) + " sections (seconds per CL/CD/Cm evaluation)")
+        print("  scalar:     " + "{:.3e}".format(results["scalar"]))
+        print("  array:      " + "{:.3e}".format(results["array"]))
+        print("  vectorized: " + "{:.3e}".format(results["vectorized"]))
+        print("  speedup vs scalar: " + "{:.1f}".format(results["speedup_vs_scalar"]) + "x, vs array: " + "{:.1f}".format(results["speedup_vs_array"]) + "x")
+        print("  max difference: " + str(results["max_difference"]))
+        for method in ["bilinear", "cubic"]:
+            print("  table (" + method + "): " + "{:.3e}".format(results["table_" + method]) + ", max difference: " + str(results["table_" + method + "_max_difference"]))
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_airfoil_callbacks()
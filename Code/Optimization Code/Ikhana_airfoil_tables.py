@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 14:06:51 2026
+
+@author: justice
+"""
+
+import os
+import json
+import numpy as np
+from math import pi
+
+'''
+Table driven backend for the functional airfoils.
+
+create_Ikhana_airfoils_function_dict and create_CRM_airfoils_function_dict connect each
+airfoil to its own hand written CL, CD, and Cm functions (about 30 of them for the CRM).
+Here every airfoil is instead a table of CL, CD, and Cm precomputed on an (alpha, flap
+deflection) grid, and one generic callback (AirfoilTableFunction) interpolates the table
+for all of the sections MachUpX passes in at once.
+
+Table layout
+    coefficients   (3 x num_alpha x num_flap) float64 C contiguous array, [CL, CD, Cm]
+    alpha          angles of attack of the grid rows (radians, increasing)
+    flap           trailing flap deflections of the grid columns (radians, increasing)
+The grid does not have to be uniform. MachUpX passes alpha and trailing_flap_deflection in
+radians to the functional airfoils, which are the two table inputs; the other inputs
+(Reynolds number, Mach number, ...) are not used by any of the fits in this repo either.
+
+A database is a directory with two files per airfoil:
+    <name>.npy     the coefficients array (loaded memory mapped, so worker processes share
+                   the pages through the operating system instead of each reading a copy)
+    <name>.json    the grid, the geometry, and how the table was made
+Both are written to a temporary file and renamed, so a reader never sees a partial table.
+
+Interpolation ("cubic" or "bilinear") is vectorized over the sections: the grid cell of
+every section is found arithmetically on a uniform grid (one searchsorted per axis
+otherwise) and the cell values are gathered in one indexing operation. "cubic" (the
+default) is Catmull-Rom (cubic convolution) on the 4 x 4 stencil around the cell, with the
+stencil points past the edge of the grid extrapolated quadratically. The stencils are
+turned into one bicubic polynomial per cell when the table is first interpolated
+(cubic_patches), so each call is a gather of 16 coefficients per section and Horner's rule. It is exact for fits up to quadratic in flap deflection and
+alpha on a uniform grid (the Ikhana fits are). "bilinear" is piecewise linear: for the
+Ikhana drag polar on the default grid its CD is off by about 1% (5e-5) and its slope
+jumps at every grid line, which SLSQP's finite differences see, so it is only kept for
+coarse tabulated data. Outside of the grid both methods extrapolate linearly from the edge
+cell. table_error compares a table with the functions it was made from, and
+build_Ikhana_airfoil_tables refines the grid until it is within TABLE_TOLERANCE.
+
+The table callbacks are slower than the vectorized Ikhana functions, which are single
+polynomials (Ikhana_airfoil_benchmark.py times both), so they are not a way to speed up
+the Ikhana optimization. They are for airfoils that only exist as tabulated data or whose
+functions are expensive, so that every airfoil goes through the same callback.
+'''
+
+COEFFICIENTS = ["CL", "CD", "Cm"]
+DEG_TO_RAD = pi/180
+INTERPOLATION_METHODS = ["cubic", "bilinear"]
+
+# Largest difference allowed between a built table (cubic) and the functions it was made from
+TABLE_TOLERANCE = 1e-6
+
+# Default grid: alpha -20 to 20 deg every 0.5 deg, flap -30 to 30 deg every 1 deg
+DEFAULT_ALPHA_GRID = np.linspace(-20.0, 20.0, 81)*DEG_TO_RAD             # radians
+DEFAULT_FLAP_GRID = np.linspace(-30.0, 30.0, 61)*DEG_TO_RAD              # radians
+
+
+def _uniform_spacing(grid):
+    # Spacing of a uniform grid (None if the grid is not uniform)
+    spacing = np.diff(grid)
+    return float(spacing[0]) if np.allclose(spacing, spacing[0], rtol = 1e-9, atol = 0.0) else None
+
+
+def _locate(grid, values, spacing = None):
+    # Index of the grid cell of each value (edge cells outside of the grid) and the fraction across the cell
+    if spacing is not None:
+        # Uniform grid: the cell comes straight from the distance to the first grid value
+        position = (values - grid[0])*(1.0/spacing)
+        index = np.minimum(np.maximum(position.astype(np.intp), 0), len(grid) - 2)
+        return index, position - index
+    index = np.clip(np.searchsorted(grid, values, side = "right") - 1, 0, len(grid) - 2)
+    fraction = (values - grid[index])/(grid[index + 1] - grid[index])
+    return index, fraction
+
+
+# Catmull-Rom weights of the 4 points around a cell as polynomials in the fraction t across the cell:
+# weight a = sum over p of CATMULL_ROM_BASIS[a, p]*t**p
+CATMULL_ROM_BASIS = np.array([[0.0, -0.5,  1.0, -0.5],
+                              [1.0,  0.0, -2.5,  1.5],
+                              [0.0,  0.5,  2.0, -1.5],
+                              [0.0,  0.0, -0.5,  0.5]])
+
+
+def _quadratic_ghosts(values, axis):
+    # Adds a quadratically extrapolated ghost row (or column) on both ends of the axis
+    first = np.take(values, [0], axis = axis)
+    second = np.take(values, [1], axis = axis)
+    third = np.take(values, [2], axis = axis)
+    last = np.take(values, [-1], axis = axis)
+    second_last = np.take(values, [-2], axis = axis)
+    third_last = np.take(values, [-3], axis = axis)
+    return np.concatenate([3.0*first - 3.0*second + third, values, 3.0*last - 3.0*second_last + third_last], axis = axis)
+
+
+class AirfoilTable:
+    '''
+    CL, CD, and Cm of one airfoil on an (alpha, flap deflection) grid.
+
+    Parameters
+    ----------
+    alpha : array, [float]
+        Angles of attack of the grid (radians, increasing).
+    flap : array, [float]
+        Trailing flap deflections of the grid (radians, increasing).
+    coefficients : array, [[[float]]]
+        (3 x len(alpha) x len(flap)) array of CL, CD, and Cm.
+    filename : string, optional
+        The .npy file the coefficients were loaded from (the table is re-opened from it when
+        it is sent to a worker process instead of pickling the array). The default is None.
+    '''
+    def __init__(self, alpha, flap, coefficients, filename = None):
+        self.alpha = np.ascontiguousarray(alpha, dtype = np.float64)
+        self.flap = np.ascontiguousarray(flap, dtype = np.float64)
+        if coefficients.shape != (3, len(self.alpha), len(self.flap)):
+            raise ValueError("The coefficients must be a (3 x " + str(len(self.alpha)) + " x " + str(len(self.flap)) + ") array, not " + str(coefficients.shape))
+        if (len(self.alpha) < 2) or (len(self.flap) < 2) or np.any(np.diff(self.alpha) <= 0.0) or np.any(np.diff(self.flap) <= 0.0):
+            raise ValueError("The alpha and flap grids must each have at least 2 increasing values")
+        self.coefficients = coefficients if filename is not None else np.ascontiguousarray(coefficients, dtype = np.float64)
+        self.filename = filename
+        self._alpha_spacing = _uniform_spacing(self.alpha)
+        self._flap_spacing = _uniform_spacing(self.flap)
+        self._patches = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_patches"] = None        # Rebuilt by the worker the first time it interpolates
+        if self.filename is not None:
+            state["coefficients"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.coefficients is None:
+            self.coefficients = np.load(self.filename, mmap_mode = "r")
+
+    def cubic_patches(self):
+        '''
+        Returns the polynomial coefficients of the cubic interpolant on every grid cell, a
+        (3 x 4 x 4 x number of cells) array with value = sum over p, q of patches[k, p, q, cell]*t_alpha**p*t_flap**q
+        (cell = i*(len(flap) - 1) + j). Built once from the 4 x 4 Catmull-Rom stencil of each
+        cell, with the stencil points past the edge of the grid extrapolated quadratically.
+        '''
+        if self._patches is None:
+            if (len(self.alpha) < 3) or (len(self.flap) < 3):
+                raise ValueError("Cubic interpolation needs at least 3 alpha and 3 flap values in the grid")
+            padded = _quadratic_ghosts(_quadratic_ghosts(np.asarray(self.coefficients, dtype = np.float64), 1), 2)
+            stencils = np.lib.stride_tricks.sliding_window_view(padded, (4, 4), axis = (1, 2))    # 3 x cells in alpha x cells in flap x 4 x 4
+            patches = np.einsum("ap,kijab,bq->kpqij", CATMULL_ROM_BASIS, stencils, CATMULL_ROM_BASIS)
+            self._patches = np.ascontiguousarray(patches.reshape(3, 4, 4, -1))
+        return self._patches
+
+    def interpolate(self, alpha, flap, coefficients = (0, 1, 2), method = "cubic"):
+        '''
+        Interpolates the table.
+
+        Parameters
+        ----------
+        alpha : array, [float]
+            Angles of attack (radians), one per section.
+        flap : array, [float]
+            Trailing flap deflections (radians), same shape as alpha.
+        coefficients : tuple, (int), optional
+            Which coefficients to return (0 = CL, 1 = CD, 2 = Cm). The default is (0, 1, 2).
+        method : string, optional
+            'cubic' or 'bilinear'. The default is "cubic".
+
+        Returns
+        -------
+        values : array, [[float]]
+            (len(coefficients) x number of sections) array.
+        '''
+        if method not in INTERPOLATION_METHODS:
+            raise ValueError("Invalid interpolation method entered! Must be either 'cubic' (default) or 'bilinear'.")
+        alpha = np.asarray(alpha, dtype = np.float64).ravel()
+        flap = np.asarray(flap, dtype = np.float64).ravel()
+        i, t_alpha = _locate(self.alpha, alpha, self._alpha_spacing)
+        j, t_flap = _locate(self.flap, flap, self._flap_spacing)
+        values = np.empty((len(coefficients), len(alpha)))
+
+        if method == "bilinear":
+            for row, k in enumerate(coefficients):
+                values[row] = self._bilinear(k, i, j, t_alpha, t_flap)
+            return values
+
+        # Cubic: one gather of the cell polynomials and Horner's rule in t_flap and then t_alpha
+        patches = self.cubic_patches()
+        cell = i*(len(self.flap) - 1) + j
+        for row, k in enumerate(coefficients):
+            patch = patches[k].take(cell, axis = 2)                                     # 4 x 4 x N
+            in_flap = ((patch[:, 3]*t_flap + patch[:, 2])*t_flap + patch[:, 1])*t_flap + patch[:, 0]
+            values[row] = ((in_flap[3]*t_alpha + in_flap[2])*t_alpha + in_flap[1])*t_alpha + in_flap[0]
+
+        # Outside of the grid, extrapolate linearly from the edge cell instead of the cubic
+        if (len(alpha) > 0) and ((t_alpha.min() < 0.0) or (t_alpha.max() > 1.0) or (t_flap.min() < 0.0) or (t_flap.max() > 1.0)):
+            outside = (t_alpha < 0.0) | (t_alpha > 1.0) | (t_flap < 0.0) | (t_flap > 1.0)
+            for row, k in enumerate(coefficients):
+                values[row, outside] = self._bilinear(k, i[outside], j[outside], t_alpha[outside], t_flap[outside])
+        return values
+
+    def _bilinear(self, k, i, j, t_alpha, t_flap):
+        # Bilinear interpolation of coefficient k (linear extrapolation for fractions outside of [0, 1])
+        table = np.asarray(self.coefficients[k])
+        return ((1.0 - t_alpha)*((1.0 - t_flap)*table[i, j] + t_flap*table[i, j + 1])
+                + t_alpha*((1.0 - t_flap)*table[i + 1, j] + t_flap*table[i + 1, j + 1]))
+
+
+class AirfoilTableFunction:
+    '''
+    Generic functional airfoil callback for MachUpX: returns one coefficient of an
+    AirfoilTable at the alpha and trailing_flap_deflection MachUpX passes in (floats or
+    arrays with one value per section).
+
+    Parameters
+    ----------
+    table : AirfoilTable
+    coefficient : string
+        'CL', 'CD', or 'Cm'.
+    method : string, optional
+        'cubic' or 'bilinear'. The default is "cubic".
+    '''
+    def __init__(self, table, coefficient, method = "cubic"):
+        if method not in INTERPOLATION_METHODS:
+            raise ValueError("Invalid interpolation method entered! Must be either 'cubic' (default) or 'bilinear'.")
+        self.table = table
+        self.coefficient = coefficient
+        self.index = COEFFICIENTS.index(coefficient)
+        self.method = method
+        self.__name__ = "airfoil_table_" + coefficient
+
+    def __call__(self, **kws):
+        alpha = np.asarray(kws.get("alpha", 0.0), dtype = np.float64)                           # radians
+        flap = np.asarray(kws.get("trailing_flap_deflection", 0.0), dtype = np.float64)         # radians
+        alpha, flap = np.broadcast_arrays(alpha, flap)
+        values = self.table.interpolate(alpha, flap, (self.index,), self.method)[0]
+        if alpha.ndim == 0:
+            return float(values[0])
+        return values.reshape(alpha.shape)
+
+
+def tabulate_functions(CL_function, CD_function, Cm_function, alpha_grid = DEFAULT_ALPHA_GRID, flap_grid = DEFAULT_FLAP_GRID):
+    '''
+    Builds an AirfoilTable by evaluating functional airfoil functions (called as
+    function(alpha = ..., trailing_flap_deflection = ...) like MachUpX does) on the grid.
+    Functions that do not take arrays are called one grid point at a time.
+
+    Parameters
+    ----------
+    CL_function, CD_function, Cm_function : function
+        The functional airfoil functions.
+    alpha_grid : array, [float], optional
+        Angles of attack (radians). The default is DEFAULT_ALPHA_GRID (-20 to 20 deg every 0.5 deg).
+    flap_grid : array, [float], optional
+        Trailing flap deflections (radians). The default is DEFAULT_FLAP_GRID (-30 to 30 deg every 1 deg).
+
+    Returns
+    -------
+    table : AirfoilTable
+    '''
+    alpha, flap = np.meshgrid(np.asarray(alpha_grid, dtype = np.float64), np.asarray(flap_grid, dtype = np.float64), indexing = "ij")
+    coefficients = np.empty((3,) + alpha.shape)
+    for index, function in enumerate([CL_function, CD_function, Cm_function]):
+        try:
+            values = np.broadcast_to(np.asarray(function(alpha = alpha, trailing_flap_deflection = flap), dtype = np.float64), alpha.shape)
+        except (TypeError, ValueError):
+            values = np.vectorize(lambda a, c: function(alpha = a, trailing_flap_deflection = c), otypes = [np.float64])(alpha, flap)
+        coefficients[index] = values
+    return AirfoilTable(alpha_grid, flap_grid, coefficients)
+
+
+def table_error(table, CL_function, CD_function, Cm_function, method = "cubic"):
+    '''
+    Returns the largest difference between the interpolated table and the functions it was made
+    from for each of CL, CD, and Cm, checked at the grid points and halfway between them (the
+    centers of the cells and of their edges, where the interpolation error is largest).
+
+    Returns
+    -------
+    errors : dictionary
+        {'CL': float, 'CD': float, 'Cm': float}
+    '''
+    alpha_points = np.sort(np.concatenate([table.alpha, (table.alpha[:-1] + table.alpha[1:])/2.0]))
+    flap_points = np.sort(np.concatenate([table.flap, (table.flap[:-1] + table.flap[1:])/2.0]))
+    alpha, flap = np.meshgrid(alpha_points, flap_points, indexing = "ij")
+    exact = tabulate_functions(CL_function, CD_function, Cm_function, alpha_points, flap_points).coefficients
+    values = table.interpolate(alpha, flap, method = method).reshape(exact.shape)
+    return {coefficient : float(np.max(np.abs(values[index] - exact[index]))) for index, coefficient in enumerate(COEFFICIENTS)}
+
+
+def table_from_samples(alpha_grid, flap_grid, CL, CD, Cm):
+    '''
+    Builds an AirfoilTable from tabulated data (for example xfoil polars), each of CL, CD,
+    and Cm a (len(alpha_grid) x len(flap_grid)) array.
+    '''
+    return AirfoilTable(alpha_grid, flap_grid, np.stack([np.asarray(CL, dtype = np.float64), np.asarray(CD, dtype = np.float64), np.asarray(Cm, dtype = np.float64)]))
+
+
+class AirfoilTableDatabase:
+    '''
+    Directory of airfoil tables.
+
+    Parameters
+    ----------
+    directory : string
+        Directory of the database.
+    method : string, optional
+        Interpolation used by the callbacks, 'cubic' or 'bilinear'. The default is "cubic".
+    create : boolean, optional
+        Whether or not to create a new (empty) database if the directory does not exist. Otherwise the
+        directory has to exist and hold at least one table, so a mistyped path is an error instead of
+        an empty database. The default is False.
+    '''
+    def __init__(self, directory, method = "cubic", create = False):
+        if method not in INTERPOLATION_METHODS:
+            raise ValueError("Invalid interpolation method entered! Must be either 'cubic' (default) or 'bilinear'.")
+        self.directory = os.path.abspath(directory)
+        self.method = method
+        self._tables = {}
+        if create:
+            os.makedirs(self.directory, exist_ok = True)
+        elif not os.path.isdir(self.directory):
+            raise FileNotFoundError("No airfoil table database at " + self.directory)
+        elif not self.names():
+            raise ValueError("The airfoil table database at " + self.directory + " has no tables")
+
+    def _filenames(self, name):
+        return os.path.join(self.directory, name + ".npy"), os.path.join(self.directory, name + ".json")
+
+    def names(self):
+        '''Returns the names of the airfoils in the database.'''
+        return sorted(name[:-len(".npy")] for name in os.listdir(self.directory) if name.endswith(".npy") and not name.startswith("."))
+
+    def save(self, name, table, geometry = None, source = None):
+        '''
+        Writes a table to the database (replacing any table with the same name).
+
+        Parameters
+        ----------
+        name : string
+            Airfoil name (as used in the aircraft json).
+        table : AirfoilTable
+        geometry : dictionary, optional
+            The MachUpX "geometry" of the airfoil. The default is None.
+        source : string, optional
+            Where the table came from (kept in the json). The default is None.
+        '''
+        coefficients_filename, grid_filename = self._filenames(name)
+        temporary_coefficients = os.path.join(self.directory, "." + name + "." + str(os.getpid()) + ".npy.tmp")
+        with open(temporary_coefficients, 'wb') as coefficients_file:
+            np.save(coefficients_file, np.ascontiguousarray(table.coefficients, dtype = np.float64))
+        temporary_grid = os.path.join(self.directory, "." + name + "." + str(os.getpid()) + ".json.tmp")
+        with open(temporary_grid, 'w') as grid_file:
+            json.dump({"alpha" : table.alpha.tolist(), "flap" : table.flap.tolist(), "coefficients" : COEFFICIENTS,
+                       "geometry" : geometry, "source" : source}, grid_file, indent = 4)
+        os.replace(temporary_coefficients, coefficients_filename)
+        os.replace(temporary_grid, grid_filename)
+        self._tables.pop(name, None)
+
+    def load(self, name):
+        '''Returns the AirfoilTable for an airfoil (the coefficients memory mapped from the .npy file).'''
+        if name not in self._tables:
+            coefficients_filename, grid_filename = self._filenames(name)
+            with open(grid_filename) as grid_file:
+                grid = json.load(grid_file)
+            table = AirfoilTable(grid["alpha"], grid["flap"], np.load(coefficients_filename, mmap_mode = "r"), coefficients_filename)
+            self._tables[name] = (table, grid.get("geometry"))
+        return self._tables[name][0]
+
+    def geometry(self, name):
+        '''Returns the MachUpX "geometry" saved with an airfoil (None if there is none).'''
+        self.load(name)
+        return self._tables[name][1]
+
+    def airfoil(self, name, geometry = None):
+        '''
+        Returns the MachUpX functional airfoil dictionary for an airfoil in the database.
+
+        Parameters
+        ----------
+        name : string
+        geometry : dictionary, optional
+            MachUpX "geometry" to use instead of the one saved with the table. The default is None.
+        '''
+        table = self.load(name)
+        airfoil = {"type" : "functional"}
+        for coefficient in COEFFICIENTS:
+            airfoil[coefficient] = AirfoilTableFunction(table, coefficient, self.method)
+        geometry = geometry if geometry is not None else self.geometry(name)
+        if geometry is not None:
+            airfoil["geometry"] = geometry
+        return airfoil
+
+
+def build_Ikhana_airfoil_tables(directory, alpha_grid = DEFAULT_ALPHA_GRID, flap_grid = DEFAULT_FLAP_GRID, tolerance = TABLE_TOLERANCE, max_refinements = 3):
+    '''
+    Tabulates the Ikhana main wing airfoil (the vectorized functions of
+    Ikhana_main_wing_functions_vectorized.py) into a database. The grid spacing is halved
+    until the cubic table is within tolerance of the functions (table_error).
+
+    Parameters
+    ----------
+    directory : string
+        Directory of the database (created if it does not exist).
+    alpha_grid, flap_grid : array, [float], optional
+        Starting grids (radians). The defaults are DEFAULT_ALPHA_GRID and DEFAULT_FLAP_GRID.
+    tolerance : float, optional
+        Largest difference allowed from the functions. The default is TABLE_TOLERANCE (1e-6).
+    max_refinements : int, optional
+        Largest number of times the grid spacing is halved. The default is 3.
+
+    Returns
+    -------
+    database : AirfoilTableDatabase
+    '''
+    from Ikhana_main_wing_functions_vectorized import get_Ikhana_CL_vectorized, get_Ikhana_CD_vectorized, get_Ikhana_Cm_vectorized
+    functions = (get_Ikhana_CL_vectorized, get_Ikhana_CD_vectorized, get_Ikhana_Cm_vectorized)
+    alpha_grid = np.asarray(alpha_grid, dtype = np.float64)
+    flap_grid = np.asarray(flap_grid, dtype = np.float64)
+    for refinement in range(max_refinements + 1):
+        table = tabulate_functions(*functions, alpha_grid, flap_grid)
+        errors = table_error(table, *functions)
+        if max(errors.values()) <= tolerance:
+            break
+        if refinement == max_refinements:
+            raise ValueError("The Ikhana airfoil table is not within " + str(tolerance) + " of the functions after "
+                             + str(max_refinements) + " grid refinements: " + str(errors))
+        alpha_grid = np.linspace(alpha_grid[0], alpha_grid[-1], 2*len(alpha_grid) - 1)
+        flap_grid = np.linspace(flap_grid[0], flap_grid[-1], 2*len(flap_grid) - 1)
+
+    database = AirfoilTableDatabase(directory, create = True)
+    database.save("Ikhana_NACA_0010_main", table, geometry = {"outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr0_xfoil.txt"},
+                  source = "Ikhana_main_wing_functions_vectorized")
+    return database
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 15:12:09 2026
+
+@author: justice
+"""
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from Ikhana_evaluation_engine import EvaluationEngine
+from Ikhana_profiler import Profiler
+
+'''
+Batch evaluation: solve many x arrays in one call.
+
+twist_cost_function evaluates one x array at a time, and the forward difference
+gradients, the multi-point problem, and the surrogate sampling each had their own loop or
+pool around EvaluationEngine.evaluate. The BatchEvaluator takes an (N x num_flaps+2) array
+of x arrays and returns the (N x 3) array of CD, CL, and Cm (CD not scaled):
+
+    "process"   a pool of worker processes, each building its own EvaluationEngine once
+                (the scene and geometry are set up once per worker, not per x array)
+    "serial"    one EvaluationEngine in this process (or the engine given)
+
+The engines are built from engine_kwargs (see engine_kwargs in Ikhana_evaluation_engine.py),
+the EvaluationEngine keyword arguments by name. There is no thread pool: the MachUpX solve
+is mostly Python, so threads would only add overhead unless it was measured to release the GIL.
+
+The batch is split into one contiguous chunk per call to a worker (chunk_size x arrays),
+so there is one round trip per chunk instead of per x array. In twist mode a scene is
+rebuilt whenever the elevator changes, so the batch is sorted by elevator before it is
+split (each chunk has as few different elevators as possible) and the results are put
+back in the original order.
+
+Each worker engine has its own Profiler. Its stage counters are sent back with every
+chunk and merged into the profiler given to the BatchEvaluator, so the solves done on the
+workers show up in the parent's profile.
+'''
+
+# The engine for each worker process (set by _initialize_worker)
+_worker_engine = None
+
+
+def _initialize_worker(engine_kwargs):
+    # Build the worker's evaluation engine once when the worker process starts
+    global _worker_engine
+    _worker_engine = EvaluationEngine(profiler = Profiler(), **engine_kwargs)
+
+
+def _evaluate_chunk_on_worker(X):
+    # Solve a chunk of x arrays on the worker's engine and return the (len(X) x 3) values and the profile of the chunk
+    values = np.array([_worker_engine.evaluate(x) for x in X], dtype = np.float64).reshape(len(X), 3)
+    profile_stats = _worker_engine.profiler.stats()
+    _worker_engine.profiler.reset()
+    return values, profile_stats
+
+
+class BatchEvaluator:
+    '''
+    Solves batches of x arrays.
+
+    Parameters
+    ----------
+    engine_kwargs : dictionary, optional
+        Keyword arguments for EvaluationEngine (from engine_kwargs in Ikhana_evaluation_engine.py).
+        Needed for 'process', and for 'serial' if no engine is given.
+    mode : string, optional
+        'process' or 'serial'. The default is "process".
+    max_workers : int, optional
+        Number of worker processes. The default is None (number of CPUs).
+    chunk_size : int, optional
+        Number of x arrays sent to a worker at a time. The default is None (the batch split evenly,
+        four chunks per worker).
+    engine : EvaluationEngine, optional
+        Engine to use in 'serial' mode (for example the optimization's own engine). The default is None.
+    profiler : Profiler, optional
+        Profiler the workers' stage counters are merged into ('process' mode, the engine's own profiler
+        records the 'serial' solves). The default is None.
+    '''
+    def __init__(self, engine_kwargs = None, mode = "process", max_workers = None, chunk_size = None, engine = None, profiler = None):
+        if (mode != "process") and (mode != "serial"):
+            raise ValueError("Invalid mode entered! Must be either 'process' (default) or 'serial'.")
+        if (engine_kwargs is None) and not ((mode == "serial") and (engine is not None)):
+            raise ValueError("engine_kwargs are needed unless an engine is given in 'serial' mode")
+        self.engine_kwargs = engine_kwargs
+        self.mode = mode
+        self.chunk_size = chunk_size
+        self.batches = 0
+        self.solves = 0
+        self._engine = engine
+        self._executor = None
+        self.profiler = profiler
+
+        if mode == "process":
+            self.max_workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+            self._executor = ProcessPoolExecutor(max_workers = self.max_workers, initializer = _initialize_worker, initargs = (engine_kwargs,))
+        else:
+            self.max_workers = 1
+            if self._engine is None:
+                self._engine = EvaluationEngine(**engine_kwargs)
+
+        # Where the elevator is in the x array, and whether a change of elevator rebuilds the scene
+        if self._engine is not None:
+            self.elevator_index = self._engine.elevator_index
+            self.twist_mode = self._engine.elevator_mode == "twist"
+        else:
+            self.elevator_index = engine_kwargs["num_flaps"]    # Same as EvaluationEngine.elevator_index
+            self.twist_mode = engine_kwargs.get("elevator_mode", "twist") == "twist"
+
+    def _chunks(self, num_x):
+        # Start and end indices of the chunks
+        chunk_size = self.chunk_size if self.chunk_size is not None else max(1, -(-num_x // (4*self.max_workers)))
+        return [(start, min(start + chunk_size, num_x)) for start in range(0, num_x, chunk_size)]
+
+    def evaluate(self, X):
+        '''
+        Solves every x array in X.
+
+        Parameters
+        ----------
+        X : array, [[float]]
+            (N x num_flaps+2) array of x arrays (a single x array is treated as N = 1).
+
+        Returns
+        -------
+        values : array, [[float]]
+            (N x 3) array of CD (not scaled), CL, and Cm.
+        '''
+        X = np.atleast_2d(np.asarray(X, dtype = np.float64))
+        num_x = len(X)
+        values = np.zeros((num_x, 3))
+        if num_x == 0:
+            return values
+
+        if self.mode == "serial":
+            for index, x in enumerate(X):
+                values[index,:] = self._engine.evaluate(x)
+        else:
+            # Group equal elevators together so the workers rebuild their scenes as little as possible
+            order = np.argsort(X[:,self.elevator_index], kind = "stable") if self.twist_mode else np.arange(num_x)
+            X_sorted = X[order]
+            chunks = self._chunks(num_x)
+            futures = [self._executor.submit(_evaluate_chunk_on_worker, X_sorted[start:end]) for start, end in chunks]
+            for (start, end), future in zip(chunks, futures):
+                values[order[start:end],:], profile_stats = future.result()
+                if self.profiler is not None:
+                    self.profiler.merge(profile_stats)
+
+        self.batches += 1
+        self.solves += num_x
+        return values
+
+    def map(self, x_arrays):
+        '''Solves a list of x arrays and returns a list of (CD, CL, Cm) tuples.'''
+        return [tuple(row) for row in self.evaluate(np.array(x_arrays, dtype = np.float64).reshape(len(x_arrays), -1))] if len(x_arrays) > 0 else []
+
+    def close(self):
+        '''Shuts down the worker pool.'''
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def stats(self):
+        return {"mode" : self.mode, "max_workers" : self.max_workers, "batches" : self.batches, "solves" : self.solves}
+
+    def __str__(self):
+        return ("Batch evaluator (" + self.mode + ", " + str(self.max_workers) + " workers): " + str(self.batches) + " batches, "
+                + str(self.solves) + " solves")
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 08:41:26 2026
+
+@author: justice
+"""
+
+import os
+import sys
+import json
+import platform
+import tempfile
+import numpy as np
+from time import perf_counter
+from timing import secondsToStr
+from Ikhana_airfoil_benchmark import benchmark_airfoil_callbacks
+from Ikhana_evaluation_engine import create_evaluation_engine
+from Ikhana_camber_optimization_conditional_functional import pitch_trim_flap_optimize_functional
+from Ikhana_continuation import continuation_CL_sweep
+from Ikhana_parallel_sweep import parallel_CL_sweep
+from Ikhana_profiler import Profiler
+from Ikhana_high_resolution import identification_solves
+from Ikhana_import_budget import measure_import
+
+'''
+Benchmark suite for the optimization. Every performance change should be checked against
+a stored baseline with this before it is accepted.
+
+Benchmarks (run for each aircraft case in AIRCRAFT_CASES):
+    cost_function        one twist_cost_function evaluation (one MachUpX solve on the
+                         evaluation engine, a new x array each time so nothing is cached)
+    single_point_N       one full pitch_trim_flap_optimize_functional at CL 0.6 with N flaps
+                         (N in SINGLE_POINT_FLAPS)
+    sweep_continuation   the 9 point (CL 0.1 - 0.9) 2 flap continuation sweep
+    sweep_parallel       the 9 point 0 flap parallel sweep
+And once per run:
+    airfoil_callbacks    the airfoil callback microbenchmark (Ikhana_airfoil_benchmark.py)
+    import_optimizer     importing pitch_trim_flap_optimize_functional in a fresh interpreter
+                         (paid again by every worker process, see Ikhana_import_budget.py)
+
+benchmark_flap_scaling is run separately (it is long). It runs the single point
+optimization for an increasing number of flaps with SLSQP's finite differences, the
+lifting-line sensitivities, and the banded sensitivities (with the banded Hessian), and records the time and number of
+MachUpX solves for each so the growth with num_flaps can be compared.
+
+Each benchmark stores its best time (seconds) along with the results it produced (CD,
+function evaluations, ...). run_benchmarks returns the results dictionary, which is saved
+as a json baseline with save_results. compare_results checks new results against a
+baseline and flags any benchmark that got slower than the baseline by more than
+time_tolerance (fraction), or whose CD changed by more than CD_tolerance.
+
+The optimizations write their F_M_* and distributions_* files into a temporary directory
+that is removed afterward.
+'''
+
+INPUT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Input Jsons")
+
+# Case name: (scene json, aircraft json, aircraft name)
+AIRCRAFT_CASES = {"Ikhana" : ("Ikhana_scene_input.json", "Ikhana.json", "Ikhana"),
+                  "Ikhana_rectangular" : ("Ikhana_rectangular_scene_input.json", "Ikhana_rectangular.json", "Ikhana")}
+
+SINGLE_POINT_CL = 0.6
+SINGLE_POINT_FLAPS = [0, 2, 4, 8]
+SWEEP_CL_LIST = [lift_coeff/10 for lift_coeff in range(1,10)]
+SWEEP_FLAPS = 2
+SCALING_FLAPS = [2, 4, 8, 16, 24, 32, 48]
+SCALING_METHODS = ["finite_difference", "central_difference", "banded"]
+UP_DEFL_BOUND = 25.0
+LOW_DEFL_BOUND = -25.0
+
+DEFAULT_TIME_TOLERANCE = 0.10
+DEFAULT_CD_TOLERANCE = 1e-6
+
+
+def _case_filenames(case, input_directory):
+    scene_json, aircraft_json, aircraft_name = AIRCRAFT_CASES[case]
+    return os.path.abspath(os.path.join(input_directory, scene_json)), os.path.abspath(os.path.join(input_directory, aircraft_json)), aircraft_name
+
+
+def _best_time(function, repeats):
+    # Runs function repeats times and returns the fastest time (s), all of the times, and the last return value
+    times = []
+    value = None
+    for i in range(repeats):
+        start = perf_counter()
+        value = function()
+        times.append(perf_counter() - start)
+    return min(times), times, value
+
+
+def benchmark_cost_function(scene_filename, aircraft_json, aircraft_name, num_flaps = 2, number = 20):
+    '''
+    Times single evaluations on the evaluation engine (what one twist_cost_function call costs
+    when the evaluation cache misses). Each evaluation uses a slightly different x array.
+    '''
+    start = perf_counter()
+    engine = create_evaluation_engine(scene_filename, aircraft_json, aircraft_name, num_flaps)
+    engine.evaluate(np.zeros(num_flaps + 2))
+    setup_time = perf_counter() - start
+
+    times = []
+    x = np.zeros(num_flaps + 2)
+    for i in range(number):
+        x[num_flaps + 1] = 1.0 + 1e-3*i    # Step the angle of attack only, so the scene is not rebuilt
+        start = perf_counter()
+        engine.evaluate(x)
+        times.append(perf_counter() - start)
+    return {"time" : min(times), "times" : times, "setup_time" : setup_time, "num_flaps" : num_flaps}
+
+
+def benchmark_single_point(scene_filename, aircraft_json, aircraft_name, num_flaps, CL = SINGLE_POINT_CL, repeats = 1, **optimize_kwargs):
+    '''
+    Times one full pitch_trim_flap_optimize_functional call.
+    '''
+    optimize_kwargs.setdefault("write_results", False)
+    best, times, result = _best_time(lambda: pitch_trim_flap_optimize_functional(scene_filename, aircraft_json, aircraft_name, num_flaps, CL, UP_DEFL_BOUND, LOW_DEFL_BOUND, **optimize_kwargs), repeats)
+    dist_filename, CD, act_CL, act_Cm, aoa, elevator, deflections, solution_array = result
+    return {"time" : best, "times" : times, "CD" : float(CD), "CL" : float(act_CL), "Cm" : float(act_Cm), "x" : np.asarray(solution_array).tolist()}
+
+
+def benchmark_continuation_sweep(scene_filename, aircraft_json, aircraft_name, num_flaps = SWEEP_FLAPS, CL_list = SWEEP_CL_LIST, **optimize_kwargs):
+    '''
+    Times the up/down continuation sweep.
+    '''
+    optimize_kwargs.setdefault("write_results", False)
+    start = perf_counter()
+    results, solutions, all_deflections, results_up, solutions_up, deflections_up = continuation_CL_sweep(scene_filename, aircraft_json, aircraft_name, num_flaps, CL_list, UP_DEFL_BOUND, LOW_DEFL_BOUND, print_results = False, **optimize_kwargs)
+    return {"time" : perf_counter() - start, "CD" : results["CD"].tolist(), "skipped" : int(np.sum(results["skipped"]))}
+
+
+def benchmark_parallel_sweep(scene_filename, aircraft_json, aircraft_name, num_flaps = 0, CL_list = SWEEP_CL_LIST, max_workers = None, **optimize_kwargs):
+    '''
+    Times the parallel sweep (outputs go to a temporary directory) and counts the solves over every worker.
+    '''
+    optimize_kwargs.setdefault("write_results", False)
+    profiler = Profiler()
+    with tempfile.TemporaryDirectory() as output_directory:
+        start = perf_counter()
+        results, all_deflections, solution_arrays = parallel_CL_sweep(scene_filename, aircraft_json, aircraft_name, num_flaps, CL_list, UP_DEFL_BOUND, LOW_DEFL_BOUND, max_workers = max_workers, output_directory = output_directory, profiler = profiler, **optimize_kwargs)
+        elapsed = perf_counter() - start
+    solves = profiler.stats()["stages"].get("solve_forces", {"calls" : 0})["calls"]
+    return {"time" : elapsed, "CD" : results[:,1].tolist(), "max_workers" : max_workers, "solves" : solves}
+
+
+def benchmark_flap_scaling(scene_filename, aircraft_json, aircraft_name, num_flaps_list = SCALING_FLAPS, methods = SCALING_METHODS, bandwidth = 2, CL = SINGLE_POINT_CL, print_results = True, **optimize_kwargs):
+    '''
+    Times a single point optimization for each number of flaps and gradient method.
+
+    Parameters
+    ----------
+    num_flaps_list : list, [int], optional
+        Numbers of flaps to run. The default is SCALING_FLAPS.
+    methods : list, [string], optional
+        Any of 'finite_difference' (SLSQP's own), 'central_difference' (lifting-line sensitivities), and 'banded'. The default is SCALING_METHODS.
+    bandwidth : int, optional
+        Bandwidth for the 'banded' method. The default is 2.
+
+    Returns
+    -------
+    results : dictionary
+        {method: {num_flaps: {'time', 'solves', 'identification_solves', 'CD'}}}
+    '''
+    optimize_kwargs.setdefault("write_results", False)
+    method_kwargs = {"finite_difference" : {},
+                     "central_difference" : {"central_difference_gradients" : True},
+                     "banded" : {"central_difference_gradients" : True, "sensitivity_bandwidth" : bandwidth}}
+    results = {}
+    for method in methods:
+        results[method] = {}
+        for num_flaps in num_flaps_list:
+            profiler = Profiler()
+            kwargs = dict(optimize_kwargs)
+            kwargs.update(method_kwargs[method])
+            start = perf_counter()
+            dist_filename, CD, act_CL, act_Cm, aoa, elevator, deflections, solution_array = pitch_trim_flap_optimize_functional(scene_filename, aircraft_json, aircraft_name, num_flaps, CL, UP_DEFL_BOUND, LOW_DEFL_BOUND, profiler = profiler, **kwargs)
+            elapsed = perf_counter() - start
+            solves = profiler.stats()["stages"].get("solve_forces", {"calls" : 0})["calls"]
+            per_identification = None
+            if method != "finite_difference":
+                per_identification = identification_solves(num_flaps, bandwidth if method == "banded" else None)
+            results[method][num_flaps] = {"time" : elapsed, "solves" : solves, "identification_solves" : per_identification, "CD" : float(CD)}
+            if print_results:
+                print(method.ljust(20) + str(num_flaps).rjust(4) + " flaps" + "{:12.2f}".format(elapsed) + " s" + str(solves).rjust(8) + " solves   CD = " + str(CD))
+    return results
+
+
+def environment_info():
+    '''Returns the machine and package versions the benchmarks were run with.'''
+    info = {"date" : secondsToStr(),
+            "python" : sys.version.split()[0],
+            "platform" : platform.platform(),
+            "processor" : platform.processor(),
+            "cpu_count" : os.cpu_count(),
+            "numpy" : np.__version__}
+    for package in ["scipy", "machupX"]:
+        try:
+            info[package] = __import__(package).__version__
+        except (ImportError, AttributeError):
+            info[package] = None
+    return info
+
+
+def run_benchmarks(cases = None, input_directory = INPUT_DIRECTORY, include_sweeps = True, single_point_flaps = SINGLE_POINT_FLAPS, repeats = 1, print_results = True):
+    '''
+    Runs the benchmark suite.
+
+    Parameters
+    ----------
+    cases : list, [string], optional
+        Aircraft cases (keys of AIRCRAFT_CASES) to run. The default is None (all of them).
+    input_directory : string, optional
+        Directory of the input jsons. The default is INPUT_DIRECTORY (the repository's Input Jsons directory).
+    include_sweeps : boolean, optional
+        Whether or not to run the 9 point sweeps (by far the longest benchmarks). The default is True.
+    single_point_flaps : list, [int], optional
+        Numbers of flaps for the single point benchmarks. The default is SINGLE_POINT_FLAPS.
+    repeats : int, optional
+        Number of times each single point optimization is run; the fastest is kept. The default is 1.
+    print_results : boolean, optional
+        Whether or not to print each result as it finishes. The default is True.
+
+    Returns
+    -------
+    results : dictionary
+        {'environment': environment_info(), 'benchmarks': {name: {'time': s, ...}}}
+    '''
+    cases = list(AIRCRAFT_CASES) if cases is None else cases
+    benchmarks = {}
+
+    def finished(name, result):
+        benchmarks[name] = result
+        if print_results:
+            print(name.ljust(48) + "{:12.4f}".format(result["time"]) + " s")
+
+    airfoil_results = benchmark_airfoil_callbacks(print_results = False)
+    airfoil_results["time"] = airfoil_results["vectorized"]
+    finished("airfoil_callbacks", airfoil_results)
+    import_results = measure_import("Ikhana_camber_optimization_conditional_functional")
+    if "error" in import_results:
+        raise ImportError("Importing the optimizer failed: " + import_results["error"])
+    finished("import_optimizer", import_results)
+
+    start_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_directory:
+        os.chdir(work_directory)
+        try:
+            for case in cases:
+                scene_filename, aircraft_json, aircraft_name = _case_filenames(case, input_directory)
+                finished(case + "/cost_function", benchmark_cost_function(scene_filename, aircraft_json, aircraft_name))
+                for num_flaps in single_point_flaps:
+                    finished(case + "/single_point_" + str(num_flaps), benchmark_single_point(scene_filename, aircraft_json, aircraft_name, num_flaps, repeats = repeats))
+                if include_sweeps:
+                    finished(case + "/sweep_continuation", benchmark_continuation_sweep(scene_filename, aircraft_json, aircraft_name))
+                    finished(case + "/sweep_parallel", benchmark_parallel_sweep(scene_filename, aircraft_json, aircraft_name))
+        finally:
+            os.chdir(start_directory)
+
+    return {"environment" : environment_info(), "benchmarks" : benchmarks}
+
+
+def save_results(results, filename):
+    '''Saves benchmark results as a json baseline.'''
+    with open(filename, 'w') as output:
+        json.dump(results, output, indent = 4)
+
+
+def load_results(filename):
+    '''Loads a json baseline.'''
+    with open(filename) as baseline_file:
+        return json.load(baseline_file)
+
+
+def compare_results(results, baseline, time_tolerance = DEFAULT_TIME_TOLERANCE, CD_tolerance = DEFAULT_CD_TOLERANCE, print_results = True):
+    '''
+    Compares benchmark results with a baseline.
+
+    Parameters
+    ----------
+    results : dictionary
+        Results from run_benchmarks.
+    baseline : dictionary
+        Baseline results (from load_results).
+    time_tolerance : float, optional
+        A benchmark is a regression if its time is more than (1 + time_tolerance) times the baseline. The default is 0.10.
+    CD_tolerance : float, optional
+        A benchmark is a regression if any CD it produced differs from the baseline by more than this. The default is 1e-6.
+    print_results : boolean, optional
+        Whether or not to print the comparison table. The default is True.
+
+    Returns
+    -------
+    regressions : list, [string]
+        A description of each regression (empty if there are none).
+    '''
+    regressions = []
+    if print_results:
+        print("benchmark".ljust(48) + "baseline (s)".rjust(14) + "new (s)".rjust(14) + "ratio".rjust(9))
+    for name, result in results["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            if print_results:
+                print(name.ljust(48) + "(not in baseline)".rjust(28))
+            continue
+        base = baseline["benchmarks"][name]
+        ratio = result["time"]/base["time"] if base["time"] > 0.0 else float("inf")
+        flag = ""
+        if ratio > 1.0 + time_tolerance:
+            regressions.append(name + ": " + "{:.4f}".format(result["time"]) + " s vs " + "{:.4f}".format(base["time"]) + " s baseline (" + "{:.2f}".format(ratio) + "x)")
+            flag = "  SLOWER"
+        if ("CD" in result) and ("CD" in base):
+            CD_difference = float(np.max(np.abs(np.asarray(result["CD"]) - np.asarray(base["CD"]))))
+            if CD_difference > CD_tolerance:
+                regressions.append(name + ": CD changed by " + str(CD_difference))
+                flag += "  CD CHANGED"
+        if print_results:
+            print(name.ljust(48) + "{:14.4f}".format(base["time"]) + "{:14.4f}".format(result["time"]) + "{:9.2f}".format(ratio) + flag)
+
+    if print_results:
+        if regressions:
+            print("\n" + str(len(regressions)) + " regression(s):")
+            for regression in regressions:
+                print("  " + regression)
+        else:
+            print("\nNo regressions.")
+    return regressions
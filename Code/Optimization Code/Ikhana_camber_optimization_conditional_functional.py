@@ -6,21 +6,25 @@ Created on Wed Oct 20 13:53:39 2021
 @author: Justice Schoenfeld
 """
 
-import machupX as mx
+import os
 import numpy as np
-import matplotlib.pyplot as plt
 import json
 import scipy as sp
-import copy
-import jsonpickle
-from Ikhana_join import create_span_fraction_array, double_repeat_and_join
-from airfoil_functional_creation import create_Ikhana_airfoils_function_dict
-from Ikhana_cos_clustering_array import create_cos_cluster_array
-import timing
+from Ikhana_evaluation_cache import EvaluationCache
+from Ikhana_evaluation_engine import EvaluationEngine, load_optimization_inputs, engine_kwargs
+from Ikhana_parallel_jacobian import ParallelJacobian
+from Ikhana_result_store import ResultStore
+from Ikhana_solution_memo import SolutionMemo
+from Ikhana_profiler import Profiler
+from Ikhana_restart_policy import RestartPolicy, hessian_function
+from Ikhana_sensitivities import LiftingLineSensitivities, BandedLiftingLineSensitivities
 from timing import secondsToStr
 
+# Largest |CL - CL_to_set| and |Cm| of a result that is memoized (only converged, trimmed results are memoized)
+MEMO_TRIM_TOLERANCE = 1e-3
 
-def pitch_trim_flap_optimize_functional(orig_scene_filename, orig_aircraft_json_filename, aircraft_name, num_flaps, CL_to_set, upDeflBound, lowDeflBound, run_mult_solutions = False, initial_defl = None, dragType = "Total", write_results = True, print_results = False, show_plots = False, dump_forces_and_moments = False):
+
+def pitch_trim_flap_optimize_functional(orig_scene_filename, orig_aircraft_json_filename, aircraft_name, num_flaps, CL_to_set, upDeflBound, lowDeflBound, run_mult_solutions = False, initial_defl = None, dragType = "Total", write_results = True, print_results = False, show_plots = False, dump_forces_and_moments = False, cache_size = 256, elevator_mode = "twist", gradient_workers = None, central_difference_gradients = False, warm_start = False, result_store = None, memo = None, profiler = None, sensitivity_bandwidth = None, num_starts = None, restart_policy = None, airfoil_tables = None, events = None):
     '''
     This code is used to pitch trim the given aircraft and then find the minimum drag 
     at the specified lift coefficient using the SLSQP method to minimize the drag value
@@ -64,7 +68,7 @@ def pitch_trim_flap_optimize_functional(orig_scene_filename, orig_aircraft_json_
     lowDeflBound : float
         Lower bound on the elevator and angle of attack deflections.
     run_mult_solutions : boolean, optional
-        Whether or not to take the solution from scipy.optimize.minimize and plug it back in as an initial guess before this function returns. The default is False.
+        Whether or not to take the solution from scipy.optimize.minimize and plug it back in as an initial guess before this function returns (restarts are limited by restart_policy). The default is False.
     initial_defl : array, [float], optional
         An array of the initial deflections for the optimization. Length should be = num_flaps + 2 (ie: 4 control points would give [x, x, x, x, x, x]). The default is None.
     dragType : string, optional
@@ -77,6 +81,68 @@ def pitch_trim_flap_optimize_functional(orig_scene_filename, orig_aircraft_json_
         Whether or not to show a plot of the normalized lift distribution. The default is False.
     dump_forces_and_moments : boolean, optional
         Whether or not display forces and moments in nice json format. The default is False.
+    cache_size : int, optional
+        Number of design points kept in the evaluation cache. The drag, lift, and moment for a
+        design point all come from one MachUpX solve, so the objective and both constraints
+        share it. Set to 0 to turn the cache off. The default is 256.
+    elevator_mode : string, optional
+        How the elevator is applied to the persistent MachUpX scene. 'twist' changes the all flying
+        tail mounting angle (scene rebuilt only when the elevator changes, matches the original results).
+        'control' uses the elevator control surface from the aircraft json and never rebuilds the scene
+        (flapped tail, does not match the all flying tail results). The default is "twist".
+    gradient_workers : int, optional
+        If given, the gradients of the drag objective and the lift/moment constraints are calculated
+        with forward differences on a pool of this many worker processes (all perturbed MachUpX solves
+        at once, shared by the objective and constraints) and passed to scipy.optimize.minimize as jac.
+        The default is None (SLSQP's serial finite differences).
+    central_difference_gradients : boolean, optional
+        Whether or not to use the lifting-line sensitivities from Ikhana_sensitivities.py (central differences
+        identified at every new x array, 1 + 2(num_flaps + 2) solves an iteration) for the objective and
+        constraint gradients instead of SLSQP's forward differences (num_flaps + 3 solves). More accurate but
+        slower. Takes priority over gradient_workers. The default is False.
+    warm_start : boolean, optional
+        Whether or not to start each MachUpX nonlinear solve from the last converged vortex strengths
+        instead of the linear solution. Makes each solve depend on the ones before it, which adds noise to
+        the finite difference gradients (see Ikhana_evaluation_engine.py). The default is False.
+    result_store : ResultStore or string, optional
+        If given, the result (x array, coefficients, deflections, optimizer statistics, and spanwise distributions)
+        is appended to this ResultStore, or to a ResultStore in this directory (see Ikhana_result_store.py).
+        Independent of write_results. With num_starts, only the best start is appended (without the spanwise
+        distributions, which are in its distributions file). The default is None.
+    memo : SolutionMemo or string, optional
+        If given, the results are memoized on disk in this SolutionMemo, or a SolutionMemo in this directory
+        (see Ikhana_solution_memo.py). A repeat of the same jsons, CL, bounds, and dragType returns the stored
+        results without running the optimization, and if initial_defl is None the solution at the nearest
+        memoized CL is used as the initial guess. Only converged results that meet the CL and Cm constraints
+        (within MEMO_TRIM_TOLERANCE) are memoized. The default is None.
+    profiler : Profiler, optional
+        Profiler that records the call counts and times of each stage of the optimization (see Ikhana_profiler.py).
+        Pass one in to keep the counters across several calls and export them with to_json or to_csv. The stages
+        run on gradient_workers and on the num_starts worker processes are merged into it. The default is None
+        (a new profiler for this call).
+    sensitivity_bandwidth : int, optional
+        With central_difference_gradients, also identify the drag Hessian between flaps within this many flaps of each
+        other (BandedLiftingLineSensitivities) for the trust-constr restarts. Only identified when a restart
+        asks for it, and then O(num_flaps) extra solves instead of O(num_flaps^2) for the full Hessian
+        (see Ikhana_high_resolution.py). The default is None (no Hessian).
+    num_starts : int, optional
+        If greater than 1, run a multi-start search instead of a single SLSQP run: SLSQP is run from initial_defl
+        (if given) and Latin hypercube initial guesses in parallel and the lowest drag trimmed solution is returned
+        (see multi_start_optimize in Ikhana_multistart.py for the basins and the other settings). The default is None.
+    restart_policy : RestartPolicy, optional
+        Limits and stopping rules for the run_mult_solutions restarts (see Ikhana_restart_policy.py). The default is
+        None (RestartPolicy() with its defaults: at most 20 restarts, stop when the solution changes by less than 0.0001
+        or the drag stops improving).
+    airfoil_tables : AirfoilTableDatabase or string, optional
+        If given, the functional airfoils that have a table in this database (or database directory) are interpolated
+        from the table instead of calling their functions (see Ikhana_airfoil_tables.py). The lifting-line sensitivities
+        choose their flap step directions (and, with a refresh_radius, chain their viscous gradients) from the derivatives
+        of the fits, so those are only as close to the table as the interpolation. The default is None.
+    events : EventStream, optional
+        Stream that gets an 'iteration' event for every SLSQP iteration, a 'restart' event for every run_mult_solutions
+        run, and a 'point_finished' event at the end (see Ikhana_events.py). If events.stop() is called the optimization
+        stops at its next iteration (SLSQP needs scipy >= 1.11 for this). The stopped result is returned but not added
+        to the result store or memo, and its 'point_finished' event has stopped = True. The default is None.
 
     Returns
     -------
@@ -101,50 +167,59 @@ def pitch_trim_flap_optimize_functional(orig_scene_filename, orig_aircraft_json_
         print("Invalid dragType entered! Drag Type must be either 'Total' (default), 'Inviscid', or 'Viscous'.")
         return ''
     
+    # Return the memoized result if this exact problem has already been solved
+    if memo is not None:
+        if not isinstance(memo, SolutionMemo):
+            memo = SolutionMemo(memo)
+        memo_hash, memo_sources = memo.configuration(orig_scene_filename, orig_aircraft_json_filename, aircraft_name, num_flaps, upDeflBound, lowDeflBound, dragType, elevator_mode, run_mult_solutions, airfoil_tables)
+        memo_result, memo_warm_start = memo.lookup(memo_hash, memo_sources, CL_to_set)
+        if memo_result is not None:
+            if print_results:
+                print("Memoized result for CL: " + str(CL_to_set))
+            _emit_point_finished(events, CL_to_set, memo_result, memoized = True)
+            return memo_result
+        if (initial_defl is None) and (memo_warm_start is not None) and (len(memo_warm_start) == num_flaps + 2):
+            initial_defl = memo_warm_start
+    
+    # Multi-start search. Each start is a normal single start call to this function on a worker process
+    if (num_starts is not None) and (num_starts > 1):
+        from Ikhana_multistart import multi_start_optimize    # Imported here, Ikhana_multistart imports this file
+        result, basins = multi_start_optimize(orig_scene_filename, orig_aircraft_json_filename, aircraft_name, num_flaps, CL_to_set, upDeflBound, lowDeflBound, 
+                                              num_starts = num_starts, previous_solutions = [initial_defl], print_results = print_results,
+                                              run_mult_solutions = run_mult_solutions, dragType = dragType, write_results = write_results, 
+                                              dump_forces_and_moments = dump_forces_and_moments, cache_size = cache_size, elevator_mode = elevator_mode, 
+                                              gradient_workers = gradient_workers, central_difference_gradients = central_difference_gradients, warm_start = warm_start, 
+                                              result_store = result_store, sensitivity_bandwidth = sensitivity_bandwidth, restart_policy = restart_policy,
+                                              airfoil_tables = airfoil_tables, profiler = profiler)
+        if result is None:
+            print("No trimmed solution found by the multi-start search at CL: " + str(CL_to_set))
+            return ''
+        if (memo is not None) and _is_trimmed(result, CL_to_set):
+            memo.store(memo_hash, memo_sources, CL_to_set, result)
+        _emit_point_finished(events, CL_to_set, result, basins = len(basins))
+        return result
+    
     # --- Create Filenames ---
-    partitioned_file_name = orig_scene_filename.partition('.')
+    partitioned_file_name = os.path.basename(orig_scene_filename).partition('.')
     output_title = str(num_flaps) + "_FLAPS_" + partitioned_file_name[0] + "_CL_" + str(CL_to_set) + "__" + secondsToStr() 
     force_moment_output_filename = "F_M_" + output_title + ".json"
     distributions_filename = "distributions_" + output_title
     
-    # --- If not Base Case (0 control points) then create span fraction array ---
-    if (num_flaps > 0):
-        span_frac_array = create_span_fraction_array(num_flaps)
-    
     length_x_array = num_flaps + 2    # Number of control points + elevator + alpha
-    end_flap_index = num_flaps        # Index of last control point in x array
     elevator_index = num_flaps        # Index of the elevator value in x array
     aoa_index = length_x_array - 1    # Index of the aoa value in x array
        
     
     # Create unique scene and aircraft jsons for the given CL
-    scene_filename = str(CL_to_set) + "_" + orig_scene_filename
+    scene_filename = str(CL_to_set) + "_" + os.path.basename(orig_scene_filename)
 
     
-    # Create aircraft dictionary
-    orig_aircraft_dict = json.load(open(orig_aircraft_json_filename))
-    
-    # If not the Baseline case (0 control points) then set cosine clustering points and functions for CD, CL, Cm
-    if (num_flaps > 0):
-        # Set the cosine clustering points for the number of inboard and outboard flaps
-        orig_aircraft_dict['wings']['main_wing']['grid']['cluster_points'] = create_cos_cluster_array(num_flaps)
-    
-        # Replace airfoil poly_fits with function calls (functional)
-        orig_aircraft_dict['airfoils'] = create_Ikhana_airfoils_function_dict()
-    
-    # Create scene dictionary
-    orig_scene_dict = json.load(open(orig_scene_filename))   
-    
-    # Load state from scene json & save original horizontal tail twist
-    scene_state_dict = copy.deepcopy(orig_scene_dict)["scene"]["aircraft"][aircraft_name]["state"]
-    orig_aircraft_horizontal_twist = copy.deepcopy(orig_aircraft_dict)["wings"]["horizontal_tail"]["twist"]
-    
-    # Remove the aircraft so that I can add the aircraft dictionary with functions
-    scene_dict = copy.deepcopy(orig_scene_dict)
-    scene_dict['scene']['aircraft'].pop(aircraft_name)
+    # Create aircraft and scene dictionaries (cosine clustering points and functional airfoils set if num_flaps > 0)
+    scene_dict, orig_aircraft_dict, scene_state_dict = load_optimization_inputs(orig_scene_filename, orig_aircraft_json_filename, aircraft_name, num_flaps, airfoil_tables)
     
     # --If desired, format and print the json after changes have been made. Not currently used, but wanted to keep functionality.
     # def notSerializable(thingToPickle):
+    #     import jsonpickle
     #     name = jsonpickle.encode(thingToPickle)
     #     return name
     
@@ -154,12 +229,30 @@ def pitch_trim_flap_optimize_functional(orig_scene_filename, orig_aircraft_json_
     # print("\n\n------------------------")
     
     
-    # Create scene and add scene with functions for airfoils
-    my_scene = mx.Scene(scene_dict)
-    my_scene.add_aircraft(aircraft_name, orig_aircraft_dict, scene_state_dict)
+    # Create the evaluation engine. The scene is built once and each x array is applied to it
+    # (see Ikhana_evaluation_engine.py for how the elevator is handled with elevator_mode)
+    if profiler is None:
+        profiler = Profiler()
+    engine = EvaluationEngine(scene_dict, orig_aircraft_dict, scene_state_dict, aircraft_name, num_flaps, dragType, elevator_mode, warm_start, profiler = profiler)
     
     # --Can be used to display wireframe of aircraft if so desired. Not currently used, but wanted to keep functionality.
-    #my_scene.display_wireframe()
+    #engine.apply(np.zeros(length_x_array)).display_wireframe()
+    
+    # Cache of (CD, CL, Cm) for each design point so the objective and constraints share one MachUpX solve
+    evaluation_cache = EvaluationCache(cache_size)
+    
+    # Central difference (lifting-line) or parallel finite difference gradients for the objective and constraints (if desired)
+    gradient_provider = None
+    if central_difference_gradients and (sensitivity_bandwidth is not None):
+        gradient_provider = BandedLiftingLineSensitivities(engine, lambda x, desired_CL: evaluation_cache.get_or_evaluate(x, desired_CL, evaluate_design_point), bandwidth = sensitivity_bandwidth)
+    elif central_difference_gradients:
+        gradient_provider = LiftingLineSensitivities(engine, lambda x, desired_CL: evaluation_cache.get_or_evaluate(x, desired_CL, evaluate_design_point))
+    elif gradient_workers is not None:
+        worker_engine_kwargs = engine_kwargs(scene_dict, orig_aircraft_dict, scene_state_dict, aircraft_name, num_flaps, dragType, elevator_mode, warm_start)
+        gradient_provider = ParallelJacobian(worker_engine_kwargs, lambda x, desired_CL: evaluation_cache.get_or_evaluate(x, desired_CL, evaluate_design_point), max_workers = gradient_workers, profiler = profiler)
+    
+    # Restart policy for run_mult_solutions
+    active_restart_policy = restart_policy if restart_policy is not None else RestartPolicy()
     
     # Declaration of optimization function, this function makes the call to scipy.optimize.minimize
     def optimize_twist_with_pitch_trim(CL_to_set):
@@ -208,6 +301,8 @@ def pitch_trim_flap_optimize_functional(orig_scene_filename, orig_aircraft_json_
             The lift coefficient from the MachUpX calculated forces and moments.
         calc_Cm : float
             The pitching moment coefficient from the MachUpX calculated forces and moments.
+        distributions : dictionary
+            The spanwise distributions calculated by MachUpX.
 
         '''
         # Whether to use zeros as initial guess or the passed in initial deflections as the initial guess
@@ -245,91 +340,104 @@ def pitch_trim_flap_optimize_functional(orig_scene_filename, orig_aircraft_json_
                    "args" : (CL_to_set, "lift")}
         constr = [constr1, constr2]
         
-        # --- CALL TO OPTIMIZATION ---
-        solution = sp.optimize.minimize(twist_cost_function, x, args = (CL_to_set), bounds = bnds, constraints = constr)
+        # Use the lifting-line or parallel gradients for the objective and constraints if desired (otherwise SLSQP uses serial finite differences)
+        objective_jac = None
+        if gradient_provider is not None:
+            if isinstance(gradient_provider, ParallelJacobian):
+                gradient_provider.lower_bounds = lowerBoundsArray
+                gradient_provider.upper_bounds = upperBoundsArray
+            objective_jac = gradient_provider.objective_jac
+            constr1["jac"] = gradient_provider.constraint_jac
+            constr2["jac"] = gradient_provider.constraint_jac
+        
+        # Count the optimizer iterations (and send an event for each one)
+        iterations = [0]
+        def count_iteration(xk, *args):
+            profiler.count("slsqp_iterations")
+            iterations[0] += 1
+            if events is not None:
+                CD, CL, Cm = evaluation_cache.get_or_evaluate(xk, CL_to_set, evaluate_design_point)    # Already solved, from the cache
+                events.emit("iteration", CL = CL_to_set, iteration = iterations[0], x = np.array(xk), objective = CD*100.0,
+                            moment = Cm, lift = abs(CL - CL_to_set), evaluations = engine.solves)
+                if events.stop_requested:
+                    # End the optimization with the current solution: trust-constr (callback(xk, state)) stops when the
+                    #  callback returns True, SLSQP when it raises StopIteration (scipy >= 1.11)
+                    if args:
+                        return True
+                    raise StopIteration
         
-        # Plug the solution back in as initial guess and re-run optimization if desired. (THis functionality mimics Optix)
+        def minimize(x_start, method = "SLSQP"):
+            # One call to scipy.optimize.minimize from x_start
+            hess = None
+            if (method == "trust-constr") and (objective_jac is None):
+                method = "SLSQP"    # trust-constr is only used with lifting-line or parallel gradients
+            if method == "trust-constr":
+                hess = hessian_function(gradient_provider)    # Identified drag Hessian (lifting-line sensitivities only)
+                if hess is None:
+                    hess = sp.optimize.BFGS()
+            with profiler.stage("optimization"):
+                return sp.optimize.minimize(twist_cost_function, x_start, args = (CL_to_set), method = method, jac = objective_jac, hess = hess, bounds = bnds, constraints = constr, callback = count_iteration)
+        
+        # --- CALL TO OPTIMIZATION ---
+        # Plug the solution back in as initial guess and re-run optimization if desired. (This functionality mimics Optix)
         if run_mult_solutions:
-            epsilon = 5.0; # Error inital value
-            prev_solution = solution
-            x = prev_solution.x
-            run_mult_iter = 1
-            print("Iteration " + str(run_mult_iter) + "\n")
-            print(str(solution) + "\n\n")
-            # Run until the difference in solutions is smaller than 0.0001
-            while(abs(epsilon) > 0.0001): # By using the norm of the epsilon vector a threshold of 0.0001 requires all individual differences be at or below 1e-5
-                run_mult_iter += 1
-                solution = sp.optimize.minimize(twist_cost_function, x, args = (CL_to_set), bounds = bnds, constraints = constr)
-                epsilon = np.linalg.norm(prev_solution.x - solution.x)
-                prev_solution = solution
-                x = solution.x 
-                print("Iteration " + str(run_mult_iter) + "\n")
-                print(str(solution) + "\n\n")
-                
-                '''
-                The if statement and while loop above help ensure that we have actually reached the minimum value with the optimization.
-                The optimization is currently running a SLSQP with bounds. As part of the SLSQP scheme the first derivative is calculated 
-                directly and then the differences in the first derivative are used to calculate the second derivative. 
-                
-                Calculating the second derivative in this manner means that error builds up in the Jacobian inside the SLSQP optimization 
-                and the result may not be the actual minimum. By taking the first solution and plugging it back in as the initial guess for
-                a second optimization essentially clears the error from the optimization and the optimization starts from the previous result. 
-                Then by comparing the solutions and setting a threshold for the difference between two consecutive solutions I can run the 
-                optimization as many times as necessary, each time starting at the result of the previous solution, to get to what is the "true"
-                solution where my result between optimization runs isn't changing significantly.
-                
-                This was suggested by Dr Hunsaker and is similar to what he implemented in Optix, which is written for Fortran.
-                '''
+            solution = active_restart_policy.run(minimize, minimize, x, events)
+            
+            '''
+            The restarts help ensure that we have actually reached the minimum value with the optimization.
+            The optimization is currently running a SLSQP with bounds. As part of the SLSQP scheme the first derivative is calculated 
+            directly and then the differences in the first derivative are used to calculate the second derivative. 
+            
+            Calculating the second derivative in this manner means that error builds up in the Jacobian inside the SLSQP optimization 
+            and the result may not be the actual minimum. By taking the first solution and plugging it back in as the initial guess for
+            a second optimization essentially clears the error from the optimization and the optimization starts from the previous result. 
+            Then by comparing the solutions and setting a threshold for the difference between two consecutive solutions I can run the 
+            optimization as many times as necessary, each time starting at the result of the previous solution, to get to what is the "true"
+            solution where my result between optimization runs isn't changing significantly.
+            
+            This was suggested by Dr Hunsaker and is similar to what he implemented in Optix, which is written for Fortran.
+            
+            The restarts are now limited by the RestartPolicy (Ikhana_restart_policy.py): they stop once the solution stops
+            changing (the original 0.0001 threshold), once the drag stops improving, or once the restart/evaluation/time budget
+            is used up, and the best solution found is kept.
+            '''
+        else:
+            solution = minimize(x)
         
         # Store the angle of attack and elevator deflections
         aoa = solution.x[aoa_index]                                                 # deg
         elevator = solution.x[elevator_index]                                       # deg
         
-        # --- Update the twist on the horizontal tail by changing the mounting angle
-        aircraft_dict_post_solution = copy.deepcopy(orig_aircraft_dict)
+        # Horizontal tail twist with the new mounting angle (for reporting)
+        twist_data_post_solution = engine.tail_twist(elevator)                      # deg
         
-        # Add to the mounting angle
-        twist_data_post_solution = copy.deepcopy(orig_aircraft_horizontal_twist)
-        for row in range(0,len(twist_data_post_solution)):
-            twist_data_post_solution[row][1] += elevator                            # deg
-            
-        # Update the twist in the aircraft dictionary
-        aircraft_dict_post_solution["wings"]["horizontal_tail"]["twist"] = twist_data_post_solution
-       
-        # Update the angle of attack in the scene state
-        scene_state_dict["alpha"] = aoa                                             # deg
-        
-        # Re-initialize MachUpX with new angle of attack and "twist" (tail mounting angle)
-        my_scene = mx.Scene(scene_dict)
-        my_scene.add_aircraft(aircraft_name, aircraft_dict_post_solution, scene_state_dict)
-
         deflection_array = []
         if(num_flaps > 0):
-            deflection_array = double_repeat_and_join(span_frac_array, solution.x[0:end_flap_index])
+            deflection_array = engine.deflection_array(solution.x)                  # deg
             deflections = {"flaps1" : deflection_array}
-            my_scene.set_aircraft_control_state(control_state = deflections)        # deg
         
         # Calculate Forces & Moments as well as the Distributions and save the results
-        forces_and_moments = my_scene.solve_forces(filename = force_moment_output_filename)
-        my_scene.distributions(filename = distributions_filename)
+        forces_and_moments = engine.solve_forces(solution.x, filename = force_moment_output_filename)
+        distributions = engine.scene.distributions(filename = distributions_filename)
     
         # Get the CL and Cm values and print them. They will only be printed at the end of each CL that is run, if run in a loop.
-        calc_CL = forces_and_moments[aircraft_name]['total']['CL']
-        calc_Cm = forces_and_moments[aircraft_name]['total']['Cm']
-        print("CL: " + str(forces_and_moments[aircraft_name]["total"]["CL"]))
-        print("Cm: " + str(forces_and_moments[aircraft_name]["total"]["Cm"]))
-    
-        # Get the correct drag value from the forces and moments
-        if dragType == "Inviscid":
-            CD = forces_and_moments[aircraft_name]["inviscid"]["CD"]["total"]
-        elif dragType == "Viscous":
-            CD = forces_and_moments[aircraft_name]["viscous"]["CD"]["total"]
-        else:
-            CD = forces_and_moments[aircraft_name]["total"]["CD"]
+        # The drag value is the one for the requested dragType
+        CD, calc_CL, calc_Cm = engine.coefficients(forces_and_moments)
+        print("CL: " + str(calc_CL))
+        print("Cm: " + str(calc_Cm))
+        if print_results:
+            print(str(evaluation_cache))
+            print(str(engine))
+            if gradient_provider is not None:
+                print(str(gradient_provider))
+            if run_mult_solutions:
+                print(str(active_restart_policy))
+            print(str(profiler))
 
         # Plot normalized washout with respect to span location if desired.
         if show_plots:
             ''' Plot normalized washout from optimization. Normalize w/ respect to last deflection (-1 index)'''
+            import matplotlib.pyplot as plt    # Only imported when plotting, it is slow to import and the workers never plot
             span_locations = deflections["flaps1"][:,0]             # Get the span locations that correspond to deflections
             normalized_deflections = deflections["flaps1"][:,1]     # Gets all deflections
             normalized_deflections /= normalized_deflections[-1]    # Normalizes w/ respect to last deflection
@@ -338,9 +446,35 @@ def pitch_trim_flap_optimize_functional(orig_scene_filename, orig_aircraft_json_
             plt.show()
        
         # Return the results of the optimization at the given CL
-        return solution, deflection_array, forces_and_moments, CD, aoa, elevator, twist_data_post_solution, calc_CL, calc_Cm
+        return solution, deflection_array, forces_and_moments, CD, aoa, elevator, twist_data_post_solution, calc_CL, calc_Cm, distributions
        
         
+    def evaluate_design_point(x):
+        '''
+        Runs a single MachUpX solve for the given x array and returns the drag, lift, and
+        moment coefficients from it. This is only called by twist_cost_function through
+        the evaluation cache, so each design point is only solved once no matter how many
+        times scipy.optimize.minimize asks for the objective and constraints.
+
+        Parameters
+        ----------
+        x : array, [float]
+            x array from scipy.optimize.minimize.
+
+        Returns
+        -------
+        CD : float
+            The drag coefficient of the requested dragType (unscaled).
+        CL : float
+            The lift coefficient.
+        Cm : float
+            The pitching moment coefficient.
+
+        '''
+        # Apply the angle of attack, tail mounting angle, and flap deflections to the scene and solve
+        return engine.evaluate(x)
+    
+    
     ''' Optimizer function for minimizing drag by "twisting" the wing '''
     def twist_cost_function(x, desired_CL ,flag = "drag"):
         '''
@@ -358,6 +492,9 @@ def pitch_trim_flap_optimize_functional(orig_scene_filename, orig_aircraft_json_
         larger than CD. By scaling the drag coefficient it brings the CD value closer
         to the order of magnitude of CL and it was found that better results were obtained.
         
+        The CD, CL, and Cm for each x array come from the evaluation cache, so the drag
+        objective and the two constraints at the same x array share a single MachUpX solve.
+        
         ** This function MUST stay within the pitch_trim_flap_optimize_functional
            function because of how the scene class in MachUpX works. This function is 
            inside of the parent function so that the scene class is within scope. If it 
@@ -380,50 +517,17 @@ def pitch_trim_flap_optimize_functional(orig_scene_filename, orig_aircraft_json_
             The value of CL, Cm, or CD depending on the flag that was given. (**Note CD will be scaled by 100.0 to bring to same order of magnitude as CL constraint) 
 
         '''
-        # --- Update the twist on the horizontal tail by changing the mounting angle
-        aircraft_dict = copy.deepcopy(orig_aircraft_dict)
-        
-        # Pull in original twist info and add new optimized mounting angle
-        twist_data = copy.deepcopy(orig_aircraft_horizontal_twist)
-        for row in range(0,len(twist_data)):
-            twist_data[row][1] += x[elevator_index]                                 # deg
-        
-        # Set new twist
-        aircraft_dict["wings"]["horizontal_tail"]["twist"] = twist_data
-        
-        # --- Set the angle of attack
-        scene_state_dict["alpha"] = x[aoa_index]                                    # deg
-        
-        # Re-initialize MachUpX with new "twist" (tail mounting angle)
-        my_scene = mx.Scene(scene_dict)
-        my_scene.add_aircraft(aircraft_name, aircraft_dict, scene_state_dict)
-        
-        # --- Change the flap deflections if num_flaps > 0
-        if (num_flaps > 0):
-            deflection_array = double_repeat_and_join(span_frac_array, x[0:end_flap_index])
-            deflections = {"flaps1" : deflection_array}
-            my_scene.set_aircraft_control_state(control_state = deflections)        # deg
-        
-        # Call for forces and moments to get CL and Cm for constraints or CD for value to minimize.
-        forces_and_moments = my_scene.solve_forces(verbose=False)
+        with profiler.stage("cost_function:" + flag):
+            CD, CL, Cm = evaluation_cache.get_or_evaluate(x, desired_CL, evaluate_design_point)
         
         # Get the appropriate value (either a constraint or the minimization value)
         if flag == "moment": # Get Cm for constraint
-            value = forces_and_moments[aircraft_name]["total"]["Cm"]
+            value = Cm
         elif flag == "lift": # Get CL for constraint
-            temp_value = forces_and_moments[aircraft_name]["total"]["CL"]
-                
-            value = abs(temp_value - desired_CL)
+            value = abs(CL - desired_CL)
         else: # Return CD
-            if dragType == "Inviscid":
-                value = forces_and_moments[aircraft_name]["inviscid"]["CD"]["total"]
-            elif dragType == "Viscous":
-                value = forces_and_moments[aircraft_name]["viscous"]["CD"]["total"]
-            else:
-                value = forces_and_moments[aircraft_name]["total"]["CD"]
-            
             # Scale the drag value so that it is on the same order of magnitude as CL and helps the optimization
-            value *= 100.0
+            value = CD*100.0
        
         return value
     
@@ -432,7 +536,11 @@ def pitch_trim_flap_optimize_functional(orig_scene_filename, orig_aircraft_json_
     ######  Run Analysis  ######
     ############################
     # Get results from the optimization call
-    solution, deflection_array, forces_and_moments, CD, aoa, elevator, hs_twist_data, fm_CL, fm_Cm = optimize_twist_with_pitch_trim(CL_to_set)
+    try:
+        solution, deflection_array, forces_and_moments, CD, aoa, elevator, hs_twist_data, fm_CL, fm_Cm, distributions = optimize_twist_with_pitch_trim(CL_to_set)
+    finally:
+        if isinstance(gradient_provider, ParallelJacobian):
+            gradient_provider.close()
     
     # Write results out to a file
     if write_results:
@@ -451,10 +559,33 @@ def pitch_trim_flap_optimize_functional(orig_scene_filename, orig_aircraft_json_
         output.write("Angle of Attack: " + str(aoa) + " (deg)\n")
         output.write("Elevator: " + str(elevator) + " (deg)\n")
         output.write("\nHorizontal Stabilizer Twist: \n" + str(hs_twist_data) + "\n")
+        output.write(str(evaluation_cache) + "\n")
+        output.write(str(engine) + "\n")
+        output.write(str(profiler) + "\n")
         if dump_forces_and_moments:
             output.write(json.dumps(forces_and_moments, indent = 4))
         output.close()
         
+    # A run stopped from the event stream is not a finished point, so it is not stored
+    stopped = (events is not None) and events.stop_requested
+
+    # Append the results to the result store if desired
+    if (result_store is not None) and not stopped:
+        if not isinstance(result_store, ResultStore):
+            result_store = ResultStore(result_store)
+        optimizer_stats = {"success" : solution.success,
+                           "status" : solution.status,
+                           "message" : solution.message,
+                           "nfev" : solution.nfev,
+                           "nit" : solution.get("nit"),
+                           "fun" : solution.fun,
+                           "initial_defl" : initial_defl,
+                           "cache" : evaluation_cache.stats(),
+                           "engine" : engine.stats(),
+                           "profile" : profiler.stats(),
+                           "restarts" : active_restart_policy.stats() if run_mult_solutions else None}
+        result_store.append(aircraft_name, num_flaps, CL_to_set, dragType, solution.x, CD, fm_CL, fm_Cm, aoa, elevator, deflection_array, optimizer_stats, distributions)
+        
     # Print results out if so desired.
     if print_results:
         print(solution)
@@ -465,4 +596,24 @@ def pitch_trim_flap_optimize_functional(orig_scene_filename, orig_aircraft_json_
             print(json.dumps(forces_and_moments, indent = 4))
             
     # Return the any values necessary for looping through multiple CL's
-    return distributions_filename, CD, fm_CL, fm_Cm, aoa, elevator, deflection_array, solution.x
\ No newline at end of file
+    result = (distributions_filename, CD, fm_CL, fm_Cm, aoa, elevator, deflection_array, solution.x)
+    if (memo is not None) and solution.success and not stopped and _is_trimmed(result, CL_to_set):
+        memo.store(memo_hash, memo_sources, CL_to_set, result)
+        if print_results:
+            print(str(memo))
+    _emit_point_finished(events, CL_to_set, result, success = bool(solution.success), nfev = int(solution.nfev), solves = engine.solves, stopped = stopped)
+    return result
+
+
+def _is_trimmed(result, CL_to_set):
+    # Whether a returned result tuple meets the lift and moment constraints (within MEMO_TRIM_TOLERANCE)
+    return (abs(result[2] - CL_to_set) <= MEMO_TRIM_TOLERANCE) and (abs(result[3]) <= MEMO_TRIM_TOLERANCE)
+
+
+def _emit_point_finished(events, CL_to_set, result, **fields):
+    # Sends the 'point_finished' event for a returned result tuple
+    if events is None:
+        return
+    distributions_filename, CD, fm_CL, fm_Cm, aoa, elevator, deflection_array, x = result
+    events.emit("point_finished", CL = CL_to_set, CD = float(CD), act_CL = float(fm_CL), Cm = float(fm_Cm), alpha = float(aoa),
+                elevator = float(elevator), x = np.array(x), **fields)
\ No newline at end of file
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:02:33 2026
+
+@author: justice
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+from Ikhana_camber_optimization_conditional_functional import pitch_trim_flap_optimize_functional
+
+'''
+Continuation over a grid of lift coefficients. This replaces the up/down sweep logic that
+was written by hand in the 2 flap Run Code script
+(sys_path_Ikhana_optimization_pitch_trim_act_looping_prev_solution_as_initial_guess_2_flaps.py).
+
+Going "up" (lowest CL to highest CL)
+    The first CL is run from the given initial guess (all zeros by default). The second CL
+    starts from the first CL's solution. After that the initial guess is predicted by
+    linearly extrapolating the previous two solutions to the new CL, which puts the
+    initial guess much closer to the solution than just re-using the last one.
+
+Going "down" (highest CL to lowest CL)
+    Each CL is predicted the same way from the two CL's above it (using the best solutions
+    found so far). The down pass was added because SLSQP could get stuck in a different
+    solution valley on the way up. If the down prediction is already within
+    skip_tolerance of the up solution, the down optimization would start on top of the up
+    solution and return the same answer, so the point is skipped. Otherwise the point is
+    re-optimized and the lower CD is kept.
+
+For a smooth schedule most of the down pass is skipped, so a 9 CL schedule costs close to
+9 full optimizations instead of 17.
+
+With num_starts, every CL on the up pass is a multi-start search (Ikhana_multistart.py)
+with the predicted initial guess as the first start. The multi-start looks for the other
+solution valleys directly, so the down pass is not run.
+
+With checkpoint_filename, the state of the sweep is written (atomically, a temporary file
+and a rename) after every completed CL point: the results, the solution x arrays (the
+warm starts for the points that follow), the flap deflections, and how far the up and
+down passes have got. If the sweep is run again with the same checkpoint_filename, it
+resumes after the last completed point and predicts the next initial guesses from the
+checkpointed solutions, so a crash on the down pass does not lose the up pass. The
+checkpoint stores a hash of the scene and aircraft json contents and the sweep settings;
+a checkpoint made with different inputs is ignored (and overwritten). A checkpoint of a
+finished sweep is kept, so running the sweep again just returns the checkpointed results.
+
+If the optimization finds no trimmed solution for a CL (pitch_trim_flap_optimize_functional
+returns '' instead of its results), the point is skipped. On the up pass its CD, Cm, alpha,
+elevator, and act_CL are left as NaN and its predicted initial guess is kept as its solution,
+so the points above are still predicted from it. The down pass is then always run for that
+CL; a down pass point with no solution keeps what the up pass found.
+
+If the events stream passed through to the optimization (events = ..., Ikhana_events.py)
+is stopped, the sweep ends after the current point without recording that point (its
+optimization was cut short) and returns what has been completed. The checkpoint is left
+at the last completed point, so running the sweep again resumes from there.
+'''
+
+# Structured array layout of the continuation results
+RESULTS_DTYPE = np.dtype([("CL", np.float64),
+                          ("CD", np.float64),
+                          ("Cm", np.float64),
+                          ("alpha", np.float64),
+                          ("elevator", np.float64),
+                          ("act_CL", np.float64),
+                          ("changed", np.bool_),     # True if the down pass found a lower CD
+                          ("skipped", np.bool_)])    # True if the down pass was skipped for this CL
+
+RESULTS_HEADER = 'CL   CD   Cm   alpha   elevator   act_CL'
+
+
+def checkpoint_configuration(scene_filename, aircraft_json, aircraft_name, num_flaps, CL_list, upDeflBound, lowDeflBound, skip_tolerance, run_mult_solutions, num_starts, optimize_kwargs):
+    '''
+    Returns the sha256 hex digest of the json contents and the sweep settings that a
+    checkpoint has to match to be resumed.
+    '''
+    config_hash = hashlib.sha256()
+    for filename in [scene_filename, aircraft_json]:
+        with open(filename) as json_file:
+            config_hash.update(json.dumps(json.load(json_file), sort_keys = True).encode("utf-8"))
+        config_hash.update(b"\0")
+    settings = {"aircraft_name" : aircraft_name,
+                "num_flaps" : int(num_flaps),
+                "CL_list" : [float(CL) for CL in CL_list],
+                "upDeflBound" : float(upDeflBound),
+                "lowDeflBound" : float(lowDeflBound),
+                "skip_tolerance" : float(skip_tolerance),
+                "run_mult_solutions" : bool(run_mult_solutions),
+                "num_starts" : num_starts,
+                # Objects (a memo, profiler, ...) only count by type so that their addresses do not change the hash
+                "optimize_kwargs" : {name : (repr(value) if isinstance(value, (bool, int, float, str, list, tuple, type(None))) else type(value).__name__)
+                                     for name, value in optimize_kwargs.items()}}
+    config_hash.update(json.dumps(settings, sort_keys = True).encode("utf-8"))
+    return config_hash.hexdigest()
+
+
+def save_checkpoint(filename, config_hash, results, solutions, all_deflections, results_up, solutions_up, deflections_up, up_completed, down_next, optimizations):
+    '''
+    Writes the sweep state to filename (npz). The file is written to a temporary file in the
+    same directory first and then renamed, so a crash never leaves a partial checkpoint.
+    '''
+    directory = os.path.dirname(os.path.abspath(filename))
+    temporary_filename = os.path.join(directory, "." + os.path.basename(filename) + "." + str(os.getpid()) + ".tmp")
+    with open(temporary_filename, 'wb') as checkpoint_file:
+        np.savez(checkpoint_file,
+                 config_hash = np.array(config_hash),
+                 results = results,
+                 solutions = solutions,
+                 all_deflections = all_deflections if all_deflections is not None else np.zeros((0, 0)),
+                 results_up = results_up,
+                 solutions_up = solutions_up,
+                 deflections_up = deflections_up if deflections_up is not None else np.zeros((0, 0)),
+                 up_completed = np.array(up_completed),
+                 down_next = np.array(down_next),
+                 optimizations = np.array(optimizations))
+    os.replace(temporary_filename, filename)
+
+
+def load_checkpoint(filename, config_hash):
+    '''
+    Loads a checkpoint written by save_checkpoint.
+
+    Returns
+    -------
+    checkpoint : dictionary
+        'results', 'solutions', 'all_deflections' (None if there are none yet), 'results_up',
+        'solutions_up', 'deflections_up', 'up_completed', 'down_next', and 'optimizations'. None if
+        there is no checkpoint, it was made with a different configuration, or it does not have the
+        up pass solutions and deflections (written before they were checkpointed).
+    '''
+    if not os.path.isfile(filename):
+        return None
+    with np.load(filename) as checkpoint_file:
+        if (str(checkpoint_file["config_hash"]) != config_hash) or ("solutions_up" not in checkpoint_file.files):
+            return None
+        all_deflections = checkpoint_file["all_deflections"]
+        deflections_up = checkpoint_file["deflections_up"]
+        return {"results" : checkpoint_file["results"].copy(),
+                "solutions" : checkpoint_file["solutions"].copy(),
+                "all_deflections" : all_deflections.copy() if all_deflections.size > 0 else None,
+                "results_up" : checkpoint_file["results_up"].copy(),
+                "solutions_up" : checkpoint_file["solutions_up"].copy(),
+                "deflections_up" : deflections_up.copy() if deflections_up.size > 0 else None,
+                "up_completed" : int(checkpoint_file["up_completed"]),
+                "down_next" : int(checkpoint_file["down_next"]),
+                "optimizations" : int(checkpoint_file["optimizations"])}
+
+
+def predict_initial_guess(CL, CL_points, solutions, upDeflBound, lowDeflBound, num_flaps):
+    '''
+    Predicts the initial guess for CL by linearly extrapolating the last two solutions
+    (or just re-using the last solution if there is only one).
+
+    Parameters
+    ----------
+    CL : float
+        Lift coefficient to predict the initial guess for.
+    CL_points : list, [float]
+        The CL's of the previous solutions, most recent last.
+    solutions : list, [array]
+        The previous solution x arrays, most recent last.
+    upDeflBound : float
+        Upper bound on the flap deflections.
+    lowDeflBound : float
+        Lower bound on the flap deflections.
+    num_flaps : int
+        Number of flaps/control points.
+
+    Returns
+    -------
+    initial_guess : array, [float]
+        The predicted x array (None if there are no previous solutions).
+    '''
+    if len(solutions) == 0:
+        return None
+    if len(solutions) == 1 or CL_points[-1] == CL_points[-2]:
+        initial_guess = np.array(solutions[-1], dtype = np.float64)
+    else:
+        slope = (np.asarray(solutions[-1]) - np.asarray(solutions[-2]))/(CL_points[-1] - CL_points[-2])
+        initial_guess = np.asarray(solutions[-1]) + slope*(CL - CL_points[-1])
+
+    # Keep the predicted flap deflections inside the bounds
+    initial_guess[0:num_flaps] = np.clip(initial_guess[0:num_flaps], lowDeflBound, upDeflBound)
+    return initial_guess
+
+
+def results_to_table(results):
+    '''
+    Converts the structured results into the (N x 6) CL, CD, Cm, alpha, elevator, act_CL
+    array used by the Run Code scripts.
+    '''
+    return np.column_stack([results[name] for name in ["CL", "CD", "Cm", "alpha", "elevator", "act_CL"]])
+
+
+def continuation_CL_sweep(scene_filename, aircraft_json, aircraft_name, num_flaps, CL_list, upDeflBound, lowDeflBound, initial_defl = None, skip_tolerance = 0.1, run_mult_solutions = True, print_results = True, num_starts = None, checkpoint_filename = None, **optimize_kwargs):
+    '''
+    Runs the up/down continuation over the CL grid.
+
+    Parameters
+    ----------
+    scene_filename : string
+        Filename of the aircraft scene json.
+    aircraft_json : string
+        Filename of the aircraft json.
+    aircraft_name : string
+        Name of the aircraft as given for the 'tag' in the aircraft scene json.
+    num_flaps : int
+        Desired number of flaps/control points to be used.
+    CL_list : list, [float]
+        Lift coefficients, in increasing order.
+    upDeflBound : float
+        Upper bound on the flap deflections.
+    lowDeflBound : float
+        Lower bound on the flap deflections.
+    initial_defl : array, [float], optional
+        Initial guess for the first (lowest) CL. The default is None (all zeros).
+    skip_tolerance : float, optional
+        The down pass is skipped for a CL if every entry of the down prediction is within this
+        (deg) of the up solution. Set to a negative value to never skip. The default is 0.1.
+    run_mult_solutions : boolean, optional
+        Passed to pitch_trim_flap_optimize_functional. The default is True.
+    print_results : boolean, optional
+        Whether or not to print progress. The default is True.
+    num_starts : int, optional
+        If given, each CL is a multi-start search with this many starts (passed to
+        pitch_trim_flap_optimize_functional) and the down pass is not run. The default is None.
+    checkpoint_filename : string, optional
+        npz file the sweep state is written to after every CL point, and resumed from if it
+        already exists (see the notes at the top of the file). The default is None (no checkpoints).
+    **optimize_kwargs
+        Any other keyword arguments for pitch_trim_flap_optimize_functional.
+
+    Returns
+    -------
+    results : structured array, RESULTS_DTYPE
+        The best result for each CL (NaN CD, Cm, alpha, elevator, and act_CL for a CL with no solution).
+    solutions : array, [[float]]
+        (len(CL_list) x num_flaps+2) array of the best solution x arrays.
+    all_deflections : array, [[float]]
+        Span locations followed by the best flap deflections for each CL (None if num_flaps = 0).
+    results_up : structured array, RESULTS_DTYPE
+        The results from the up pass only (None if the sweep was stopped before the up pass finished).
+    solutions_up : array, [[float]]
+        The solution x arrays from the up pass only (None if the sweep was stopped before the up pass finished).
+    deflections_up : array, [[float]]
+        Span locations followed by the flap deflections from the up pass only (None if num_flaps = 0 or the
+        sweep was stopped before the up pass finished).
+    '''
+    num_CL = len(CL_list)
+    results = np.zeros(num_CL, dtype = RESULTS_DTYPE)
+    solutions = np.zeros((num_CL, num_flaps + 2))
+    all_deflections = None
+    results_up = None
+    solutions_up = None
+    deflections_up = None
+    optimizations = 0
+    up_completed = 0
+    down_next = num_CL - 2
+
+    if checkpoint_filename is not None:
+        config_hash = checkpoint_configuration(scene_filename, aircraft_json, aircraft_name, num_flaps, CL_list, upDeflBound, lowDeflBound,
+                                               skip_tolerance, run_mult_solutions, num_starts, optimize_kwargs)
+        saved_state = load_checkpoint(checkpoint_filename, config_hash)
+        if saved_state is not None:
+            results = saved_state["results"]
+            solutions = saved_state["solutions"]
+            all_deflections = saved_state["all_deflections"]
+            up_completed = saved_state["up_completed"]
+            if up_completed == num_CL:    # Only kept once the up pass is finished
+                results_up = saved_state["results_up"]
+                solutions_up = saved_state["solutions_up"]
+                deflections_up = saved_state["deflections_up"]
+            down_next = saved_state["down_next"]
+            optimizations = saved_state["optimizations"]
+            if print_results:
+                print("Resuming from checkpoint " + checkpoint_filename + ": " + str(up_completed) + " of " + str(num_CL) + " up pass CL's completed, "
+                      + str(max(num_CL - 2 - down_next, 0)) + " down pass CL's completed")
+
+    def checkpoint():
+        # Write the state after each completed CL point
+        if checkpoint_filename is not None:
+            up_pass_finished = results_up is not None
+            save_checkpoint(checkpoint_filename, config_hash, results, solutions, all_deflections, results_up if up_pass_finished else results,
+                            solutions_up if up_pass_finished else solutions, deflections_up if up_pass_finished else all_deflections,
+                            up_completed, down_next, optimizations)
+
+    events = optimize_kwargs.get("events")
+    def stop_requested():
+        # Whether the events stream has been stopped (the point being run, if any, is not recorded)
+        if (events is not None) and events.stop_requested:
+            if print_results:
+                print("Continuation stopped: " + str(up_completed) + " of " + str(num_CL) + " up pass CL's completed")
+            return True
+        return False
+
+    def run(CL, initial_guess):
+        # One full optimization at CL
+        return pitch_trim_flap_optimize_functional(scene_filename, aircraft_json, aircraft_name, num_flaps, CL, upDeflBound, lowDeflBound, run_mult_solutions = run_mult_solutions, initial_defl = initial_guess, num_starts = num_starts, **optimize_kwargs)
+
+    def store(index, CL, CD, act_CL, act_Cm, aoa, elevator, deflections, solution_array):
+        nonlocal all_deflections
+        results[index]["CL"] = CL
+        results[index]["CD"] = CD
+        results[index]["Cm"] = act_Cm
+        results[index]["alpha"] = aoa
+        results[index]["elevator"] = elevator
+        results[index]["act_CL"] = act_CL
+        solutions[index,:] = solution_array
+        if num_flaps > 0:
+            if all_deflections is None:
+                # Span Loc   CL_list[0]   CL_list[1] ...
+                all_deflections = np.full((len(deflections), num_CL + 1), np.nan)    # NaN for CL's with no solution
+                all_deflections[:,0] = deflections[:,0]
+            all_deflections[:,index + 1] = deflections[:,1]
+
+    #--------------------------------  Going "Up"  --------------------------------
+    for index in range(up_completed, num_CL):
+        if stop_requested():
+            return results, solutions, all_deflections, None, None, None
+        CL = CL_list[index]
+        if print_results:
+            print("---------- Running CL: " + str(CL) + " (up) ----------")
+        if index == 0:
+            initial_guess = initial_defl
+        else:
+            initial_guess = predict_initial_guess(CL, CL_list[max(index - 2, 0):index], list(solutions[max(index - 2, 0):index]), upDeflBound, lowDeflBound, num_flaps)
+
+        result = run(CL, initial_guess)
+        optimizations += 1
+        if stop_requested():
+            return results, solutions, all_deflections, None, None, None
+        if not isinstance(result, tuple):
+            # No trimmed solution: the point is left as NaN and the prediction is carried on as its solution
+            if print_results:
+                print("---------- No solution for CL: " + str(CL) + " (up), point skipped ----------")
+            results[index]["CL"] = CL
+            for name in ["CD", "Cm", "alpha", "elevator", "act_CL"]:
+                results[index][name] = np.nan
+            if (initial_guess is not None) and (len(initial_guess) == num_flaps + 2):
+                solutions[index,:] = initial_guess
+        else:
+            dist_filename, CD, act_CL, act_Cm, aoa, elevator, deflections, solution_array = result
+            store(index, CL, CD, act_CL, act_Cm, aoa, elevator, deflections, solution_array)
+        up_completed = index + 1
+        checkpoint()
+
+    if results_up is None:
+        results_up = results.copy()
+        solutions_up = solutions.copy()
+        deflections_up = all_deflections.copy() if all_deflections is not None else None
+        checkpoint()
+
+    #-------------------------------  Going "Down"  -------------------------------
+    for index in range(down_next, -1, -1):
+        if (num_starts is not None) and (num_starts > 1):
+            break    # The multi-start search already covered the other solution valleys
+        if stop_requested():
+            return results, solutions, all_deflections, results_up, solutions_up, deflections_up
+        CL = CL_list[index]
+
+        # Predict from the (best) solutions of the CL's above, nearest CL last
+        above = list(range(min(index + 2, num_CL - 1), index, -1))
+        prediction = predict_initial_guess(CL, [CL_list[i] for i in above], [solutions[i] for i in above], upDeflBound, lowDeflBound, num_flaps)
+
+        if (not np.isnan(results[index]["CD"])) and (np.max(np.abs(prediction - solutions[index])) <= skip_tolerance):
+            results[index]["skipped"] = True
+            if print_results:
+                print("---------- Skipping CL: " + str(CL) + " (down prediction within tolerance) ----------")
+            down_next = index - 1
+            checkpoint()
+            continue
+
+        if print_results:
+            print("---------- Running CL: " + str(CL) + " (down) ----------")
+        result = run(CL, prediction)
+        optimizations += 1
+        if stop_requested():
+            return results, solutions, all_deflections, results_up, solutions_up, deflections_up
+        if not isinstance(result, tuple):
+            # No trimmed solution: keep what the up pass found
+            if print_results:
+                print("---------- No solution for CL: " + str(CL) + " (down), point skipped ----------")
+            down_next = index - 1
+            checkpoint()
+            continue
+        dist_filename, CD, act_CL, act_Cm, aoa, elevator, deflections, solution_array = result
+
+        # If CD is lower (or the up pass found no solution), replace the results, deflections, and solution
+        if np.isnan(results[index]["CD"]) or (CD < results[index]["CD"]):
+            store(index, CL, CD, act_CL, act_Cm, aoa, elevator, deflections, solution_array)
+            results[index]["changed"] = True
+        down_next = index - 1
+        checkpoint()
+
+    if print_results:
+        print("Continuation finished: " + str(optimizations) + " optimizations for " + str(num_CL) + " CL's ("
+              + str(int(np.sum(results["skipped"]))) + " down pass points skipped, "
+              + str(int(np.sum(results["changed"]))) + " improved on the down pass)")
+
+    return results, solutions, all_deflections, results_up, solutions_up, deflections_up
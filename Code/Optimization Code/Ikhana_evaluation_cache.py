@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 09:12:40 2026
+
+@author: justice
+"""
+from collections import OrderedDict
+import numpy as np
+
+'''
+During the optimization scipy.optimize.minimize (SLSQP) calls the cost function three
+separate times with the exact same x array: once for the drag (objective), once for the
+moment constraint, and once for the lift constraint. Every one of those calls used to
+run a full MachUpX solve even though all three values come out of the same forces and
+moments calculation.
+
+This file holds a small keyed cache that is used by the cost function so that a design
+point is only solved once. The key is the exact x array (byte for byte) plus the desired
+lift coefficient, and the cached value is the (CD, CL, Cm) tuple from a single MachUpX
+solve. The cache is bounded and evicts the least recently used design point once it is
+full. Hits and misses are counted so that the savings can be reported.
+'''
+
+class EvaluationCache:
+    '''
+    A bounded least recently used (LRU) cache of MachUpX design point evaluations.
+
+    Parameters
+    ----------
+    max_size : int, optional
+        Maximum number of design points to keep. A max_size of 0 (or None) turns the
+        caching off and every call is evaluated. The default is 256.
+    '''
+    def __init__(self, max_size = 256):
+        self.max_size = max_size if max_size is not None else 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, x, desired_CL):
+        '''
+        Creates the cache key for a design point. The x array is converted to float64
+        so that the same values always give the same bytes.
+
+        Parameters
+        ----------
+        x : array, [float]
+            x array from scipy.optimize.minimize.
+        desired_CL : float
+            The desired lift coefficient.
+
+        Returns
+        -------
+        key : tuple
+            (bytes of the x array, desired CL)
+        '''
+        return (np.asarray(x, dtype = np.float64).tobytes(), float(desired_CL))
+
+    def get_or_evaluate(self, x, desired_CL, evaluate):
+        '''
+        Returns the cached (CD, CL, Cm) for the design point if it has already been solved,
+        otherwise calls evaluate(x) once, stores the result, and returns it.
+
+        Parameters
+        ----------
+        x : array, [float]
+            x array from scipy.optimize.minimize.
+        desired_CL : float
+            The desired lift coefficient.
+        evaluate : function
+            Function that takes the x array and returns (CD, CL, Cm) from a single MachUpX solve.
+
+        Returns
+        -------
+        values : tuple, (float, float, float)
+            (CD, CL, Cm) for the design point.
+        '''
+        if self.max_size <= 0:
+            self.misses += 1
+            return evaluate(x)
+
+        key = self.key(x, desired_CL)
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        self.misses += 1
+        values = evaluate(x)
+        self._entries[key] = values
+
+        # Evict the least recently used design point if the cache is full
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last = False)
+            self.evictions += 1
+
+        return values
+
+    def get(self, x, desired_CL):
+        '''
+        Returns the cached (CD, CL, Cm) for the design point, or None if it has not been solved
+        (counted as a miss, the caller is expected to solve it and put it). Used when the misses
+        are solved together instead of one at a time through get_or_evaluate.
+        '''
+        if self.max_size <= 0:
+            self.misses += 1
+            return None
+        key = self.key(x, desired_CL)
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, x, desired_CL, values):
+        '''Stores the (CD, CL, Cm) of a design point solved outside of get_or_evaluate.'''
+        if self.max_size <= 0:
+            return
+        self._entries[self.key(x, desired_CL)] = values
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last = False)
+            self.evictions += 1
+
+    def clear(self):
+        '''Removes all stored design points (the hit/miss counters are kept).'''
+        self._entries.clear()
+
+    def stats(self):
+        '''
+        Returns the cache counters.
+
+        Returns
+        -------
+        stats : dictionary
+            Number of hits, misses, evictions, current size and max size, as well as the
+            hit rate (fraction of calls that did not need a MachUpX solve).
+        '''
+        calls = self.hits + self.misses
+        return {"hits" : self.hits,
+                "misses" : self.misses,
+                "evictions" : self.evictions,
+                "size" : len(self._entries),
+                "max_size" : self.max_size,
+                "hit_rate" : (self.hits / calls) if calls > 0 else 0.0}
+
+    def __str__(self):
+        stats = self.stats()
+        return ("Evaluation cache: " + str(stats["hits"]) + " hits, " + str(stats["misses"]) + " misses (MachUpX solves), "
+                + str(stats["evictions"]) + " evictions, hit rate " + "{:.1%}".format(stats["hit_rate"]))
@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:31:07 2026
+
+@author: justice
+"""
+
+import numpy as np
+import json
+import copy
+from Ikhana_join import create_span_fraction_array, DeflectionArrayBuilder
+from airfoil_functional_creation import create_Ikhana_airfoils_function_dict, create_airfoils_table_dict
+from Ikhana_cos_clustering_array import create_cos_cluster_array
+from Ikhana_profiler import Profiler
+from Ikhana_aircraft_model import AircraftModel
+
+'''
+The cost function used to build a brand new MachUpX scene class for every evaluation:
+deepcopy the aircraft dictionary, create the scene, add the aircraft (which re-parses the
+geometry and rebuilds the grid), then set the flaps and solve. Only the horizontal tail
+mounting angle, the angle of attack, and the flap deflections ever change between
+evaluations, so almost all of that work is repeated for nothing.
+
+The EvaluationEngine in this file builds the scene once and then applies each x array to
+the existing scene:
+    - angle of attack   -> set_aircraft_state
+    - flap camber       -> set_aircraft_control_state ("flaps1")
+    - elevator          -> depends on elevator_mode (see below)
+
+elevator_mode = "twist" (default)
+    The elevator is the all flying tail mounting angle, exactly like the original code.
+    MachUpX cannot change the twist of a wing once the aircraft has been added, so the
+    scene is only rebuilt when the elevator value changes. All of the finite difference
+    steps on the flaps and the angle of attack reuse the scene. Results match the rebuild
+    path to within the MachUpX nonlinear solver convergence (REBUILD_MATCH_TOLERANCE).
+
+elevator_mode = "control"
+    The elevator is applied through the existing "elevator" control in Ikhana.json
+    (27% chord control surface on the horizontal tail) and the scene is never rebuilt.
+    This models a flapped tail instead of an all flying tail, so the trimmed elevator
+    value and CD will NOT match the twist path. Use it when speed matters more than
+    reproducing the published all flying tail results.
+
+Warm starting (warm_start = True, off by default)
+    Consecutive evaluations during the optimization only differ by small steps, but MachUpX
+    starts every nonlinear solve from the linear solution. With warm starting the engine
+    keeps the last converged vortex strength vector and uses it as the starting point of
+    the next nonlinear solve instead. MachUpX has no public option for this, so the scene's
+    _solve_linear is wrapped: the linear solve still runs (it sets up the intermediates the
+    nonlinear solver needs) and then the vortex strengths are replaced with the stored ones.
+    If a warm started solve raises (MachUpX's non-convergence error), it is re-run from the
+    linear solution. Warm starting is only used with the "nonlinear" solver type.
+
+    A warm started solve depends on the solves before it: the result differs by up to the
+    nonlinear solver convergence, which is far larger than the 1.49e-8 finite difference
+    step SLSQP, the parallel Jacobian, and the multi-point problem use. Finite difference
+    gradients then pick up that noise, so keep warm_start = False whenever the gradients
+    come from finite differences (the default everywhere).
+
+    The hooks use private attributes of the MachUpX 2.x Scene (_solve_linear, _gamma,
+    _solver_type, _lifting_line_residual). They are only installed if the installed MachUpX
+    version is one of WARM_START_MACHUPX_VERSIONS and the attributes exist; otherwise the
+    solves are cold started as usual. The number of nonlinear iterations for every solve is
+    recorded (by counting calls to _lifting_line_residual) when it is available.
+
+Aircraft overlay
+    The aircraft dictionary given to the engine is never copied or changed. In twist mode
+    each scene is built from an overlay (Ikhana_aircraft_model.py) that only replaces the
+    tail twist, instead of a deepcopy of the whole aircraft dictionary.
+
+Profiling
+    Scene construction, add_aircraft, the aircraft overlay, set_aircraft_state,
+    set_aircraft_control_state, solve_forces, and the functional airfoil callbacks are
+    timed by the engine's Profiler (see Ikhana_profiler.py). The airfoil callbacks are only
+    wrapped when a profiler is given.
+'''
+
+def _machupx():
+    # MachUpX is imported the first time a scene is built, not when this file is imported
+    #  (the job runner, result store, and plotting scripts import this file without solving anything)
+    import machupX
+    return machupX
+
+
+# Largest difference in CD, CL, or Cm allowed between the engine and the rebuild path (elevator_mode = "twist")
+REBUILD_MATCH_TOLERANCE = 1e-6
+
+# MachUpX versions (prefixes of machupX.__version__) whose private Scene attributes the solver hooks are written for
+WARM_START_MACHUPX_VERSIONS = ("2.",)
+
+
+class EvaluationEngine:
+    '''
+    Holds one MachUpX scene for the whole optimization and applies x arrays to it.
+
+    Parameters
+    ----------
+    scene_dict : dictionary
+        The scene dictionary with the aircraft removed.
+    aircraft_dict : dictionary
+        The aircraft dictionary (with the functional airfoils and cluster points already set).
+    scene_state_dict : dictionary
+        The aircraft state from the scene json.
+    aircraft_name : string
+        Name of the aircraft as given for the 'tag' in the aircraft scene json.
+    num_flaps : int
+        Number of flaps/control points.
+    dragType : string, optional
+        What type of Drag to return ('Total', 'Inviscid', or 'Viscous'). The default is "Total".
+    elevator_mode : string, optional
+        How the elevator is applied, either 'twist' or 'control'. The default is "twist".
+    warm_start : boolean, optional
+        Whether or not to start each nonlinear solve from the last converged vortex strengths. Makes each
+        solve depend on the ones before it, so leave it off with finite difference gradients. The default is False.
+    profiler : Profiler, optional
+        Profiler used to time the stages of each evaluation. The default is None (a disabled profiler).
+    '''
+    def __init__(self, scene_dict, aircraft_dict, scene_state_dict, aircraft_name, num_flaps, dragType = "Total", elevator_mode = "twist", warm_start = False, profiler = None):
+        if (elevator_mode != "twist") and (elevator_mode != "control"):
+            raise ValueError("Invalid elevator_mode entered! Must be either 'twist' (default) or 'control'.")
+
+        self.scene_dict = scene_dict
+        self.aircraft_dict = aircraft_dict
+        self.scene_state_dict = copy.deepcopy(scene_state_dict)
+        self.aircraft_name = aircraft_name
+        self.num_flaps = num_flaps
+        self.dragType = dragType
+        self.elevator_mode = elevator_mode
+
+        # Time the functional airfoil callbacks if profiling (on a copy, the given dictionary stays picklable)
+        self.profiler = profiler if profiler is not None else Profiler(enabled = False)
+        if profiler is not None and "airfoils" in aircraft_dict:
+            self.aircraft_dict = dict(aircraft_dict)
+            self.aircraft_dict["airfoils"] = profiler.instrument_airfoils(aircraft_dict["airfoils"])
+
+        self.length_x_array = num_flaps + 2    # Number of control points + elevator + alpha
+        self.end_flap_index = num_flaps        # Index of last control point in x array
+        self.elevator_index = num_flaps        # Index of the elevator value in x array
+        self.aoa_index = num_flaps + 1         # Index of the aoa value in x array
+
+        if (num_flaps > 0):
+            self.span_frac_array = create_span_fraction_array(num_flaps)
+            self.deflection_builder = DeflectionArrayBuilder(self.span_frac_array)
+
+        # Base aircraft dictionary (never changed) with the tail mounting angle applied as an overlay
+        self.aircraft_model = AircraftModel(self.aircraft_dict)
+
+        self.scene = None
+        self._scene_elevator = None    # Tail mounting angle the current scene was built with (twist mode)
+        self.scene_builds = 0
+        self.solves = 0
+
+        # Warm starting and nonlinear iteration counts
+        self.warm_start = warm_start
+        self.warm_starts = 0
+        self.nonlinear_iterations = []         # Nonlinear iterations for each solve (None if they could not be counted)
+        self._last_gamma = None
+        self._residual_calls = 0
+        self._iterations_counted = False
+        self._warm_started_solve = False
+
+    def tail_twist(self, elevator):
+        '''
+        Returns the horizontal tail twist distribution with the elevator added to the mounting angle.
+
+        Parameters
+        ----------
+        elevator : float
+            Horizontal stabilizer mounting angle (deg).
+
+        Returns
+        -------
+        twist_data : array, [[float], [float]]
+            [span location, twist] for the horizontal tail.
+        '''
+        return self.aircraft_model.tail_twist(elevator)                            # deg
+
+    def _build_scene(self, elevator):
+        # Build the scene, with the tail mounting angle included in twist mode
+        aircraft_dict = self.aircraft_dict
+        if self.elevator_mode == "twist":
+            with self.profiler.stage("aircraft_overlay"):
+                aircraft_dict = self.aircraft_model.overlay(elevator)
+
+        with self.profiler.stage("scene_construction"):
+            self.scene = _machupx().Scene(self.scene_dict)
+        with self.profiler.stage("add_aircraft"):
+            self.scene.add_aircraft(self.aircraft_name, aircraft_dict, self.scene_state_dict)
+        self._scene_elevator = elevator
+        self.scene_builds += 1
+        self._wrap_nonlinear_solver()
+
+    def _wrap_nonlinear_solver(self):
+        # Wrap the scene's linear solve (for warm starting) and residual (for counting iterations),
+        #  only for the MachUpX versions whose private attributes these hooks are written for
+        scene = self.scene
+        self._iterations_counted = False
+        if not str(getattr(_machupx(), "__version__", "")).startswith(WARM_START_MACHUPX_VERSIONS):
+            return
+        self._iterations_counted = hasattr(scene, "_lifting_line_residual")
+        if self._iterations_counted:
+            residual = scene._lifting_line_residual
+            def counted_residual(*args, **kwargs):
+                self._residual_calls += 1
+                return residual(*args, **kwargs)
+            scene._lifting_line_residual = counted_residual
+
+        if hasattr(scene, "_solve_linear") and getattr(scene, "_solver_type", None) == "nonlinear":
+            solve_linear = scene._solve_linear
+            def warm_solve_linear(*args, **kwargs):
+                result = solve_linear(*args, **kwargs)
+                if self.warm_start and (self._last_gamma is not None) and (np.shape(scene._gamma) == self._last_gamma.shape):
+                    scene._gamma = self._last_gamma.copy()
+                    self.warm_starts += 1
+                    self._warm_started_solve = True
+                return result
+            scene._solve_linear = warm_solve_linear
+
+    def deflection_array(self, x):
+        '''
+        Returns the flaps1 deflection distribution for the x array ([] if there are no flaps).
+        This is a new array (the evaluations use the builder's reused buffer instead).
+        '''
+        if (self.num_flaps > 0):
+            return self.deflection_builder.build_copy(x)
+        return []
+
+    def apply(self, x):
+        '''
+        Applies the x array (flaps, elevator, alpha) to the scene, building the scene only
+        if it does not exist yet or, in twist mode, the elevator has changed.
+
+        Parameters
+        ----------
+        x : array, [float]
+            x array from scipy.optimize.minimize.
+
+        Returns
+        -------
+        scene : machupX.Scene
+            The scene with the design point applied (not solved yet).
+        '''
+        elevator = float(x[self.elevator_index])
+        if (self.scene is None) or (self.elevator_mode == "twist" and elevator != self._scene_elevator):
+            self._build_scene(elevator)
+
+        # --- Set the angle of attack
+        self.scene_state_dict["alpha"] = float(x[self.aoa_index])                  # deg
+        with self.profiler.stage("set_aircraft_state"):
+            self.scene.set_aircraft_state(state = self.scene_state_dict, aircraft = self.aircraft_name)
+
+        # --- Set the flap deflections (and elevator if it is a control surface)
+        control_state = {}
+        if (self.num_flaps > 0):
+            with self.profiler.stage("deflection_array"):
+                control_state["flaps1"] = self.deflection_builder.build(x)         # deg (buffer reused every evaluation)
+        if self.elevator_mode == "control":
+            control_state["elevator"] = elevator                                   # deg
+        if control_state:
+            with self.profiler.stage("set_aircraft_control_state"):
+                self.scene.set_aircraft_control_state(control_state = control_state, aircraft = self.aircraft_name)
+
+        return self.scene
+
+    def solve_forces(self, x, **kwargs):
+        '''
+        Applies the x array and returns the MachUpX forces and moments. Any keyword arguments
+        (filename, etc.) are passed on to solve_forces.
+        '''
+        scene = self.apply(x)
+        kwargs.setdefault("verbose", False)
+        self._residual_calls = 0
+        self._warm_started_solve = False
+        try:
+            with self.profiler.stage("solve_forces"):
+                forces_and_moments = scene.solve_forces(**kwargs)
+        except Exception:
+            # MachUpX's non-convergence error is not a documented type, so any error from a warm started
+            #  solve is retried once from the linear solution (errors from cold starts are raised as they are)
+            if not self._warm_started_solve:
+                raise
+            self._last_gamma = None
+            scene = self.apply(x)
+            self._residual_calls = 0
+            self._warm_started_solve = False
+            with self.profiler.stage("solve_forces"):
+                forces_and_moments = scene.solve_forces(**kwargs)
+        self.solves += 1
+
+        # Record the nonlinear iterations (the first residual is the starting error) and keep the converged vortex strengths
+        if self._iterations_counted:
+            self.nonlinear_iterations.append(max(self._residual_calls - 1, 0))
+        else:
+            self.nonlinear_iterations.append(None)
+        if self.warm_start and hasattr(scene, "_gamma"):
+            self._last_gamma = np.array(scene._gamma, copy = True)
+        return forces_and_moments
+
+    def coefficients(self, forces_and_moments):
+        '''
+        Pulls the drag (of the engine's dragType), lift, and moment coefficients out of the
+        MachUpX forces and moments.
+
+        Returns
+        -------
+        CD : float
+        CL : float
+        Cm : float
+        '''
+        fm = forces_and_moments[self.aircraft_name]
+        if self.dragType == "Inviscid":
+            CD = fm["inviscid"]["CD"]["total"]
+        elif self.dragType == "Viscous":
+            CD = fm["viscous"]["CD"]["total"]
+        else:
+            CD = fm["total"]["CD"]
+        return CD, fm["total"]["CL"], fm["total"]["Cm"]
+
+    def drag_components(self, forces_and_moments):
+        '''
+        Returns the inviscid and viscous drag coefficients from the MachUpX forces and moments.
+
+        Returns
+        -------
+        CD_inviscid : float
+        CD_viscous : float
+        '''
+        fm = forces_and_moments[self.aircraft_name]
+        return fm["inviscid"]["CD"]["total"], fm["viscous"]["CD"]["total"]
+
+    def evaluate(self, x):
+        '''
+        Solves the design point and returns (CD, CL, Cm). CD is not scaled.
+        '''
+        return self.coefficients(self.solve_forces(x))
+
+    def stats(self):
+        '''Returns the number of scene builds, solves, warm starts, and nonlinear iterations done by the engine.'''
+        counted = [iterations for iterations in self.nonlinear_iterations if iterations is not None]
+        return {"scene_builds" : self.scene_builds,
+                "solves" : self.solves,
+                "warm_starts" : self.warm_starts,
+                "nonlinear_iterations" : sum(counted),
+                "mean_nonlinear_iterations" : (sum(counted)/len(counted)) if counted else None}
+
+    def __str__(self):
+        stats = self.stats()
+        mean_iterations = stats["mean_nonlinear_iterations"]
+        return ("Evaluation engine: " + str(stats["scene_builds"]) + " scene builds, " + str(stats["solves"]) + " solves, "
+                + str(stats["warm_starts"]) + " warm starts, "
+                + (("{:.2f}".format(mean_iterations) + " nonlinear iterations per solve") if mean_iterations is not None else "nonlinear iterations not counted"))
+
+
+def load_optimization_inputs(orig_scene_filename, orig_aircraft_json_filename, aircraft_name, num_flaps, airfoil_tables = None):
+    '''
+    Reads the scene and aircraft jsons and sets them up for the optimization: the cosine
+    clustering points and the functional airfoils are set on the aircraft (if num_flaps > 0)
+    and the aircraft is removed from the scene so the aircraft dictionary with functions
+    can be added.
+
+    If airfoil_tables (an AirfoilTableDatabase or its directory, see Ikhana_airfoil_tables.py)
+    is given, the functional airfoils that have a table are interpolated from the table
+    instead of calling their functions.
+
+    Returns
+    -------
+    scene_dict : dictionary
+        Scene dictionary without the aircraft.
+    aircraft_dict : dictionary
+        Aircraft dictionary with the functional airfoils.
+    scene_state_dict : dictionary
+        The aircraft state from the scene json.
+    '''
+    # Create aircraft dictionary
+    with open(orig_aircraft_json_filename) as aircraft_file:
+        aircraft_dict = json.load(aircraft_file)
+
+    # If not the Baseline case (0 control points) then set cosine clustering points and functions for CD, CL, Cm
+    if (num_flaps > 0):
+        aircraft_dict['wings']['main_wing']['grid']['cluster_points'] = create_cos_cluster_array(num_flaps)
+        aircraft_dict['airfoils'] = create_Ikhana_airfoils_function_dict()
+        if airfoil_tables is not None:
+            aircraft_dict['airfoils'] = create_airfoils_table_dict(airfoil_tables, aircraft_dict['airfoils'])
+
+    # Create scene dictionary, save the state, and remove the aircraft
+    with open(orig_scene_filename) as scene_file:
+        scene_dict = json.load(scene_file)
+    scene_state_dict = copy.deepcopy(scene_dict["scene"]["aircraft"][aircraft_name]["state"])
+    scene_dict['scene']['aircraft'].pop(aircraft_name)
+
+    return scene_dict, aircraft_dict, scene_state_dict
+
+
+def engine_kwargs(scene_dict, aircraft_dict, scene_state_dict, aircraft_name, num_flaps, dragType = "Total", elevator_mode = "twist", warm_start = False):
+    '''
+    Returns the EvaluationEngine keyword arguments as a dictionary. This is what is sent to
+    worker processes (each builds its own engine with EvaluationEngine(**engine_kwargs)), so
+    the workers and anything reading the settings use the parameter names, not positions.
+    '''
+    return {"scene_dict" : scene_dict,
+            "aircraft_dict" : aircraft_dict,
+            "scene_state_dict" : scene_state_dict,
+            "aircraft_name" : aircraft_name,
+            "num_flaps" : num_flaps,
+            "dragType" : dragType,
+            "elevator_mode" : elevator_mode,
+            "warm_start" : warm_start}
+
+
+def create_evaluation_engine(orig_scene_filename, orig_aircraft_json_filename, aircraft_name, num_flaps, dragType = "Total", elevator_mode = "twist", warm_start = False, airfoil_tables = None):
+    '''
+    Reads the scene and aircraft jsons and returns an EvaluationEngine for them.
+
+    Parameters
+    ----------
+    orig_scene_filename : string
+        Filename of the aircraft scene json.
+    orig_aircraft_json_filename : string
+        Filename of the aircraft json.
+    aircraft_name : string
+        Name of the aircraft as given for the 'tag' in the aircraft scene json.
+    num_flaps : int
+        Number of flaps/control points.
+    dragType : string, optional
+        What type of Drag to use ('Total', 'Inviscid', or 'Viscous'). The default is "Total".
+    elevator_mode : string, optional
+        How the elevator is applied, either 'twist' or 'control'. The default is "twist".
+    warm_start : boolean, optional
+        Whether or not to warm start the nonlinear solves (see EvaluationEngine). The default is False.
+    airfoil_tables : AirfoilTableDatabase or string, optional
+        Airfoil table database to interpolate the functional airfoils from (see load_optimization_inputs). The default is None.
+
+    Returns
+    -------
+    engine : EvaluationEngine
+    '''
+    scene_dict, aircraft_dict, scene_state_dict = load_optimization_inputs(orig_scene_filename, orig_aircraft_json_filename, aircraft_name, num_flaps, airfoil_tables)
+    return EvaluationEngine(scene_dict, aircraft_dict, scene_state_dict, aircraft_name, num_flaps, dragType, elevator_mode, warm_start)
+
+
+def rebuild_and_evaluate(engine, x):
+    '''
+    Evaluates the x array the original way (new scene, tail twist, state, flaps) using the
+    inputs held by the engine. Used to check the engine against the rebuild path.
+
+    Returns
+    -------
+    CD : float
+    CL : float
+    Cm : float
+    '''
+    aircraft_dict = copy.deepcopy(engine.aircraft_dict)
+    aircraft_dict["wings"]["horizontal_tail"]["twist"] = engine.tail_twist(x[engine.elevator_index])
+
+    scene_state_dict = copy.deepcopy(engine.scene_state_dict)
+    scene_state_dict["alpha"] = x[engine.aoa_index]                                 # deg
+
+    my_scene = _machupx().Scene(engine.scene_dict)
+    my_scene.add_aircraft(engine.aircraft_name, aircraft_dict, scene_state_dict)
+    if (engine.num_flaps > 0):
+        my_scene.set_aircraft_control_state(control_state = {"flaps1" : engine.deflection_array(x)})
+
+    return engine.coefficients(my_scene.solve_forces(verbose = False))
+
+
+def check_engine_against_rebuild(engine, x_list, tolerance = REBUILD_MATCH_TOLERANCE, print_results = True):
+    '''
+    Evaluates each x array with the engine and with the rebuild path and compares CD, CL, and Cm.
+
+    Parameters
+    ----------
+    engine : EvaluationEngine
+    x_list : list, [array]
+        The x arrays to compare.
+    tolerance : float, optional
+        Largest allowed absolute difference. The default is REBUILD_MATCH_TOLERANCE.
+    print_results : boolean, optional
+        Whether or not to print the differences. The default is True.
+
+    Returns
+    -------
+    max_difference : float
+        Largest absolute difference in CD, CL, or Cm over all x arrays.
+    passed : boolean
+        Whether max_difference is within the tolerance.
+    '''
+    max_difference = 0.0
+    for x in x_list:
+        engine_values = engine.evaluate(x)
+        rebuild_values = rebuild_and_evaluate(engine, x)
+        difference = max(abs(a - b) for a, b in zip(engine_values, rebuild_values))
+        max_difference = max(max_difference, difference)
+        if print_results:
+            print("x: " + str(list(x)) + "  engine (CD, CL, Cm): " + str(engine_values) + "  rebuild: " + str(rebuild_values) + "  diff: " + str(difference))
+
+    passed = max_difference <= tolerance
+    if print_results:
+        print("Max difference: " + str(max_difference) + (" (within " if passed else " (OUTSIDE ") + str(tolerance) + ")")
+    return max_difference, passed
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 11:37:16 2026
+
+@author: justice
+"""
+
+import json
+import queue
+import socket
+import threading
+from collections import deque
+from time import time
+
+'''
+Structured progress events for the optimization.
+
+The optimization used to report only through print calls, so a long sweep could only be
+watched by reading the console. An EventStream passed to pitch_trim_flap_optimize_functional
+(events = ...) gets a dictionary for each of:
+    iteration        every SLSQP iteration: CL, iteration, x, objective (CD*100), constraint
+                     residuals (moment Cm, lift |CL - desired CL|), and evaluations (MachUpX
+                     solves so far)
+    restart          every run_mult_solutions run (from the RestartPolicy): run, objective,
+                     nfev, step (change in the solution), time, success
+    point_finished   every completed CL point: CL, CD, act_CL, Cm, alpha, elevator, x
+Every event also has 'event', 'time' (s since the epoch), and 'sequence' (count per stream).
+The continuation sweep passes the stream through to each CL, and the job runner has its own
+job level events (Ikhana_job_runner.py).
+
+The events go to any number of sinks:
+    RingBufferSink   the last max_events events in memory
+    JSONLSink        one json line per event appended to a file (opened for each event, so
+                     the sink can be sent to worker processes and several processes can share a file)
+    SocketSink       one json line per event sent to a local TCP socket (dropped if nothing is listening)
+    CallbackSink     calls a function with each event
+    QueueSink        puts each event on a queue.Queue (used by stream_events)
+The in-memory sinks only see events from their own process, so for the parallel sweep
+(where each CL runs on a worker process) use a JSONLSink or SocketSink.
+
+stream_events runs a function (for example a sweep) on a thread and yields its events as
+a generator while it runs.
+
+Stopping a run early: a sink (or anything else holding the stream) can call stop(). The next
+iteration callback then stops the optimization and scipy ends the run with the current
+solution (SLSQP by StopIteration from the callback, which needs scipy >= 1.11; trust-constr
+by the callback returning True). A stopped point is not added to the result store or memo,
+and the continuation sweep ends without recording it (so a resumed sweep runs it again).
+'''
+
+class RingBufferSink:
+    '''
+    Keeps the last max_events events in memory.
+
+    Parameters
+    ----------
+    max_events : int, optional
+        Number of events kept. The default is 10000.
+    '''
+    def __init__(self, max_events = 10000):
+        self._events = deque(maxlen = max_events)
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        with self._lock:
+            self._events.append(event)
+
+    def events(self, event_type = None):
+        '''Returns the events kept (only the given type if event_type is given), oldest first.'''
+        with self._lock:
+            return [event for event in self._events if (event_type is None) or (event["event"] == event_type)]
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+
+
+class JSONLSink:
+    '''
+    Appends each event as a json line to filename.
+    '''
+    def __init__(self, filename):
+        self.filename = filename
+
+    def __call__(self, event):
+        with open(self.filename, 'a') as events_file:
+            events_file.write(json.dumps(event, default = _json_default) + "\n")
+
+
+class SocketSink:
+    '''
+    Sends each event as a json line to a local TCP socket. Connects on the first event and
+    after any failure; events that cannot be sent are dropped (the run never waits on a monitor).
+
+    Parameters
+    ----------
+    host : string, optional
+        The default is "127.0.0.1".
+    port : int, optional
+        The default is 8766.
+    timeout : float, optional
+        Connection timeout (s). The default is 0.5.
+    '''
+    def __init__(self, host = "127.0.0.1", port = 8766, timeout = 0.5):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.dropped = 0
+        self._socket = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_socket"] = None
+        return state
+
+    def __call__(self, event):
+        try:
+            if self._socket is None:
+                self._socket = socket.create_connection((self.host, self.port), timeout = self.timeout)
+            self._socket.sendall((json.dumps(event, default = _json_default) + "\n").encode("utf-8"))
+        except OSError:
+            self.dropped += 1
+            self.close()
+
+    def close(self):
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+            self._socket = None
+
+
+class CallbackSink:
+    '''Calls function(event) for each event.'''
+    def __init__(self, function):
+        self.function = function
+
+    def __call__(self, event):
+        self.function(event)
+
+
+class QueueSink:
+    '''Puts each event on a queue.Queue.'''
+    def __init__(self, event_queue = None):
+        self.queue = event_queue if event_queue is not None else queue.Queue()
+
+    def __call__(self, event):
+        self.queue.put(event)
+
+
+def _json_default(value):
+    # numpy arrays and scalars in the events
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+class EventStream:
+    '''
+    Sends structured events to sinks.
+
+    Parameters
+    ----------
+    sinks : list, optional
+        Sinks (any function that takes the event dictionary). The default is None (no sinks).
+    '''
+    def __init__(self, sinks = None):
+        self.sinks = list(sinks) if sinks is not None else []
+        self.stop_requested = False
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def emit(self, event_type, **fields):
+        '''
+        Sends an event to every sink. numpy arrays are converted to lists so every sink gets
+        plain json values.
+        '''
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+        event = {"event" : event_type, "time" : time(), "sequence" : sequence}
+        for name, value in fields.items():
+            event[name] = value.tolist() if hasattr(value, "tolist") else value
+        for sink in self.sinks:
+            sink(event)
+        return event
+
+    def stop(self):
+        '''Asks the optimization to stop at its next iteration.'''
+        self.stop_requested = True
+
+
+def stream_events(function, *args, events = None, **kwargs):
+    '''
+    Runs function(*args, events = stream, **kwargs) on a thread and yields its events as they
+    happen. The last event is 'finished' with the return value as 'result' (or 'error').
+
+        for event in stream_events(continuation_CL_sweep, scene, aircraft, "Ikhana", 2, CL_list, 25.0, -25.0):
+            if event["event"] == "iteration" and event["objective"] > 10.0:
+                ...
+
+    Parameters
+    ----------
+    function : function
+        Takes an events keyword argument (pitch_trim_flap_optimize_functional, continuation_CL_sweep, ...).
+    events : EventStream, optional
+        Stream to use (its other sinks still get the events). The default is None (a new stream).
+    '''
+    stream = events if events is not None else EventStream()
+    sink = stream.add_sink(QueueSink())
+    outcome = {}
+
+    def run():
+        try:
+            outcome["result"] = function(*args, events = stream, **kwargs)
+        except Exception as error:
+            outcome["error"] = error
+        finally:
+            sink.queue.put(None)
+
+    thread = threading.Thread(target = run, daemon = True)
+    thread.start()
+    finished = False
+    try:
+        while True:
+            event = sink.queue.get()
+            if event is None:
+                finished = True
+                break
+            yield event
+    finally:
+        if not finished:
+            stream.stop()    # The caller stopped reading, so stop the run instead of waiting for all of it
+        thread.join()
+        stream.sinks.remove(sink)
+
+    if "error" in outcome:
+        yield {"event" : "finished", "time" : time(), "error" : str(outcome["error"])}
+    else:
+        yield {"event" : "finished", "time" : time(), "result" : outcome.get("result")}
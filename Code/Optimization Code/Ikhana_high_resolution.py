@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 10:52:37 2026
+
+@author: justice
+"""
+
+import numpy as np
+from time import perf_counter
+from Ikhana_camber_optimization_conditional_functional import pitch_trim_flap_optimize_functional
+
+'''
+High resolution mode for large numbers of flaps/control points (20 - 50).
+
+With SLSQP's finite differences every iteration costs num_flaps + 2 MachUpX solves, and
+identifying the full drag Hessian with the lifting-line sensitivities (Ikhana_sensitivities.py)
+takes 1 + 2n + n(n-1)/2 solves, which is 1378 solves at 50 flaps. SLSQP's own dense QP work
+is small next to that at these sizes (n ~ 50), so the MachUpX solves are what has to be cut.
+
+Locality
+    The camber of one flap mostly changes the lift distribution over that flap and its
+    neighbours, so the coupling between two flaps in the induced drag falls off quickly
+    with the distance between them. BandedLiftingLineSensitivities (Ikhana_sensitivities.py)
+    only identifies the drag Hessian entries between flaps within bandwidth of each other
+    (plus every entry involving the elevator and angle of attack, which change the whole
+    load distribution) and treats the rest as zero. That takes the Hessian from O(n^2) to
+    O(n*bandwidth) solves. The banded entries are only identified when the trust-constr
+    restarts ask for the Hessian (see Ikhana_restart_policy.py), so SLSQP iterations only
+    pay for the central difference gradients. Those are still identified at every new x
+    array (1 + 2n solves against SLSQP's n + 1), so high_resolution_optimize only uses the
+    sensitivities when a bandwidth is given, and otherwise uses the gradients given in
+    optimize_kwargs (SLSQP's own, or gradient_workers).
+
+Coarse to fine
+    high_resolution_optimize first solves the problem with a few wide flaps and then
+    doubles the number of flaps level by level (rounding the halved counts up, so any
+    num_flaps gets coarse levels). Each coarse solution is mapped onto the finer flaps
+    (prolongate_flaps, exact when the number of flaps doubles) and is used as the initial
+    guess for the next level. Most of the camber schedule is found on the cheap
+    levels and the fine levels only refine it.
+
+benchmark_flap_scaling in Ikhana_benchmark_suite.py reports how the cost grows with num_flaps.
+'''
+
+DEFAULT_COARSEST_FLAPS = 4
+
+
+def identification_solves(num_flaps, bandwidth = None, full_hessian = False):
+    '''
+    Returns the number of MachUpX solves one identification takes (the gradients only unless a
+    bandwidth is given or full_hessian).
+    '''
+    n = num_flaps + 2
+    if (bandwidth is None) and full_hessian:
+        pairs = n*(n - 1)//2
+    elif bandwidth is None:
+        pairs = 0
+    else:
+        flap_pairs = sum(min(bandwidth, num_flaps - 1 - i) for i in range(num_flaps))
+        pairs = flap_pairs + 2*num_flaps + 1
+    return 1 + 2*n + pairs
+
+
+def prolongate_flaps(x_coarse, fine_flaps):
+    '''
+    Maps a solution x array onto a larger number of equal width flaps. Every fine flap gets the
+    deflection of the coarse flap it lies in (so the camber schedule is unchanged) and the
+    elevator and angle of attack are kept.
+
+    Parameters
+    ----------
+    x_coarse : array, [float]
+        Solution x array with coarse_flaps = len(x_coarse) - 2 flaps.
+    fine_flaps : int
+        Number of flaps to map onto.
+
+    Returns
+    -------
+    x_fine : array, [float]
+        x array of length fine_flaps + 2.
+    '''
+    x_coarse = np.asarray(x_coarse, dtype = np.float64)
+    coarse_flaps = len(x_coarse) - 2
+    x_fine = np.zeros(fine_flaps + 2)
+    if coarse_flaps > 0:
+        centers = (np.arange(fine_flaps) + 0.5)/fine_flaps
+        x_fine[0:fine_flaps] = x_coarse[np.minimum((centers*coarse_flaps).astype(int), coarse_flaps - 1)]
+    x_fine[fine_flaps:] = x_coarse[coarse_flaps:]
+    return x_fine
+
+
+def flap_levels(num_flaps, coarsest_flaps = DEFAULT_COARSEST_FLAPS):
+    '''
+    Returns the numbers of flaps for the coarse to fine levels, halving num_flaps (rounded up) until it
+    is at or below coarsest_flaps (for example 48 -> [3, 6, 12, 24, 48] and 50 -> [4, 7, 13, 25, 50]).
+    '''
+    levels = [num_flaps]
+    while levels[0] > max(coarsest_flaps, 1):
+        levels.insert(0, (levels[0] + 1)//2)
+    return levels
+
+
+def high_resolution_optimize(orig_scene_filename, orig_aircraft_json_filename, aircraft_name, num_flaps, CL_to_set, upDeflBound, lowDeflBound, levels = None, bandwidth = None, initial_defl = None, print_results = True, **optimize_kwargs):
+    '''
+    Coarse to fine optimization for large num_flaps.
+
+    Parameters
+    ----------
+    orig_scene_filename, orig_aircraft_json_filename, aircraft_name, num_flaps, CL_to_set, upDeflBound, lowDeflBound
+        Same as pitch_trim_flap_optimize_functional.
+    levels : list, [int], optional
+        Numbers of flaps for each level, ending with num_flaps. The default is None (flap_levels(num_flaps)).
+    bandwidth : int, optional
+        If given, use the banded lifting-line sensitivities with this bandwidth of the flap-flap drag
+        Hessian (for trust-constr restarts). The default is None (the gradients given in optimize_kwargs).
+    initial_defl : array, [float], optional
+        Initial guess for the coarsest level. The default is None.
+    print_results : boolean, optional
+        Whether or not to print the time for each level. The default is True.
+    **optimize_kwargs
+        Any other keyword arguments for pitch_trim_flap_optimize_functional.
+
+    Returns
+    -------
+    result : tuple
+        The return tuple of pitch_trim_flap_optimize_functional for the finest level.
+    level_times : list, [float]
+        Time (s) taken by each level.
+    '''
+    levels = flap_levels(num_flaps) if levels is None else levels
+    if levels[-1] != num_flaps:
+        raise ValueError("The last level must have num_flaps (" + str(num_flaps) + ") flaps.")
+
+    if bandwidth is not None:
+        optimize_kwargs["central_difference_gradients"] = True
+        optimize_kwargs["sensitivity_bandwidth"] = bandwidth
+    level_times = []
+    x_guess = initial_defl
+    result = None
+    for level_flaps in levels:
+        if (x_guess is not None) and (len(x_guess) != level_flaps + 2):
+            x_guess = prolongate_flaps(x_guess, level_flaps)
+        start = perf_counter()
+        result = pitch_trim_flap_optimize_functional(orig_scene_filename, orig_aircraft_json_filename, aircraft_name, level_flaps, CL_to_set, upDeflBound, lowDeflBound, initial_defl = x_guess, **optimize_kwargs)
+        level_times.append(perf_counter() - start)
+        x_guess = result[7]
+        if print_results:
+            print("High resolution level: " + str(level_flaps) + " flaps, CD = " + str(result[1]) + ", " + "{:.2f}".format(level_times[-1]) + " s")
+
+    return result, level_times
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 09:02:44 2026
+
+@author: justice
+"""
+
+import os
+import sys
+import json
+import subprocess
+
+'''
+Import time budget for the optimization modules.
+
+Every worker process in the pools (parallel sweep, parallel Jacobian, multi-start,
+multi-point, job runner) imports the optimization modules again, so whatever an import
+costs is paid once per worker. Importing used to print the timing banner and register an
+atexit handler (timing.py), pull in matplotlib.pyplot and jsonpickle (the optimizer), and
+star import the CRM airfoil functions (airfoil_functional_creation.py), which are not even
+needed for the Ikhana. Now:
+    - timing.py has no side effects; the Run Code scripts call start_program_log()
+    - matplotlib.pyplot is only imported when a plot is shown
+    - jsonpickle is only needed by the commented out json dump
+    - the CRM modules are only imported by create_CRM_airfoils_function_dict
+    - MachUpX is only imported when the first scene is built
+
+check_import_budget imports each module in IMPORT_BUDGETS in a fresh interpreter, takes the
+fastest of a few runs, and reports a module as over budget if it takes longer than its
+budget (seconds), prints anything, or leaves any of LAZY_MODULES loaded.
+'''
+
+# Module: largest import time (s) in a fresh interpreter. numpy and scipy make up most of the larger budgets.
+IMPORT_BUDGETS = {"timing" : 0.02,
+                  "Ikhana_profiler" : 0.05,
+                  "Ikhana_result_store" : 0.5,
+                  "Ikhana_airfoil_tables" : 0.5,
+                  "airfoil_functional_creation" : 0.5,
+                  "Ikhana_evaluation_engine" : 0.5,
+                  "Ikhana_camber_optimization_conditional_functional" : 1.5,
+                  "Ikhana_parallel_sweep" : 1.5,
+                  "Ikhana_job_runner" : 1.5}
+
+# Modules that must not be loaded just by importing the optimization modules
+LAZY_MODULES = ["matplotlib", "machupX", "jsonpickle", "CRM_main_wing_functions", "CRM_horizontal_stabilizer_functions"]
+
+_MEASURE_CODE = '''
+import sys, json
+from time import perf_counter
+start = perf_counter()
+import {module}
+elapsed = perf_counter() - start
+print("IMPORT_BUDGET_RESULT " + json.dumps({{"time" : elapsed, "lazy_loaded" : [name for name in {lazy} if name in sys.modules]}}))
+'''
+
+
+def measure_import(module, repeats = 3):
+    '''
+    Imports a module in a fresh interpreter (repeats times).
+
+    Returns
+    -------
+    result : dictionary
+        'time' (fastest import, s), 'lazy_loaded' (LAZY_MODULES that were loaded), and 'output'
+        (anything else printed by the import). 'error' instead if the import failed.
+    '''
+    directory = os.path.dirname(os.path.abspath(__file__))
+    code = _MEASURE_CODE.format(module = module, lazy = repr(LAZY_MODULES))
+    best = None
+    for repeat in range(repeats):
+        process = subprocess.run([sys.executable, "-c", code], cwd = directory, capture_output = True, text = True)
+        lines = process.stdout.splitlines()
+        result_lines = [line for line in lines if line.startswith("IMPORT_BUDGET_RESULT ")]
+        if process.returncode != 0 or not result_lines:
+            return {"error" : process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "import failed"}
+        result = json.loads(result_lines[-1][len("IMPORT_BUDGET_RESULT "):])
+        result["output"] = "\n".join(line for line in lines if not line.startswith("IMPORT_BUDGET_RESULT "))
+        if (best is None) or (result["time"] < best["time"]):
+            best = result
+    return best
+
+
+def check_import_budget(budgets = IMPORT_BUDGETS, repeats = 3, print_results = True):
+    '''
+    Measures the import of every module in budgets.
+
+    Returns
+    -------
+    results : dictionary
+        {module: measure_import result, plus 'budget'}
+    violations : list, [string]
+        A description of each module that is over budget, prints on import, loads a lazy module, or fails to import.
+    '''
+    results = {}
+    violations = []
+    for module, budget in budgets.items():
+        result = measure_import(module, repeats)
+        result["budget"] = budget
+        results[module] = result
+        if "error" in result:
+            violations.append(module + ": import failed (" + result["error"] + ")")
+        else:
+            if result["time"] > budget:
+                violations.append(module + ": " + "{:.3f}".format(result["time"]) + " s import, budget " + "{:.3f}".format(budget) + " s")
+            if result["output"]:
+                violations.append(module + ": prints on import")
+            if result["lazy_loaded"]:
+                violations.append(module + ": loads " + ", ".join(result["lazy_loaded"]) + " on import")
+        if print_results:
+            status = ("failed: " + result["error"]) if "error" in result else ("{:.3f}".format(result["time"]) + " s (budget " + "{:.3f}".format(budget) + " s)")
+            print(module.ljust(52) + status)
+
+    if print_results:
+        if violations:
+            print("\n" + str(len(violations)) + " import budget violation(s):")
+            for violation in violations:
+                print("  " + violation)
+        else:
+            print("\nAll imports within budget.")
+    return results, violations
+
+
+if __name__ == "__main__":
+    results, violations = check_import_budget()
+    sys.exit(1 if violations else 0)
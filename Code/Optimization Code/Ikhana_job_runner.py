@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 08:37:50 2026
+
+@author: justice
+"""
+
+import os
+import json
+import uuid
+import asyncio
+import hashlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from timing import secondsToStr
+from Ikhana_parallel_sweep import run_CL_point, CL_output_directory, absolute_path_kwargs, RESULTS_HEADER
+from Ikhana_profiler import Profiler
+
+'''
+Job runner for camber schedule requests, so the Run Code scripts do not have to be run by
+hand one at a time.
+
+A job is a json file (see submit_job) with the scene json, aircraft json, aircraft name,
+num_flaps, CL's (a list or a [start, stop, step] range), the deflection bounds, and any
+other keyword arguments for pitch_trim_flap_optimize_functional. Jobs are put in the queue
+directory, either directly or through the socket server (one json job per line, see
+serve_socket), which writes them into the queue directory too.
+
+JobRunner (asyncio) watches the queue directory:
+    queue/*.json              waiting jobs
+    queue/running/            jobs being run
+    queue/done/               finished jobs, with a summary json of the results table
+    queue/failed/             jobs with at least one CL point that failed, and job files
+                              that could not be read or are missing required fields
+    queue/events.jsonl        progress events (one json per line)
+
+Each CL point of every job is run on one bounded process pool (run_CL_point from
+Ikhana_parallel_sweep.py), so points from different jobs share the cores. Identical jobs
+(same contents) that are waiting or running at the same time are only run once: the
+duplicate is recorded against the original job, and when the original finishes the
+duplicate gets its own summary (with duplicate_of set to the original job_id) so anyone
+waiting on the duplicate's job_id still finds the results. Identical CL points shared by different
+jobs are also only run once. Every point is appended to the common ResultStore
+(Ikhana_result_store.py) in store_directory by the worker that runs it.
+
+Every point is profiled on its worker: the job summary has the merged profile of its
+points ('profile') and JobRunner.profiler has every point the runner ran.
+
+Progress events (job_accepted, job_duplicate, job_failed, point_started, point_finished,
+point_failed, job_finished) are written to events.jsonl and passed to on_event if one is given.
+'''
+
+JOB_EXTENSION = ".json"
+EVENTS_FILENAME = "events.jsonl"
+REQUIRED_JOB_FIELDS = ["scene_filename", "aircraft_json", "aircraft_name", "num_flaps", "upDeflBound", "lowDeflBound"]
+
+
+def job_CL_list(job):
+    '''Returns the CL's of a job (from 'CL_list' or a 'CL_range' of [start, stop, step], stop included).'''
+    if "CL_list" in job:
+        return [float(CL) for CL in job["CL_list"]]
+    start, stop, step = job["CL_range"]
+    num_points = int(round((stop - start)/step)) + 1
+    return [round(start + step*index, 10) for index in range(num_points)]
+
+
+def validate_job(job):
+    '''
+    Checks that a loaded job has every field needed to run it and returns its CL's.
+    Raises ValueError for a job that cannot be run.
+    '''
+    if not isinstance(job, dict):
+        raise ValueError("A job must be a json object, not " + type(job).__name__)
+    missing = [name for name in REQUIRED_JOB_FIELDS if name not in job]
+    if ("CL_list" not in job) and ("CL_range" not in job):
+        missing.append("CL_list or CL_range")
+    if missing:
+        raise ValueError("Job is missing " + ", ".join(missing))
+    if not isinstance(job.get("optimize_kwargs", {}), dict):
+        raise ValueError("The job's optimize_kwargs must be a json object")
+    try:
+        CL_list = job_CL_list(job)
+    except (ValueError, TypeError, ZeroDivisionError) as error:
+        raise ValueError("Invalid CL_list or CL_range: " + str(error))
+    if len(CL_list) == 0:
+        raise ValueError("The job has no CL's")
+    return CL_list
+
+
+def job_key(job):
+    '''Returns a hash of the job contents (used to find duplicate jobs).'''
+    contents = {name : value for name, value in job.items() if name not in ["job_id", "submitted"]}
+    return hashlib.sha256(json.dumps(contents, sort_keys = True).encode("utf-8")).hexdigest()
+
+
+def point_key(job, CL):
+    '''Returns a hash of one CL point of a job (used to run identical points only once).'''
+    contents = {name : value for name, value in job.items() if name not in ["job_id", "submitted", "CL_list", "CL_range"]}
+    contents["CL"] = CL
+    return hashlib.sha256(json.dumps(contents, sort_keys = True).encode("utf-8")).hexdigest()
+
+
+def _write_json_atomic(filename, contents):
+    # Write to a temporary file and rename so the queue never sees a partial job
+    directory = os.path.dirname(os.path.abspath(filename))
+    temporary_filename = os.path.join(directory, "." + os.path.basename(filename) + "." + uuid.uuid4().hex + ".tmp")
+    with open(temporary_filename, 'w') as output:
+        json.dump(contents, output, indent = 4)
+    os.replace(temporary_filename, filename)
+
+
+def submit_job(queue_directory, scene_filename, aircraft_json, aircraft_name, num_flaps, CL_list, upDeflBound, lowDeflBound, **optimize_kwargs):
+    '''
+    Puts a job in the queue directory.
+
+    Parameters
+    ----------
+    queue_directory : string
+        The runner's queue directory.
+    scene_filename, aircraft_json, aircraft_name, num_flaps, upDeflBound, lowDeflBound
+        Same as pitch_trim_flap_optimize_functional (the json filenames are made absolute).
+    CL_list : list, [float] or tuple
+        Lift coefficients, or a (start, stop, step) range.
+    **optimize_kwargs
+        Any other json serializable keyword arguments for pitch_trim_flap_optimize_functional
+        (memo and airfoil_tables directories are made absolute).
+
+    Returns
+    -------
+    job_id : string
+    '''
+    job = {"job_id" : uuid.uuid4().hex,
+           "submitted" : secondsToStr(),
+           "scene_filename" : os.path.abspath(scene_filename),
+           "aircraft_json" : os.path.abspath(aircraft_json),
+           "aircraft_name" : aircraft_name,
+           "num_flaps" : int(num_flaps),
+           "upDeflBound" : float(upDeflBound),
+           "lowDeflBound" : float(lowDeflBound),
+           "optimize_kwargs" : absolute_path_kwargs(optimize_kwargs)}
+    if isinstance(CL_list, tuple):
+        job["CL_range"] = list(CL_list)
+    else:
+        job["CL_list"] = [float(CL) for CL in CL_list]
+
+    os.makedirs(queue_directory, exist_ok = True)
+    _write_json_atomic(os.path.join(queue_directory, job["job_id"] + JOB_EXTENSION), job)
+    return job["job_id"]
+
+
+class JobRunner:
+    '''
+    Runs the jobs in a queue directory on a bounded process pool.
+
+    Parameters
+    ----------
+    queue_directory : string
+        Directory the jobs are put in.
+    store_directory : string
+        Directory of the common ResultStore every CL point is written to.
+    output_directory : string, optional
+        Directory for the output files of the CL points (each job gets its own directory). The default is None (queue_directory/output).
+    max_workers : int, optional
+        Number of worker processes. The default is None (number of CPUs).
+    poll_interval : float, optional
+        Time (s) between checks of the queue directory. The default is 2.0.
+    on_event : function, optional
+        Called with each progress event (dictionary). The default is None.
+    '''
+    def __init__(self, queue_directory, store_directory, output_directory = None, max_workers = None, poll_interval = 2.0, on_event = None):
+        self.queue_directory = os.path.abspath(queue_directory)
+        self.store_directory = os.path.abspath(store_directory)
+        self.output_directory = os.path.abspath(output_directory) if output_directory is not None else os.path.join(self.queue_directory, "output")
+        self.max_workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+        self.poll_interval = poll_interval
+        self.on_event = on_event
+        for directory in [self.queue_directory, self._directory("running"), self._directory("done"), self._directory("failed"), self.output_directory]:
+            os.makedirs(directory, exist_ok = True)
+
+        self._executor = None
+        self._active_jobs = {}     # job key: job_id of the job being run
+        self._points = {}          # point key: asyncio task running the point
+        self._duplicate_files = {} # job_id of a duplicate job: its file in running
+        self.profiler = Profiler()  # Merged profile of every point run
+        self._tasks = set()
+        self._stopping = False
+
+    def _directory(self, name):
+        return os.path.join(self.queue_directory, name)
+
+    def emit(self, event, **fields):
+        '''Records a progress event.'''
+        fields["event"] = event
+        fields["time"] = secondsToStr()
+        with open(os.path.join(self.queue_directory, EVENTS_FILENAME), 'a') as events_file:
+            events_file.write(json.dumps(fields) + "\n")
+        if self.on_event is not None:
+            self.on_event(fields)
+
+    def _waiting_jobs(self):
+        # Job files in the queue directory, oldest first
+        names = [name for name in os.listdir(self.queue_directory) if name.endswith(JOB_EXTENSION) and not name.startswith(".")]
+        filenames = [os.path.join(self.queue_directory, name) for name in names]
+        return sorted(filenames, key = os.path.getmtime)
+
+    async def _run_point(self, job, CL):
+        # Runs one CL point on the process pool
+        optimize_kwargs = dict(job.get("optimize_kwargs", {}))
+        optimize_kwargs["result_store"] = self.store_directory
+        point_directory = CL_output_directory(os.path.join(self.output_directory, job["job_id"]), job["num_flaps"], CL)
+        loop = asyncio.get_running_loop()
+        point_result = await loop.run_in_executor(self._executor, run_CL_point, job["scene_filename"], job["aircraft_json"], job["aircraft_name"], job["num_flaps"], CL,
+                                                  job["upDeflBound"], job["lowDeflBound"], point_directory, optimize_kwargs)
+        self.profiler.merge(point_result[3])    # Once per point run, however many jobs share it
+        return point_result
+
+    async def _point(self, job, CL):
+        # Shares the run of identical CL points between jobs
+        key = point_key(job, CL)
+        task = self._points.get(key)
+        if task is None:
+            self.emit("point_started", job_id = job["job_id"], CL = CL)
+            task = asyncio.ensure_future(self._run_point(job, CL))
+            self._points[key] = task
+            task.add_done_callback(lambda finished_task: self._points.pop(key, None))
+        try:
+            results_row, deflections, solution_array, profile_stats = await asyncio.shield(task)
+        except Exception as error:
+            self.emit("point_failed", job_id = job["job_id"], CL = CL, error = str(error))
+            return None
+        self.emit("point_finished", job_id = job["job_id"], CL = CL, CD = float(results_row[1]), Cm = float(results_row[2]), alpha = float(results_row[3]), elevator = float(results_row[4]), act_CL = float(results_row[5]))
+        return results_row, solution_array, profile_stats
+
+    async def _run_job(self, job, running_filename, key):
+        # Runs every CL point of a job and writes the summary
+        CL_list = job_CL_list(job)
+        point_results = await asyncio.gather(*[self._point(job, CL) for CL in CL_list])
+
+        results = np.full((len(CL_list), 6), np.nan)
+        solutions = []
+        job_profiler = Profiler()
+        for index, point_result in enumerate(point_results):
+            if point_result is not None:
+                results[index,:] = point_result[0]
+                solutions.append(np.asarray(point_result[1]).tolist())
+                job_profiler.merge(point_result[2])
+            else:
+                solutions.append(None)
+        failed = any(point_result is None for point_result in point_results)
+
+        summary = dict(job)
+        summary["finished"] = secondsToStr()
+        summary["results_header"] = RESULTS_HEADER
+        summary["results"] = np.where(np.isnan(results), None, results).tolist()
+        summary["solutions"] = solutions
+        summary["profile"] = job_profiler.stats()["stages"]
+        summary["duplicates"] = job.get("duplicates", [])
+        final_directory = self._directory("failed" if failed else "done")
+        _write_json_atomic(os.path.join(final_directory, job["job_id"] + JOB_EXTENSION), summary)
+        os.remove(running_filename)
+
+        # Each duplicate gets the original's results under its own job_id
+        for duplicate_id in summary["duplicates"]:
+            duplicate_summary = dict(summary)
+            duplicate_summary["job_id"] = duplicate_id
+            duplicate_summary["duplicate_of"] = job["job_id"]
+            duplicate_summary["duplicates"] = []
+            _write_json_atomic(os.path.join(final_directory, duplicate_id + JOB_EXTENSION), duplicate_summary)
+            duplicate_filename = self._duplicate_files.pop(duplicate_id, None)
+            if (duplicate_filename is not None) and os.path.exists(duplicate_filename):
+                os.remove(duplicate_filename)
+
+        self._active_jobs.pop(key, None)
+        self.emit("job_finished", job_id = job["job_id"], failed = failed, duplicates = summary["duplicates"])
+
+    def _accept(self, filename):
+        # Moves a waiting job into running (or records it as a duplicate) and starts it
+        try:
+            with open(filename) as job_file:
+                job = json.load(job_file)
+            CL_list = validate_job(job)
+        except (OSError, ValueError) as error:
+            os.replace(filename, os.path.join(self._directory("failed"), os.path.basename(filename)))
+            self.emit("job_failed", filename = filename, error = str(error))
+            return
+
+        job.setdefault("job_id", os.path.splitext(os.path.basename(filename))[0])
+        key = job_key(job)
+        running_filename = os.path.join(self._directory("running"), os.path.basename(filename))
+        if key in self._active_jobs:
+            # Identical job already running: record it on the original job. It waits in running until the original
+            # finishes (so a restart puts it back in the queue) and then gets the original's summary.
+            original_id = self._active_jobs[key]["job_id"]
+            self._active_jobs[key].setdefault("duplicates", []).append(job["job_id"])
+            os.replace(filename, running_filename)
+            self._duplicate_files[job["job_id"]] = running_filename
+            self.emit("job_duplicate", job_id = job["job_id"], duplicate_of = original_id)
+            return
+
+        os.replace(filename, running_filename)
+        self._active_jobs[key] = job
+        self.emit("job_accepted", job_id = job["job_id"], num_points = len(CL_list))
+        task = asyncio.ensure_future(self._run_job(job, running_filename, key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _requeue_running(self):
+        # Jobs left in running by a runner that stopped are put back in the queue
+        for name in os.listdir(self._directory("running")):
+            if name.endswith(JOB_EXTENSION):
+                os.replace(os.path.join(self._directory("running"), name), os.path.join(self.queue_directory, name))
+
+    async def run(self, stop_when_empty = False):
+        '''
+        Runs the jobs in the queue directory.
+
+        Parameters
+        ----------
+        stop_when_empty : boolean, optional
+            Whether to return once the queue is empty and every job has finished (otherwise keep watching
+            the queue until stop is called). The default is False.
+        '''
+        self._requeue_running()
+        self._stopping = False
+        self._executor = ProcessPoolExecutor(max_workers = self.max_workers)
+        try:
+            while not self._stopping:
+                for filename in self._waiting_jobs():
+                    self._accept(filename)
+                if stop_when_empty and not self._tasks and not self._waiting_jobs():
+                    break
+                await asyncio.sleep(self.poll_interval)
+            if self._tasks:
+                await asyncio.gather(*list(self._tasks))
+        finally:
+            self._executor.shutdown(wait = True)
+            self._executor = None
+
+    def stop(self):
+        '''Stops watching the queue (jobs already started are finished).'''
+        self._stopping = True
+
+    async def serve_socket(self, host = "127.0.0.1", port = 8765):
+        '''
+        Accepts jobs over a socket: each line sent is a json job with the same fields as the
+        arguments of submit_job ('CL_list' or 'CL_range', and 'optimize_kwargs'). The job is
+        written into the queue directory and the job_id is sent back.
+        '''
+        async def handle(reader, writer):
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    job = json.loads(line.decode("utf-8"))
+                    CL_list = tuple(job["CL_range"]) if "CL_range" in job else job["CL_list"]
+                    job_id = submit_job(self.queue_directory, job["scene_filename"], job["aircraft_json"], job["aircraft_name"], job["num_flaps"], CL_list,
+                                        job["upDeflBound"], job["lowDeflBound"], **job.get("optimize_kwargs", {}))
+                    reply = {"job_id" : job_id}
+                except (ValueError, KeyError, TypeError) as error:
+                    reply = {"error" : str(error)}
+                writer.write((json.dumps(reply) + "\n").encode("utf-8"))
+                await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def run_job_runner(queue_directory, store_directory, max_workers = None, socket_port = None, stop_when_empty = False, print_events = True):
+    '''
+    Starts a JobRunner (and the socket server if socket_port is given) and runs it until it is stopped
+    (or until the queue is empty with stop_when_empty).
+    '''
+    def print_event(event):
+        print(event["time"] + "  " + event["event"] + "  " + json.dumps({name : value for name, value in event.items() if name not in ["event", "time"]}))
+
+    runner = JobRunner(queue_directory, store_directory, max_workers = max_workers, on_event = print_event if print_events else None)
+
+    async def main():
+        if socket_port is None:
+            await runner.run(stop_when_empty)
+            return
+        server = asyncio.ensure_future(runner.serve_socket(port = socket_port))
+        try:
+            await runner.run(stop_when_empty)
+        finally:
+            server.cancel()
+
+    asyncio.run(main())
+    return runner
@@ -178,6 +178,50 @@ def double_repeat_and_join(a, b):
     return join(a, b)
 
 
+class DeflectionArrayBuilder:
+    '''Fast version of double_repeat_and_join for use inside the optimization. 
+    double_repeat_and_join builds a Python list and then fills a new array one value 
+    at a time on every call. This class builds the span fraction column once and 
+    keeps the index of the x value that belongs in each row, so each call is a single 
+    vectorized assignment into a preallocated buffer:
+        
+        row:       0     1     2     3     4    ...   2n-1   2n
+        value:     0.0   x[0]  x[0]  x[1]  x[1] ...   x[n-1] x[n-1]
+    
+    The result is the same as double_repeat_and_join(span_frac_array, x[0:n]).
+
+    Parameters
+    ----------
+    span_frac_array : list or array, the span fraction array from create_span_fraction_array
+    '''
+    def __init__(self, span_frac_array):
+        num_rows = len(span_frac_array)
+        self.num_control_points = (num_rows - 1)//2
+        self.buffer = np.zeros((num_rows,2))
+        self.buffer[:,0] = span_frac_array
+        self.index = np.repeat(np.arange(self.num_control_points), 2)
+        
+    def build(self, x):
+        '''Writes the deflections for the first num_control_points values of x into 
+        the buffer and returns it. The buffer is reused, so the returned array is 
+        overwritten by the next call (use build_copy to keep the result).
+
+        Parameters
+        ----------
+        x : list or array, the x array from scipy.optimize.minimize
+
+        Returns
+        -------
+        buffer : 2D array, [span fraction, deflection] for rectangular flaps
+        '''
+        self.buffer[1:,1] = np.asarray(x)[self.index]
+        return self.buffer
+    
+    def build_copy(self, x):
+        '''Same as build, but returns a new array that is not overwritten later.'''
+        return self.build(x).copy()
+
+
 def span_frac_to_cos_cluster(doubled_span_frac):
     '''This function takes the span fraction list and pulls out only the distinct 
     span fraction locations, minus 0 and 1. This is needed so that the span fraction
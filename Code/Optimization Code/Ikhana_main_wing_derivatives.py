@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:40:19 2026
+
+@author: justice
+"""
+from math import pi
+from Ikhana_main_wing_functions import get_Ikhana_CL, get_CL_alpha, get_CD0, get_CD1, get_CD2, get_Cm_alpha
+'''
+Analytic derivatives of the functional airfoil model in Ikhana_main_wing_functions.py.
+The fits from Hunsaker and Phillips
+"Aerodynamic Shape Optimization of Morphing Wings at Multiple Flight Conditions"
+AIAA SciTech Forum
+9-13 January 2017, Grapevine Texas
+55th AIAA Aerospace Sciences Meeting
+are linear or quadratic in camber, so their derivatives are closed form.
+
+The first set of functions are the derivatives of the individual fits with respect to
+camber as a percentage of the chord (the same c used by the fits). The second set are the
+derivatives of the section CL, CD, and Cm that MachUpX sees, taking the same keyword
+arguments as get_Ikhana_CL, get_Ikhana_CD, and get_Ikhana_Cm (alpha and
+trailing_flap_deflection in radians, floats or arrays). Those derivatives are per radian
+of alpha and per radian of trailing flap deflection.
+'''
+
+RAD_TO_DEG = 180/pi
+
+##############################################################################
+# Derivatives of the fits with respect to camber as a percentage of the chord.
+def get_dalpha_L0_dc(c):
+    '''
+    Derivative of get_alpha_L0 (linear fit) with respect to camber.
+
+    Parameters
+    ----------
+    c : float
+        camber as percentage of the chord.
+
+    Returns
+    -------
+    float
+        d(alpha L0)/dc in radians per percent camber.
+
+    '''
+    return -0.0183 + 0.0*c                          # radians
+
+def get_dCD0_dc(c):
+    '''
+    Derivative of get_CD0 (parabolic fit) with respect to camber.
+
+    Parameters
+    ----------
+    c : float
+        camber as percentage of the chord.
+
+    Returns
+    -------
+    float
+        dCD0/dc per percent camber.
+
+    '''
+    return 0.0004*c - (4e-5)                        # unitless coefficient
+
+def get_dCD1_dc(c):
+    '''
+    Derivative of get_CD1 (linear fit) with respect to camber.
+
+    Parameters
+    ----------
+    c : float
+        camber as percentage of the chord.
+
+    Returns
+    -------
+    float
+        dCD1/dc per percent camber.
+
+    '''
+    return -0.003 + 0.0*c                           # unitless coefficient
+
+def get_dCD2_dc(c):
+    '''
+    Derivative of get_CD2 (parabolic fit) with respect to camber.
+
+    Parameters
+    ----------
+    c : float
+        camber as percentage of the chord.
+
+    Returns
+    -------
+    float
+        dCD2/dc per percent camber.
+
+    '''
+    return 0.0002*c - 0.0004                        # unitless coefficient
+
+def get_dCm_L0_dc(c):
+    '''
+    Derivative of get_Cm_L0 (linear fit) with respect to camber.
+
+    Parameters
+    ----------
+    c : float
+        camber as percentage of the chord.
+
+    Returns
+    -------
+    float
+        dCm_L0/dc per percent camber.
+
+    '''
+    return -0.0253 + 0.0*c                          # unitless coefficient
+
+##############################################################################
+# Derivatives of the section coefficients seen by MachUpX.
+def get_Ikhana_CL_derivatives(**kws):
+    '''
+    Returns
+    -------
+    dCL_dalpha : float or array
+        1/radians
+    dCL_dflap : float or array
+        per radian of trailing flap deflection
+    '''
+    c1 = kws.get("trailing_flap_deflection", 0)     # radians
+    c1_deg = c1*RAD_TO_DEG                          # degrees (treating as camber)
+
+    CLa = get_CL_alpha(c1_deg)                      # 1/radians
+
+    # CL = CLa*(alpha - aL0(c)) with CLa constant in camber
+    return CLa + 0.0*c1, -CLa*get_dalpha_L0_dc(c1_deg)*RAD_TO_DEG
+
+def get_Ikhana_CD_derivatives(**kws):
+    '''
+    get_Ikhana_CD uses the CL from get_Ikhana_CL() (no arguments), so the section CD
+    does not depend on alpha.
+
+    Returns
+    -------
+    dCD_dalpha : float or array
+        1/radians (always 0)
+    dCD_dflap : float or array
+        per radian of trailing flap deflection
+    '''
+    c1 = kws.get("trailing_flap_deflection", 0)     # radians
+    CL = get_Ikhana_CL()                            # unitless coefficient
+    c1_deg = c1*RAD_TO_DEG                          # degrees (treating as camber)
+
+    dCD_dc = get_dCD0_dc(c1_deg) + get_dCD1_dc(c1_deg)*CL + get_dCD2_dc(c1_deg)*CL*CL
+    return 0.0*c1, dCD_dc*RAD_TO_DEG
+
+def get_Ikhana_Cm_derivatives(**kws):
+    '''
+    Returns
+    -------
+    dCm_dalpha : float or array
+        1/radians
+    dCm_dflap : float or array
+        per radian of trailing flap deflection
+    '''
+    c1 = kws.get("trailing_flap_deflection", 0)     # radians
+    c1_deg = c1*RAD_TO_DEG                          # degrees (treating as camber)
+
+    Cma = get_Cm_alpha(c1_deg)                      # 1/radians
+
+    # Cm = CmL0(c) + Cma*(alpha - aL0(c)) with Cma constant in camber
+    return Cma + 0.0*c1, (get_dCm_L0_dc(c1_deg) - Cma*get_dalpha_L0_dc(c1_deg))*RAD_TO_DEG
+
+def get_Ikhana_section_CD_camber_derivative(c):
+    '''
+    Derivative of the section CD with respect to camber (percent chord, the same value as
+    the flap deflection in degrees that is in the x array).
+
+    Parameters
+    ----------
+    c : float or array
+        camber as percentage of the chord.
+
+    Returns
+    -------
+    float or array
+        dCD/dc per percent camber.
+    '''
+    CL = get_Ikhana_CL()                            # unitless coefficient
+    return get_dCD0_dc(c) + get_dCD1_dc(c)*CL + get_dCD2_dc(c)*CL*CL
+
+def get_Ikhana_section_CD_camber(c):
+    '''
+    Section CD as a function of camber (percent chord). Same value as get_Ikhana_CD.
+    '''
+    CL = get_Ikhana_CL()                            # unitless coefficient
+    return get_CD0(c) + get_CD1(c)*CL + get_CD2(c)*CL*CL
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:20:36 2026
+
+@author: justice
+"""
+from math import pi
+from Ikhana_main_wing_functions import (get_Ikhana_CL, get_alpha_L0, get_CL_alpha, get_CD0, get_CD1, get_CD2,
+                                        get_Cm_L0, get_Cm_alpha)
+
+'''
+Vectorized versions of the functional airfoil callbacks in Ikhana_main_wing_functions.py.
+
+MachUpX calls the CL, CD, and Cm functions for the control points on every iteration of
+the nonlinear solver. The original functions convert the camber to degrees and then call
+six small helper functions (get_alpha_L0, get_CD0, ...) on each call. All of the fits are
+linear or quadratic in camber and linear in alpha, so they can be collapsed into a single
+polynomial with the coefficients worked out once when this file is imported:
+
+    CL = CL_alpha*alpha + CL_c*c1 + CL_0
+    CD = CD_cc*c1^2 + CD_c*c1 + CD_0
+    Cm = Cm_alpha*alpha + Cm_c*c1 + Cm_0
+
+where c1 is the trailing flap deflection in radians (treated as camber) and alpha is in
+radians, the same inputs MachUpX passes to the original functions. The functions take
+either floats or NumPy arrays of alpha and trailing_flap_deflection (one value per
+section) and evaluate all of the sections in one pass.
+
+**Note: get_Ikhana_CD calls get_Ikhana_CL() without any arguments, so the section CL used
+in the drag polar is the CL at zero alpha and zero camber. The vectorized CD keeps that
+exact behavior so that the two paths give the same results.
+'''
+
+RAD_TO_DEG = 180/pi
+
+# --- Lift: CLa*(alpha - aL0(c)), aL0 linear in camber (deg) ---
+_CLa = get_CL_alpha(0.0)                                                # 1/radians
+_aL0_0 = get_alpha_L0(0.0)                                              # radians
+_aL0_slope = (get_alpha_L0(1.0) - _aL0_0)*RAD_TO_DEG                    # radians per radian of flap
+
+CL_ALPHA = _CLa                                                         # 1/radians
+CL_C = -_CLa*_aL0_slope                                                 # 1/radians of flap
+CL_0 = -_CLa*_aL0_0                                                     # unitless coefficient
+
+# --- Drag: CD0(c) + CD1(c)*CL + CD2(c)*CL^2 with CL from get_Ikhana_CL() (see note above) ---
+_CL_for_CD = get_Ikhana_CL()                                            # unitless coefficient
+
+def _quadratic_coefficients(fit):
+    # Returns (a, b, c) of a*c_deg^2 + b*c_deg + c for a fit that is at most quadratic in camber (deg)
+    f0 = fit(0.0)
+    f1 = fit(1.0)
+    fm1 = fit(-1.0)
+    return (f1 + fm1)/2.0 - f0, (f1 - fm1)/2.0, f0
+
+_CD_fit = [sum(coeffs) for coeffs in zip(_quadratic_coefficients(get_CD0),
+                                         [_CL_for_CD*k for k in _quadratic_coefficients(get_CD1)],
+                                         [_CL_for_CD*_CL_for_CD*k for k in _quadratic_coefficients(get_CD2)])]
+
+CD_CC = _CD_fit[0]*RAD_TO_DEG*RAD_TO_DEG                                # per radian^2 of flap
+CD_C = _CD_fit[1]*RAD_TO_DEG                                            # per radian of flap
+CD_0 = _CD_fit[2]                                                       # unitless coefficient
+
+# --- Moment: CmL0(c) + Cma*(alpha - aL0(c)) ---
+_Cma = get_Cm_alpha(0.0)                                                # 1/radians
+_CmL0_0 = get_Cm_L0(0.0)                                                # unitless coefficient
+_CmL0_slope = (get_Cm_L0(1.0) - _CmL0_0)*RAD_TO_DEG                     # per radian of flap
+
+CM_ALPHA = _Cma                                                         # 1/radians
+CM_C = _CmL0_slope - _Cma*_aL0_slope                                    # per radian of flap
+CM_0 = _CmL0_0 - _Cma*_aL0_0                                            # unitless coefficient
+
+
+def get_Ikhana_CL_vectorized(**kws):
+    c1 = kws.get("trailing_flap_deflection", 0)     # radians (float or array)
+    alpha = kws.get("alpha", 0)                     # radians (float or array)
+
+    return CL_ALPHA*alpha + CL_C*c1 + CL_0          # unitless coefficient
+
+def get_Ikhana_CD_vectorized(**kws):
+    c1 = kws.get("trailing_flap_deflection", 0)     # radians (float or array)
+
+    return (CD_CC*c1 + CD_C)*c1 + CD_0              # unitless coefficient
+
+def get_Ikhana_Cm_vectorized(**kws):
+    c1 = kws.get("trailing_flap_deflection", 0)     # radians (float or array)
+    alpha = kws.get("alpha", 0)                     # radians (float or array)
+
+    return CM_ALPHA*alpha + CM_C*c1 + CM_0          # unitless coefficient
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 17:21:38 2026
+
+@author: justice
+"""
+
+import os
+import numpy as np
+import scipy as sp
+from timing import secondsToStr
+from Ikhana_evaluation_engine import load_optimization_inputs, engine_kwargs
+from Ikhana_evaluation_cache import EvaluationCache
+from Ikhana_batch_evaluator import BatchEvaluator
+from Ikhana_parallel_jacobian import cost_function_values, DEFAULT_FD_STEP
+from Ikhana_join import create_span_fraction_array, DeflectionArrayBuilder
+from Ikhana_profiler import Profiler
+from Ikhana_restart_policy import RestartPolicy
+
+'''
+Multi-point optimization: one camber schedule for several CL's.
+
+pitch_trim_flap_optimize_functional finds the best flap deflections for one CL, but the
+aircraft can only carry a few flap schedules, so the schedule has to be good over the whole
+mission. multipoint_optimize minimizes the weighted drag over a set of CL targets with one
+shared set of flap deflections and a separate elevator and angle of attack for each point:
+
+    design vector z = [flap_1 ... flap_n, elevator_1, alpha_1, ..., elevator_P, alpha_P]
+    objective       = sum over points of weight_p*CD_p*100 (weights normalized to sum to 1)
+    constraints     = Cm_p = 0 and CL_p = CL target_p at every point (2P equality constraints)
+
+The x array of point p for the single point EvaluationEngine is [flaps, elevator_p, alpha_p],
+so each point is an ordinary MachUpX solve. All of the point solves for a design vector are
+sent as one batch to a pool of worker processes, each worker holding its own EvaluationEngine
+(Ikhana_batch_evaluator.py), and the results are kept in an
+EvaluationCache per (x array, CL) so the objective and the constraints share the solves.
+
+The gradients are forward differences on the same pool with the structure of the problem
+used: a flap step changes every point (P solves), but the elevator or angle of attack of
+point p only changes point p (1 solve). A gradient therefore costs n*P + 2P solves instead of
+(n + 2P)*P, all sent at once.
+
+In twist mode each worker rebuilds its scene whenever it gets a point with a different
+elevator than the last one it solved, so elevator_mode = "control" is much cheaper here.
+'''
+
+RESULTS_HEADER = 'CL   CD   Cm   alpha   elevator   act_CL   weight'
+
+
+class MultipointProblem:
+    '''
+    Weighted drag objective and per point trim constraints for the multi-point optimization.
+
+    Parameters
+    ----------
+    engine_kwargs : dictionary
+        Keyword arguments for EvaluationEngine (from engine_kwargs in Ikhana_evaluation_engine.py).
+        Each worker builds its own engine from these.
+    num_flaps : int
+        Number of flaps/control points.
+    CL_targets : list, [float]
+        Lift coefficient of each point.
+    weights : list, [float]
+        Weight of each point (normalized to sum to 1).
+    max_workers : int, optional
+        Number of worker processes. The default is None (number of CPUs).
+    cache_size : int, optional
+        Number of point solves kept in the evaluation cache. The default is 1024.
+    profiler : Profiler, optional
+        Profiler for the evaluations and gradients. The default is None (a disabled profiler).
+    step : float, optional
+        Absolute finite difference step. The default is DEFAULT_FD_STEP (same as SLSQP).
+    '''
+    def __init__(self, engine_kwargs, num_flaps, CL_targets, weights, max_workers = None, cache_size = 1024, profiler = None, step = DEFAULT_FD_STEP):
+        self.num_flaps = num_flaps
+        self.CL_targets = np.asarray(CL_targets, dtype = np.float64)
+        self.num_points = len(self.CL_targets)
+        weights = np.asarray(weights, dtype = np.float64)
+        self.weights = weights/np.sum(weights)
+        self.length_z_array = num_flaps + 2*self.num_points
+        self.upper_flap_bound = None
+        self.step = step
+        self.cache = EvaluationCache(cache_size)
+        self.profiler = profiler if profiler is not None else Profiler(enabled = False)
+        self.point_solves = 0
+        self.gradient_evaluations = 0
+        self._last_jacobian_key = None
+        self._last_jacobian = None
+        self._batch_evaluator = BatchEvaluator(engine_kwargs, max_workers = max_workers, profiler = self.profiler)
+
+    def point_x(self, z, point):
+        '''Returns the single point x array [flaps, elevator, alpha] of a point.'''
+        z = np.asarray(z, dtype = np.float64)
+        return np.concatenate((z[0:self.num_flaps], z[self.num_flaps + 2*point:self.num_flaps + 2*point + 2]))
+
+    def _solve(self, x_arrays):
+        # Solves the x arrays as one batch on the worker pool
+        self.point_solves += len(x_arrays)
+        return self._batch_evaluator.map(x_arrays)
+
+    def evaluate(self, z):
+        '''
+        Returns the (CD, CL, Cm) of every point for the design vector (P x 3 array). Only the
+        points that are not in the cache are solved, all at once.
+        '''
+        values = [None]*self.num_points
+        missing = []
+        for point in range(self.num_points):
+            values[point] = self.cache.get(self.point_x(z, point), self.CL_targets[point])
+            if values[point] is None:
+                missing.append(point)
+
+        if missing:
+            with self.profiler.stage("multipoint_evaluation"):
+                x_arrays = [self.point_x(z, point) for point in missing]
+                for point, x, point_values in zip(missing, x_arrays, self._solve(x_arrays)):
+                    self.cache.put(x, self.CL_targets[point], point_values)
+                    values[point] = point_values
+        return np.array(values, dtype = np.float64)
+
+    def _cost_values(self, values):
+        # [drag (CD*100), lift (|CL - CL target|), moment (Cm)] for each point (P x 3)
+        return np.array([cost_function_values(values[point], self.CL_targets[point]) for point in range(self.num_points)])
+
+    def objective(self, z):
+        '''Weighted drag, sum of weight_p*CD_p*100.'''
+        return float(np.dot(self.weights, self._cost_values(self.evaluate(z))[:,0]))
+
+    def constraints(self, z):
+        '''Trim constraints [Cm_1, |CL_1 - CL target_1|, ..., Cm_P, |CL_P - CL target_P|] (all = 0).'''
+        return self._cost_values(self.evaluate(z))[:, [2, 1]].ravel()
+
+    def jacobian(self, z):
+        '''
+        Forward difference gradients, with every perturbed point solve sent to the pool at once.
+
+        Returns
+        -------
+        objective_gradient : array, [float]
+            Gradient of the weighted drag.
+        constraint_jacobian : array, [[float]]
+            (2P x len(z)) Jacobian of the constraints.
+        '''
+        z = np.asarray(z, dtype = np.float64)
+        key = z.tobytes()
+        if key == self._last_jacobian_key:
+            return self._last_jacobian
+
+        with self.profiler.stage("multipoint_gradient"):
+            base = self._cost_values(self.evaluate(z))
+
+            # Flap steps go backwards if a forward step would leave the upper bound
+            steps = np.full(self.length_z_array, self.step)
+            if self.upper_flap_bound is not None:
+                steps[0:self.num_flaps][z[0:self.num_flaps] + self.step > self.upper_flap_bound] *= -1.0
+
+            # (index of z stepped, point) for every perturbed solve
+            perturbations = [(index, point) for index in range(self.num_flaps) for point in range(self.num_points)]
+            perturbations += [(self.num_flaps + 2*point + offset, point) for point in range(self.num_points) for offset in range(2)]
+            x_arrays = []
+            for index, point in perturbations:
+                z_step = z.copy()
+                z_step[index] += steps[index]
+                x_arrays.append(self.point_x(z_step, point))
+            perturbed_values = self._solve(x_arrays)
+
+            objective_gradient = np.zeros(self.length_z_array)
+            constraint_jacobian = np.zeros((2*self.num_points, self.length_z_array))
+            for (index, point), values in zip(perturbations, perturbed_values):
+                difference = (cost_function_values(values, self.CL_targets[point]) - base[point])/steps[index]
+                objective_gradient[index] += self.weights[point]*difference[0]
+                constraint_jacobian[2*point, index] = difference[2]
+                constraint_jacobian[2*point + 1, index] = difference[1]
+
+        self.gradient_evaluations += 1
+        self._last_jacobian_key = key
+        self._last_jacobian = (objective_gradient, constraint_jacobian)
+        return self._last_jacobian
+
+    def objective_jac(self, z):
+        return self.jacobian(z)[0]
+
+    def constraint_jac(self, z):
+        return self.jacobian(z)[1]
+
+    def close(self):
+        '''Shuts down the worker pool.'''
+        self._batch_evaluator.close()
+
+    def __str__(self):
+        return ("Multi-point problem: " + str(self.num_points) + " points, " + str(self.point_solves) + " point solves, "
+                + str(self.gradient_evaluations) + " gradient evaluations\n" + str(self.cache))
+
+
+def multipoint_optimize(orig_scene_filename, orig_aircraft_json_filename, aircraft_name, num_flaps, CL_targets, upDeflBound, lowDeflBound, weights = None, initial_design = None, run_mult_solutions = False, dragType = "Total", elevator_mode = "twist", warm_start = False, max_workers = None, cache_size = 1024, restart_policy = None, airfoil_tables = None, write_results = True, print_results = True, profiler = None):
+    '''
+    Finds the one set of flap deflections with the lowest weighted drag over several CL's, with
+    each CL pitch trimmed by its own elevator and angle of attack (see the notes at the top of the file).
+
+    Parameters
+    ----------
+    orig_scene_filename, orig_aircraft_json_filename, aircraft_name, num_flaps, upDeflBound, lowDeflBound
+        Same as pitch_trim_flap_optimize_functional.
+    CL_targets : list, [float]
+        Lift coefficient of each point.
+    weights : list, [float], optional
+        Weight of each point (for example the fraction of the mission flown at that CL). The default is None (equal weights).
+    initial_design : array, [float], optional
+        Initial design vector (num_flaps + 2*len(CL_targets)), or a single point x array (num_flaps + 2) whose
+        elevator and angle of attack are used for every point. The default is None (all zeros).
+    run_mult_solutions : boolean, optional
+        Whether or not to restart the optimization from its solution (limited by restart_policy). The default is False.
+    dragType : string, optional
+        What type of Drag to use ('Total', 'Inviscid', or 'Viscous'). The default is "Total".
+    elevator_mode : string, optional
+        How the elevator is applied, 'twist' or 'control' (see the note at the top of the file). The default is "twist".
+    warm_start : boolean, optional
+        Whether or not to warm start the nonlinear solves on each worker. Adds solver noise to the
+        finite difference gradients (see Ikhana_evaluation_engine.py). The default is False.
+    max_workers : int, optional
+        Number of worker processes. The default is None (number of CPUs).
+    cache_size : int, optional
+        Number of point solves kept in the evaluation cache. The default is 1024.
+    restart_policy : RestartPolicy, optional
+        Limits for the run_mult_solutions restarts. The default is None (RestartPolicy()).
+    airfoil_tables : AirfoilTableDatabase or string, optional
+        Airfoil table database (see Ikhana_airfoil_tables.py). The default is None.
+    write_results : boolean, optional
+        Whether or not to write the results to a text file. The default is True.
+    print_results : boolean, optional
+        Whether or not to print the results. The default is True.
+    profiler : Profiler, optional
+        Profiler for the evaluations, gradients, and optimization. The default is None (a new profiler).
+
+    Returns
+    -------
+    results : array, [[float]]
+        (P x 7) array of CL target, CD, Cm, alpha, elevator, act_CL, and weight for each point.
+    deflection_array : array, [float]
+        The shared flap deflection distribution ([] if num_flaps = 0).
+    weighted_CD : float
+        The weighted drag coefficient.
+    solution.x : array, [float]
+        The solution design vector.
+    '''
+    if (dragType != "Total") and (dragType != "Inviscid") and (dragType != "Viscous"):
+        raise ValueError("Invalid dragType entered! Drag Type must be either 'Total' (default), 'Inviscid', or 'Viscous'.")
+
+    num_points = len(CL_targets)
+    weights = np.ones(num_points) if weights is None else np.asarray(weights, dtype = np.float64)
+    if len(weights) != num_points:
+        raise ValueError("weights must have one entry for each CL target")
+    if profiler is None:
+        profiler = Profiler()
+
+    # Initial design vector
+    length_z_array = num_flaps + 2*num_points
+    if initial_design is None:
+        z = np.zeros(length_z_array)
+    elif len(initial_design) == length_z_array:
+        z = np.array(initial_design, dtype = np.float64)
+    elif len(initial_design) == num_flaps + 2:
+        z = np.concatenate((np.asarray(initial_design[0:num_flaps], dtype = np.float64), np.tile(np.asarray(initial_design[num_flaps:], dtype = np.float64), num_points)))
+    else:
+        raise ValueError("initial_design must have length " + str(length_z_array) + " (or " + str(num_flaps + 2) + " for a single point x array)")
+
+    scene_dict, aircraft_dict, scene_state_dict = load_optimization_inputs(orig_scene_filename, orig_aircraft_json_filename, aircraft_name, num_flaps, airfoil_tables)
+    problem = MultipointProblem(engine_kwargs(scene_dict, aircraft_dict, scene_state_dict, aircraft_name, num_flaps, dragType, elevator_mode, warm_start), num_flaps, CL_targets, weights, max_workers = max_workers, cache_size = cache_size, profiler = profiler)
+    problem.upper_flap_bound = upDeflBound
+
+    # Flaps are bounded, the elevators and angles of attack are not
+    lowerBoundsArray = np.full(length_z_array, -np.inf)
+    upperBoundsArray = np.full(length_z_array, np.inf)
+    lowerBoundsArray[0:num_flaps] = lowDeflBound
+    upperBoundsArray[0:num_flaps] = upDeflBound
+    bnds = sp.optimize.Bounds(lowerBoundsArray, upperBoundsArray, keep_feasible = True)
+    constr = {"type" : "eq", "fun" : problem.constraints, "jac" : problem.constraint_jac}
+
+    def count_iteration(zk, *args):
+        profiler.count("slsqp_iterations")
+
+    def minimize(z_start, method = "SLSQP"):
+        # SLSQP only (the restart policy may ask for trust-constr, which needs the identified Hessian)
+        with profiler.stage("optimization"):
+            return sp.optimize.minimize(problem.objective, z_start, method = "SLSQP", jac = problem.objective_jac, bounds = bnds, constraints = constr, callback = count_iteration)
+
+    try:
+        if run_mult_solutions:
+            active_restart_policy = restart_policy if restart_policy is not None else RestartPolicy(print_results = print_results)
+            solution = active_restart_policy.run(minimize, minimize, z)
+        else:
+            solution = minimize(z)
+
+        values = problem.evaluate(solution.x)
+    finally:
+        problem.close()
+
+    results = np.zeros((num_points, 7))
+    for point in range(num_points):
+        results[point,:] = [CL_targets[point], values[point,0], values[point,2], solution.x[num_flaps + 2*point + 1], solution.x[num_flaps + 2*point], values[point,1], problem.weights[point]]
+    weighted_CD = float(np.dot(problem.weights, values[:,0]))
+
+    deflection_array = []
+    if num_flaps > 0:
+        deflection_array = DeflectionArrayBuilder(create_span_fraction_array(num_flaps)).build_copy(solution.x[0:num_flaps + 2])    # deg
+
+    if print_results:
+        print(str(solution))
+        print("Weighted CD: " + str(weighted_CD))
+        print(RESULTS_HEADER)
+        print(str(results))
+        print(str(problem))
+        print(str(profiler))
+
+    if write_results:
+        partitioned_file_name = os.path.basename(orig_scene_filename).partition('.')
+        output_title = str(num_flaps) + "_FLAPS_" + partitioned_file_name[0] + "_MULTIPOINT_" + str(num_points) + "_CL__" + secondsToStr()
+        np.savetxt(output_title, results, header = RESULTS_HEADER + "\nWeighted CD: " + str(weighted_CD) + "\nSolution: " + " ".join(str(value) for value in solution.x))
+        if num_flaps > 0:
+            np.savetxt(output_title + "__FLAP_DEFLECTIONS", deflection_array, header = "Span Loc   Deflection (deg)")
+
+    return results, deflection_array, weighted_CD, solution.x
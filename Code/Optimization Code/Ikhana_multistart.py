@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:26:05 2026
+
+@author: justice
+"""
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from Ikhana_camber_optimization_conditional_functional import pitch_trim_flap_optimize_functional
+from Ikhana_surrogate import latin_hypercube
+from Ikhana_result_store import ResultStore
+from Ikhana_parallel_sweep import absolute_path_kwargs
+from Ikhana_profiler import Profiler
+
+'''
+Multi-start search for the minimum drag at one CL.
+
+SLSQP from a single initial guess can end up in different solution valleys (this is why
+the 2 flap Run Code script went up and then back down the CL's). Instead of hunting for
+the valleys by hand, multi_start_optimize runs SLSQP from several diverse initial guesses
+at once on a process pool:
+    - the previous solutions given (for example the solution at the neighbouring CL) first,
+    - then a Latin hypercube sample of the flap bounds and the elevator/alpha start ranges.
+
+As each start finishes, its solution is put into a basin: starts whose x arrays are within
+basin_tolerance (deg) of each other are the same basin, and the basin keeps its lowest CD.
+Only trimmed solutions (CL and Cm within feasibility_tolerance) count. Once agreement starts
+have landed in the lowest drag basin, the starts that have not begun yet are cancelled.
+Starts that are already running cannot be cancelled, so by default the pool has fewer
+workers than starts (half of them, but at least agreement) and the early stop saves the
+starts that are still waiting. With max_workers >= num_starts every start runs at once and
+the early stop saves nothing.
+
+The best result is returned in the same form as pitch_trim_flap_optimize_functional, along
+with every distinct basin found. Each start writes its output files to its own directory.
+The starts are not given the result store: only the best result is appended to it, by the
+parent process, so the latest record for the CL is the best basin and not the last start.
+'''
+
+DEFAULT_ELEVATOR_START_RANGE = (-10.0, 10.0)  # deg
+DEFAULT_ALPHA_START_RANGE = (-2.0, 10.0)      # deg
+
+
+def generate_starts(num_starts, num_flaps, upDeflBound, lowDeflBound, previous_solutions = None, elevator_range = DEFAULT_ELEVATOR_START_RANGE, alpha_range = DEFAULT_ALPHA_START_RANGE, seed = None):
+    '''
+    Creates the initial x arrays for the starts.
+
+    Parameters
+    ----------
+    num_starts : int
+        Total number of starts.
+    num_flaps : int
+        Number of flaps/control points.
+    upDeflBound : float
+        Upper bound on the flap deflections.
+    lowDeflBound : float
+        Lower bound on the flap deflections.
+    previous_solutions : list, [array], optional
+        x arrays to start from first (flaps clipped to the bounds). The default is None.
+    elevator_range : tuple, optional
+        Range (deg) the elevator starts are sampled from. The default is DEFAULT_ELEVATOR_START_RANGE.
+    alpha_range : tuple, optional
+        Range (deg) the angle of attack starts are sampled from. The default is DEFAULT_ALPHA_START_RANGE.
+    seed : int, optional
+        Random seed for the Latin hypercube. The default is None.
+
+    Returns
+    -------
+    starts : array, [[float]]
+        (num_starts x num_flaps + 2) array of initial x arrays.
+    '''
+    starts = []
+    for solution in (previous_solutions if previous_solutions is not None else []):
+        if (solution is not None) and (len(solution) == num_flaps + 2) and (len(starts) < num_starts):
+            start = np.array(solution, dtype = np.float64)
+            start[0:num_flaps] = np.clip(start[0:num_flaps], lowDeflBound, upDeflBound)
+            starts.append(start)
+
+    num_samples = num_starts - len(starts)
+    if num_samples > 0:
+        lower = np.array([lowDeflBound]*num_flaps + [elevator_range[0], alpha_range[0]])
+        upper = np.array([upDeflBound]*num_flaps + [elevator_range[1], alpha_range[1]])
+        starts.extend(latin_hypercube(num_samples, lower, upper, seed))
+    return np.array(starts)
+
+
+def run_start(scene_filename, aircraft_json, aircraft_name, num_flaps, CL, upDeflBound, lowDeflBound, initial_defl, start_directory, optimize_kwargs):
+    '''
+    Runs pitch_trim_flap_optimize_functional from one initial guess inside start_directory, with
+    its own Profiler. This is the function that is run on the worker processes.
+
+    Returns
+    -------
+    result : tuple
+        The return tuple of pitch_trim_flap_optimize_functional (with an absolute distributions filename),
+        or whatever it returned if that is not a result tuple.
+    profile_stats : dictionary
+        The stats of the start's Profiler (see Ikhana_profiler.py).
+    '''
+    os.makedirs(start_directory, exist_ok = True)
+    working_directory = os.getcwd()
+    os.chdir(start_directory)
+    profiler = Profiler()
+    try:
+        result = pitch_trim_flap_optimize_functional(scene_filename, aircraft_json, aircraft_name, num_flaps, CL, upDeflBound, lowDeflBound, initial_defl = initial_defl, profiler = profiler, **optimize_kwargs)
+    finally:
+        os.chdir(working_directory)
+    if isinstance(result, tuple):
+        result = (os.path.join(start_directory, result[0]),) + tuple(result[1:])
+    return result, profiler.stats()
+
+
+def _add_to_basins(basins, result, start_index, basin_tolerance):
+    # Adds a finished start to the basin it belongs to (or a new basin). Returns the basin.
+    x = np.asarray(result[7], dtype = np.float64)
+    for basin in basins:
+        if np.max(np.abs(basin["x"] - x)) <= basin_tolerance:
+            basin["count"] += 1
+            basin["starts"].append(start_index)
+            if result[1] < basin["CD"]:
+                basin["CD"] = float(result[1])
+                basin["x"] = x
+                basin["result"] = result
+            return basin
+    basin = {"CD" : float(result[1]), "x" : x, "count" : 1, "starts" : [start_index], "result" : result}
+    basins.append(basin)
+    return basin
+
+
+def multi_start_optimize(scene_filename, aircraft_json, aircraft_name, num_flaps, CL, upDeflBound, lowDeflBound, num_starts = 8, previous_solutions = None, max_workers = None, agreement = 3, basin_tolerance = 0.5, feasibility_tolerance = 1e-3, output_directory = None, seed = 0, print_results = True, result_store = None, profiler = None, **optimize_kwargs):
+    '''
+    Runs SLSQP from num_starts initial guesses in parallel and returns the lowest drag trimmed solution.
+
+    Parameters
+    ----------
+    scene_filename, aircraft_json, aircraft_name, num_flaps, CL, upDeflBound, lowDeflBound
+        Same as pitch_trim_flap_optimize_functional.
+    num_starts : int, optional
+        Number of starts. The default is 8.
+    previous_solutions : list, [array], optional
+        x arrays used as the first starts (see generate_starts). The default is None.
+    max_workers : int, optional
+        Number of worker processes. The default is None (number of CPUs, but no more than half of the starts
+        or agreement, whichever is larger, so the early stop has starts left to cancel).
+    agreement : int, optional
+        Stop once this many starts have landed in the lowest drag basin (None to always run every start). The default is 3.
+    basin_tolerance : float, optional
+        Largest difference (deg) between two solutions in the same basin. The default is 0.5.
+    feasibility_tolerance : float, optional
+        A start only counts if its CL is within this of CL and |Cm| is at most this. The default is 1e-3.
+    output_directory : string, optional
+        Directory in which each start gets its own output directory. The default is None (current directory).
+    seed : int, optional
+        Random seed for the Latin hypercube starts. The default is 0.
+    print_results : boolean, optional
+        Whether or not to print each start as it finishes. The default is True.
+    result_store : ResultStore or string, optional
+        If given, the best result is appended to this ResultStore, or to a ResultStore in this directory
+        (without the spanwise distributions, which are in its distributions file). The default is None.
+    profiler : Profiler, optional
+        Profiler the stage counters of every start that finished are merged into. The default is None.
+    **optimize_kwargs
+        Any other keyword arguments for pitch_trim_flap_optimize_functional.
+
+    Returns
+    -------
+    result : tuple
+        The return tuple of pitch_trim_flap_optimize_functional for the best start (None if no start was trimmed).
+    basins : list, [dictionary]
+        The distinct basins found, lowest CD first. Each has 'CD', 'x', 'count' (number of starts that
+        landed in it), 'starts' (their indices), and 'result'.
+    '''
+    if output_directory is None:
+        output_directory = os.getcwd()
+    output_directory = os.path.abspath(output_directory)
+
+    # Workers change directory, so the input files need absolute paths
+    scene_filename = os.path.abspath(scene_filename)
+    aircraft_json = os.path.abspath(aircraft_json)
+    optimize_kwargs = absolute_path_kwargs(optimize_kwargs)
+
+    dragType = optimize_kwargs.get("dragType", "Total")
+    if (dragType != "Total") and (dragType != "Inviscid") and (dragType != "Viscous"):
+        raise ValueError("Invalid dragType entered! Drag Type must be either 'Total' (default), 'Inviscid', or 'Viscous'.")
+
+    starts = generate_starts(num_starts, num_flaps, upDeflBound, lowDeflBound, previous_solutions, seed = seed)
+    if max_workers is None:
+        max_workers = min(os.cpu_count() or 1, len(starts) if agreement is None else max(agreement, len(starts)//2))
+
+    basins = []
+    finished = 0
+    executor = ProcessPoolExecutor(max_workers = max_workers)
+    try:
+        futures = {}
+        for index, start in enumerate(starts):
+            start_directory = os.path.join(output_directory, str(num_flaps) + "_FLAPS_CL_" + str(CL) + "_START_" + str(index))
+            futures[executor.submit(run_start, scene_filename, aircraft_json, aircraft_name, num_flaps, CL, upDeflBound, lowDeflBound, start, start_directory, optimize_kwargs)] = index
+
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                result, profile_stats = future.result()
+            except Exception as error:
+                if print_results:
+                    print("Start " + str(index) + " failed: " + str(error))
+                continue
+            finished += 1
+            if profiler is not None:
+                profiler.merge(profile_stats)
+            if not isinstance(result, tuple):
+                if print_results:
+                    print("Start " + str(index) + " returned no result")
+                continue
+
+            trimmed = (abs(result[2] - CL) <= feasibility_tolerance) and (abs(result[3]) <= feasibility_tolerance)
+            if print_results:
+                print("Start " + str(index) + ": CD = " + str(result[1]) + ("" if trimmed else " (not trimmed)"))
+            if not trimmed:
+                continue
+
+            _add_to_basins(basins, result, index, basin_tolerance)
+            best_basin = min(basins, key = lambda basin: basin["CD"])
+            if (agreement is not None) and (best_basin["count"] >= agreement):
+                if print_results:
+                    print(str(agreement) + " starts agree on the minimum, cancelling the remaining starts")
+                break
+    finally:
+        executor.shutdown(wait = True, cancel_futures = True)
+
+    basins.sort(key = lambda basin: basin["CD"])
+    if print_results:
+        print("Multi-start: " + str(finished) + " of " + str(len(starts)) + " starts run, " + str(len(basins)) + " distinct basins")
+        for basin in basins:
+            print("    CD = " + str(basin["CD"]) + " (" + str(basin["count"]) + " starts)")
+
+    best = basins[0]["result"] if basins else None
+
+    # Append only the best start, from here (the store path is resolved in this directory, not a start directory)
+    if (result_store is not None) and (best is not None):
+        if not isinstance(result_store, ResultStore):
+            result_store = ResultStore(result_store)
+        optimizer_stats = {"num_starts" : len(starts),
+                           "starts_run" : finished,
+                           "basins" : [{"CD" : basin["CD"], "count" : basin["count"], "starts" : basin["starts"]} for basin in basins],
+                           "distributions_filename" : best[0]}
+        result_store.append(aircraft_name, num_flaps, CL, dragType, best[7], best[1], best[2], best[3], best[4], best[5], best[6], optimizer_stats)
+    return best, basins
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:05:51 2026
+
+@author: justice
+"""
+
+import numpy as np
+from Ikhana_batch_evaluator import BatchEvaluator
+
+'''
+When no jac is given, SLSQP estimates the gradient of the objective and of each
+constraint with serial forward differences: one MachUpX solve per entry of the x array,
+one after the other on a single core. With 8 - 16 flaps this is the large majority of
+the run time.
+
+The ParallelJacobian in this file does the same forward differences, but all of the
+perturbed x arrays are solved as one batch on a pool of worker processes
+(Ikhana_batch_evaluator.py). Each worker keeps its own EvaluationEngine (see
+Ikhana_evaluation_engine.py) so the scene is not rebuilt for every perturbation. The
+drag, lift, and moment all come out of the same set of solves, so the objective gradient
+and both constraint Jacobians only cost one set of perturbed solves per x array.
+
+The differences are taken on the exact values returned by twist_cost_function
+(CD*100, Cm, |CL - desired_CL|) with the same absolute step SLSQP uses, so the gradients
+match what SLSQP would have calculated serially. If a step would leave the bounds the
+step is taken backwards instead.
+'''
+
+# Absolute finite difference step used by scipy's SLSQP
+DEFAULT_FD_STEP = 1.4901161193847656e-08
+
+def cost_function_values(values, desired_CL):
+    '''
+    Converts (CD, CL, Cm) into the values returned by twist_cost_function for each flag.
+
+    Returns
+    -------
+    values : array, [float]
+        [drag (CD*100), lift (|CL - desired_CL|), moment (Cm)]
+    '''
+    CD, CL, Cm = values
+    return np.array([CD*100.0, abs(CL - desired_CL), Cm])
+
+
+class ParallelJacobian:
+    '''
+    Forward difference gradients of the drag objective and the lift/moment constraints,
+    with all of the perturbed MachUpX solves done at once on a worker pool.
+
+    Parameters
+    ----------
+    engine_kwargs : dictionary
+        Keyword arguments for EvaluationEngine (from engine_kwargs in Ikhana_evaluation_engine.py).
+        Each worker builds its own engine from these.
+    base_evaluate : function
+        Called as base_evaluate(x, desired_CL) and returns (CD, CL, Cm) for the unperturbed x array.
+        This should go through the evaluation cache since SLSQP has always just evaluated that x array.
+    max_workers : int, optional
+        Number of worker processes. The default is None (number of CPUs).
+    lower_bounds : array, [float], optional
+        Lower bounds on the x array. The default is None.
+    upper_bounds : array, [float], optional
+        Upper bounds on the x array. The default is None.
+    step : float, optional
+        Absolute finite difference step. The default is DEFAULT_FD_STEP (same as SLSQP).
+    profiler : Profiler, optional
+        Profiler the workers' stage counters are merged into. The default is None.
+    '''
+    def __init__(self, engine_kwargs, base_evaluate, max_workers = None, lower_bounds = None, upper_bounds = None, step = DEFAULT_FD_STEP, profiler = None):
+        self.base_evaluate = base_evaluate
+        self.lower_bounds = lower_bounds
+        self.upper_bounds = upper_bounds
+        self.step = step
+        self.gradient_evaluations = 0
+        self.perturbed_solves = 0
+        self._batch_evaluator = BatchEvaluator(engine_kwargs, max_workers = max_workers, profiler = profiler)
+        self._last_key = None
+        self._last_jacobian = None
+
+    def _steps(self, x):
+        # Forward steps, switched to backward steps where a forward step would leave the bounds
+        steps = np.full(len(x), self.step)
+        if self.upper_bounds is not None:
+            backward = (x + steps) > self.upper_bounds
+            if self.lower_bounds is not None:
+                backward &= (x - steps) >= self.lower_bounds
+            steps[backward] *= -1.0
+        return steps
+
+    def jacobian(self, x, desired_CL):
+        '''
+        Returns the forward difference Jacobian of [drag, lift, moment] (as returned by
+        twist_cost_function) with respect to the x array. The result for the last x array
+        is kept so the objective and both constraints share one set of solves.
+
+        Returns
+        -------
+        jacobian : array, [[float]]
+            (3 x len(x)) array. Row 0 is the drag objective, row 1 the lift constraint, row 2 the moment constraint.
+        '''
+        x = np.asarray(x, dtype = np.float64)
+        key = (x.tobytes(), float(desired_CL))
+        if key == self._last_key:
+            return self._last_jacobian
+
+        base_values = cost_function_values(self.base_evaluate(x, desired_CL), desired_CL)
+
+        steps = self._steps(x)
+        perturbed_x = np.tile(x, (len(x), 1))
+        perturbed_x[np.arange(len(x)), np.arange(len(x))] += steps
+
+        # All of the perturbed solves as one batch
+        perturbed_values = self._batch_evaluator.evaluate(perturbed_x)
+
+        jacobian = np.zeros((3, len(x)))
+        for index, values in enumerate(perturbed_values):
+            jacobian[:,index] = (cost_function_values(values, desired_CL) - base_values) / steps[index]
+
+        self.gradient_evaluations += 1
+        self.perturbed_solves += len(perturbed_x)
+        self._last_key = key
+        self._last_jacobian = jacobian
+        return jacobian
+
+    def objective_jac(self, x, desired_CL, flag = "drag"):
+        '''Gradient of the drag objective (CD*100). Same arguments as twist_cost_function.'''
+        return self.jacobian(x, desired_CL)[0]
+
+    def constraint_jac(self, x, desired_CL, flag = "drag"):
+        '''Gradient of the lift or moment constraint (given by flag). Same arguments as twist_cost_function.'''
+        jacobian = self.jacobian(x, desired_CL)
+        if flag == "lift":
+            return jacobian[1]
+        elif flag == "moment":
+            return jacobian[2]
+        return jacobian[0]
+
+    def close(self):
+        '''Shuts down the worker pool.'''
+        self._batch_evaluator.close()
+
+    def __str__(self):
+        return ("Parallel Jacobian: " + str(self.gradient_evaluations) + " gradient evaluations, "
+                + str(self.perturbed_solves) + " perturbed solves")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:48:22 2026
+
+@author: justice
+"""
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from Ikhana_camber_optimization_conditional_functional import pitch_trim_flap_optimize_functional
+from Ikhana_profiler import Profiler
+
+'''
+The Run Code scripts used to loop through CL = 0.1 - 0.9 one CL at a time, even though
+each call to pitch_trim_flap_optimize_functional is completely independent when no
+initial guess is passed between CL's. This file fans the CL's out over a process pool
+so a full sweep takes about as long as the slowest single CL (given enough cores).
+
+Each CL is run inside its own output directory so the text, F_M_*.json, and
+distributions_* files from different workers never collide (the filenames are only
+timestamped to the second). The scene and aircraft json filenames, and the directories
+given as strings for result_store, memo, and airfoil_tables (PATH_KWARGS), are made
+absolute before the workers change directory, so every CL shares one store/memo.
+
+The results are collected into the same results array layout used by the Run Code scripts:
+    CL   CD   Cm   alpha   elevator   act_CL
+
+Every CL is profiled on its worker and the stage counters are merged into the profiler
+given to parallel_CL_sweep, for one breakdown of the whole sweep (the stage times are
+summed over the workers, so they can add up to more than the wall time).
+'''
+
+RESULTS_HEADER = 'CL   CD   Cm   alpha   elevator   act_CL'
+
+# Keyword arguments of pitch_trim_flap_optimize_functional that can be given as a directory
+PATH_KWARGS = ["result_store", "memo", "airfoil_tables"]
+
+
+def absolute_path_kwargs(optimize_kwargs):
+    '''
+    Returns a copy of optimize_kwargs with the PATH_KWARGS given as strings made absolute (in the
+    current directory), for workers that run in a different directory.
+    '''
+    optimize_kwargs = dict(optimize_kwargs)
+    for name in PATH_KWARGS:
+        if isinstance(optimize_kwargs.get(name), str):
+            optimize_kwargs[name] = os.path.abspath(optimize_kwargs[name])
+    return optimize_kwargs
+
+
+def CL_output_directory(output_directory, num_flaps, CL):
+    '''
+    Returns the output directory used for a single CL in the sweep.
+    '''
+    return os.path.join(output_directory, str(num_flaps) + "_FLAPS_CL_" + str(CL))
+
+
+def run_CL_point(scene_filename, aircraft_json, aircraft_name, num_flaps, CL, upDeflBound, lowDeflBound, point_directory, optimize_kwargs):
+    '''
+    Runs pitch_trim_flap_optimize_functional for one CL inside point_directory, with its own
+    Profiler. This is the function that is run on the worker processes.
+
+    Returns
+    -------
+    results_row : array, [float]
+        CL, CD, Cm, alpha, elevator, act_CL
+    deflections : array, [[float], [float]]
+        The flap deflection distribution ([] if num_flaps = 0).
+    solution_array : array, [float]
+        The solution x array.
+    profile_stats : dictionary
+        The stats of the point's Profiler (see Ikhana_profiler.py).
+    '''
+    os.makedirs(point_directory, exist_ok = True)
+    start_directory = os.getcwd()
+    os.chdir(point_directory)
+    profiler = Profiler()
+    try:
+        dist_filename, CD, act_CL, act_Cm, aoa, elevator, deflections, solution_array = pitch_trim_flap_optimize_functional(scene_filename, aircraft_json, aircraft_name, num_flaps, CL, upDeflBound, lowDeflBound, profiler = profiler, **optimize_kwargs)
+    finally:
+        os.chdir(start_directory)
+
+    results_row = np.array([CL, CD, act_Cm, aoa, elevator, act_CL])
+    return results_row, deflections, solution_array, profiler.stats()
+
+
+def parallel_CL_sweep(scene_filename, aircraft_json, aircraft_name, num_flaps, CL_list, upDeflBound, lowDeflBound, max_workers = None, output_directory = None, profiler = None, **optimize_kwargs):
+    '''
+    Runs pitch_trim_flap_optimize_functional for every CL in CL_list on a process pool.
+
+    Parameters
+    ----------
+    scene_filename : string
+        Filename of the aircraft scene json.
+    aircraft_json : string
+        Filename of the aircraft json.
+    aircraft_name : string
+        Name of the aircraft as given for the 'tag' in the aircraft scene json.
+    num_flaps : int
+        Desired number of flaps/control points to be used.
+    CL_list : list, [float]
+        Lift coefficients to optimize.
+    upDeflBound : float
+        Upper bound on the flap deflections.
+    lowDeflBound : float
+        Lower bound on the flap deflections.
+    max_workers : int, optional
+        Number of worker processes. The default is None (number of CPUs, but no more than len(CL_list)).
+    output_directory : string, optional
+        Directory in which each CL gets its own output directory. The default is None (current directory).
+    profiler : Profiler, optional
+        Profiler the stage counters of every CL are merged into. The default is None.
+    **optimize_kwargs
+        Any other keyword arguments for pitch_trim_flap_optimize_functional (run_mult_solutions, dragType, ...).
+
+    Returns
+    -------
+    results : array, [[float]]
+        (len(CL_list) x 6) array of CL, CD, Cm, alpha, elevator, act_CL in the order of CL_list.
+    all_deflections : list, [array]
+        The flap deflection distribution for each CL.
+    solution_arrays : list, [array]
+        The solution x array for each CL.
+    '''
+    if output_directory is None:
+        output_directory = os.getcwd()
+    output_directory = os.path.abspath(output_directory)
+
+    # Workers change directory, so the input files need absolute paths
+    scene_filename = os.path.abspath(scene_filename)
+    aircraft_json = os.path.abspath(aircraft_json)
+    optimize_kwargs = absolute_path_kwargs(optimize_kwargs)
+
+    if max_workers is None:
+        max_workers = min(os.cpu_count() or 1, len(CL_list))
+
+    results = np.zeros((len(CL_list),6))
+    all_deflections = [None]*len(CL_list)
+    solution_arrays = [None]*len(CL_list)
+
+    with ProcessPoolExecutor(max_workers = max_workers) as executor:
+        futures = []
+        for CL in CL_list:
+            point_directory = CL_output_directory(output_directory, num_flaps, CL)
+            futures.append(executor.submit(run_CL_point, scene_filename, aircraft_json, aircraft_name, num_flaps, CL, upDeflBound, lowDeflBound, point_directory, optimize_kwargs))
+
+        # Collect in CL_list order so the results array lines up with the CL's
+        for index, future in enumerate(futures):
+            results[index,:], all_deflections[index], solution_arrays[index], profile_stats = future.result()
+            if profiler is not None:
+                profiler.merge(profile_stats)
+            print("---------- Finished CL: " + str(CL_list[index]) + " ----------")
+
+    return results, all_deflections, solution_arrays
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:15:52 2026
+
+@author: justice
+"""
+
+import csv
+import json
+from time import perf_counter
+
+'''
+Counters and timers for the stages of the optimization. timing.py only gives the total
+run time, so there was no way to tell where the time in a CL sweep actually goes.
+
+A Profiler keeps, for every named stage, the number of calls, the total time, and the
+longest single call. The stages recorded by the EvaluationEngine and
+pitch_trim_flap_optimize_functional are:
+    scene_construction           mx.Scene(...)
+    add_aircraft                 scene.add_aircraft(...)
+    aircraft_overlay             aircraft dictionary with the tail twist (twist mode)
+    set_aircraft_state           angle of attack
+    deflection_array             building the flaps1 deflection distribution
+    set_aircraft_control_state   flap deflections (and elevator in control mode)
+    solve_forces                 scene.solve_forces(...)
+    airfoil_CL/CD/Cm             functional airfoil callbacks called by MachUpX
+    cost_function:<flag>         twist_cost_function for 'drag', 'lift', and 'moment'
+    slsqp_iterations             SLSQP iterations (count only)
+    optimization                 each scipy.optimize.minimize call
+
+Each timed stage costs two perf_counter calls and a dictionary update, so the profiler
+is cheap enough to leave on. Worker processes (gradient_workers, the parallel sweep, the
+multi-start search, and the job runner) each profile their own solves and send back
+stats(), which the parent adds to its profiler with merge. The counters can be written out with to_json or to_csv at
+the end of a run.
+'''
+
+CSV_HEADER = ["stage", "calls", "total_time", "mean_time", "max_time"]
+
+
+class _Timer:
+    # Context manager used by Profiler.stage
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.record(self.name, perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    '''
+    Call counts and timings for named stages.
+
+    Parameters
+    ----------
+    enabled : boolean, optional
+        Whether or not to record anything. A disabled profiler can still be passed around. The default is True.
+    '''
+    def __init__(self, enabled = True):
+        self.enabled = enabled
+        self.start_time = perf_counter()
+        self._stages = {}    # name: [calls, total time (s), max time (s)]
+
+    def record(self, name, elapsed, calls = 1):
+        '''Adds calls and elapsed time (s) to a stage.'''
+        if not self.enabled:
+            return
+        stage = self._stages.get(name)
+        if stage is None:
+            self._stages[name] = [calls, elapsed, elapsed]
+        else:
+            stage[0] += calls
+            stage[1] += elapsed
+            if elapsed > stage[2]:
+                stage[2] = elapsed
+
+    def count(self, name, calls = 1):
+        '''Counts calls to a stage without timing it.'''
+        self.record(name, 0.0, calls)
+
+    def stage(self, name):
+        '''
+        Returns a context manager that times the code inside of it as one call to the stage.
+
+            with profiler.stage("solve_forces"):
+                scene.solve_forces()
+        '''
+        return _Timer(self, name)
+
+    def wrap(self, function, name):
+        '''Returns function wrapped so that every call is timed as the stage.'''
+        def timed_function(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(name, perf_counter() - start)
+        timed_function.__name__ = getattr(function, "__name__", name)
+        timed_function.__doc__ = getattr(function, "__doc__", None)
+        return timed_function
+
+    def instrument_airfoils(self, airfoils_dict):
+        '''
+        Returns a copy of a MachUpX airfoils dictionary with the CL, CD, and Cm functions of every
+        functional airfoil wrapped (stages airfoil_CL, airfoil_CD, and airfoil_Cm). The given
+        dictionary is not changed.
+        '''
+        instrumented = {}
+        for airfoil_name, airfoil in airfoils_dict.items():
+            if isinstance(airfoil, dict) and airfoil.get("type") == "functional":
+                airfoil = dict(airfoil)
+                for coefficient in ["CL", "CD", "Cm"]:
+                    if callable(airfoil.get(coefficient)):
+                        airfoil[coefficient] = self.wrap(airfoil[coefficient], "airfoil_" + coefficient)
+            instrumented[airfoil_name] = airfoil
+        return instrumented
+
+    def stats(self):
+        '''
+        Returns the counters.
+
+        Returns
+        -------
+        stats : dictionary
+            {stage: {'calls', 'total_time', 'mean_time', 'max_time'}} with times in seconds, plus
+            'wall_time' (s since the profiler was created or reset).
+        '''
+        stages = {}
+        for name, (calls, total_time, max_time) in self._stages.items():
+            stages[name] = {"calls" : calls,
+                            "total_time" : total_time,
+                            "mean_time" : (total_time / calls) if calls > 0 else 0.0,
+                            "max_time" : max_time}
+        return {"wall_time" : perf_counter() - self.start_time, "stages" : stages}
+
+    def reset(self):
+        '''Clears all of the counters.'''
+        self._stages = {}
+        self.start_time = perf_counter()
+
+    def merge(self, stats):
+        '''Adds the counters from another profiler's stats (for example from a worker process).'''
+        if not self.enabled:
+            return
+        for name, stage in stats["stages"].items():
+            current = self._stages.get(name)
+            if current is None:
+                self._stages[name] = [stage["calls"], stage["total_time"], stage["max_time"]]
+            else:
+                current[0] += stage["calls"]
+                current[1] += stage["total_time"]
+                current[2] = max(current[2], stage["max_time"])
+
+    def to_json(self, filename):
+        '''Writes the counters to a json file.'''
+        with open(filename, 'w') as output:
+            json.dump(self.stats(), output, indent = 4)
+
+    def to_csv(self, filename):
+        '''Writes the counters to a csv file (one row per stage, times in seconds).'''
+        stages = self.stats()["stages"]
+        with open(filename, 'w', newline = '') as output:
+            writer = csv.writer(output)
+            writer.writerow(CSV_HEADER)
+            for name in sorted(stages, key = lambda name: -stages[name]["total_time"]):
+                stage = stages[name]
+                writer.writerow([name, stage["calls"], stage["total_time"], stage["mean_time"], stage["max_time"]])
+
+    def __str__(self):
+        stats = self.stats()
+        stages = stats["stages"]
+        lines = ["Profile (" + "{:.3f}".format(stats["wall_time"]) + " s wall time):"]
+        for name in sorted(stages, key = lambda name: -stages[name]["total_time"]):
+            stage = stages[name]
+            lines.append("    " + name.ljust(28) + str(stage["calls"]).rjust(10) + " calls" + "{:12.4f}".format(stage["total_time"]) + " s total"
+                         + "{:12.3e}".format(stage["mean_time"]) + " s mean")
+        return "\n".join(lines)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 15:48:31 2026
+
+@author: justice
+"""
+
+import numpy as np
+from time import perf_counter
+from Ikhana_sensitivities import LiftingLineSensitivities
+
+'''
+Restart policy for run_mult_solutions.
+
+run_mult_solutions used to plug the solution back into scipy.optimize.minimize until the
+norm of the change in the solution was below 0.0001, with no limit on the number of
+restarts. Some CL's would keep restarting for a very long time without the drag going
+down at all (the solution wanders along a flat valley floor by more than 0.0001).
+
+The RestartPolicy keeps the idea (each restart clears the error built up in SLSQP's
+Hessian approximation, see the note in pitch_trim_flap_optimize_functional) but stops on
+whichever comes first:
+    - converged    the change in the solution is below x_tolerance (the original criterion)
+    - stagnated    the objective improved by less than stagnation_tolerance (relative) for
+                   patience restarts in a row
+    - budget       max_restarts, max_evaluations (function evaluations over all restarts),
+                   or max_time (s) is used up
+The best (lowest objective) successful solution seen is returned, not just the last one.
+
+The restarts are warm started: every restart starts from the previous solution, the
+evaluation cache keeps the design points around it (so the first iterations of a restart
+cost no MachUpX solves), and with restart_method = "trust-constr" and lifting-line
+sensitivities that identify the drag Hessian the restarts use trust-constr with it
+(hessian_function) instead of building a new quasi-Newton approximation from scratch.
+
+The statistics of every restart (function evaluations, iterations, objective, change in
+the solution, time) are kept in restart_stats and printed by report, and sent as a
+'restart' event if run is given an EventStream (Ikhana_events.py).
+'''
+
+class RestartPolicy:
+    '''
+    Convergence aware restarts with a budget.
+
+    Parameters
+    ----------
+    max_restarts : int, optional
+        Largest number of restarts after the first optimization. The default is 20.
+    max_evaluations : int, optional
+        Largest total number of function evaluations over all runs (None for no limit). The default is None.
+    max_time : float, optional
+        Largest total time (s) over all runs (None for no limit). The default is None.
+    x_tolerance : float, optional
+        Converged once the norm of the change in the solution is below this. The default is 0.0001.
+    stagnation_tolerance : float, optional
+        A restart has stagnated if the objective improved by less than this times max(1, |objective|). The default is 1e-8.
+    patience : int, optional
+        Number of stagnated restarts in a row before stopping. The default is 2.
+    restart_method : string, optional
+        Method for the restarts, 'SLSQP' or 'trust-constr'. The default is "SLSQP".
+    print_results : boolean, optional
+        Whether or not to print each restart. The default is True.
+    '''
+    def __init__(self, max_restarts = 20, max_evaluations = None, max_time = None, x_tolerance = 0.0001, stagnation_tolerance = 1e-8, patience = 2, restart_method = "SLSQP", print_results = True):
+        if (restart_method != "SLSQP") and (restart_method != "trust-constr"):
+            raise ValueError("Invalid restart_method entered! Must be either 'SLSQP' (default) or 'trust-constr'.")
+        self.max_restarts = max_restarts
+        self.max_evaluations = max_evaluations
+        self.max_time = max_time
+        self.x_tolerance = x_tolerance
+        self.stagnation_tolerance = stagnation_tolerance
+        self.patience = patience
+        self.restart_method = restart_method
+        self.print_results = print_results
+        self.restart_stats = []
+        self.stop_reason = None
+        self._events = None
+
+    def _record(self, run, solution, previous_x, elapsed):
+        step = float(np.linalg.norm(solution.x - previous_x)) if previous_x is not None else None
+        stats = {"run" : run,
+                 "nfev" : int(solution.get("nfev", 0)),
+                 "nit" : solution.get("nit"),
+                 "fun" : float(solution.fun),
+                 "step" : step,
+                 "time" : elapsed,
+                 "success" : bool(solution.success),
+                 "message" : str(solution.message)}
+        self.restart_stats.append(stats)
+        if self._events is not None:
+            self._events.emit("restart", **stats)
+        if self.print_results:
+            print("Run " + str(run) + ": objective = " + str(stats["fun"]) + ", nfev = " + str(stats["nfev"])
+                  + ((", step = " + "{:.3e}".format(step)) if step is not None else "") + ", " + "{:.2f}".format(elapsed) + " s")
+        return stats
+
+    def run(self, first_minimize, restart_minimize, x0, events = None):
+        '''
+        Runs the first optimization and then the restarts.
+
+        Parameters
+        ----------
+        first_minimize : function
+            Called as first_minimize(x) and returns a scipy OptimizeResult.
+        restart_minimize : function
+            Called as restart_minimize(x, method) for each restart and returns a scipy OptimizeResult.
+        x0 : array, [float]
+            Initial guess.
+        events : EventStream, optional
+            Stream that gets a 'restart' event for every run. The default is None.
+
+        Returns
+        -------
+        solution : OptimizeResult
+            The solution with the lowest objective.
+        '''
+        self.restart_stats = []
+        self.stop_reason = None
+        self._events = events
+        start_time = perf_counter()
+
+        start = perf_counter()
+        solution = first_minimize(x0)
+        self._record(0, solution, None, perf_counter() - start)
+        best = solution
+        evaluations = self.restart_stats[-1]["nfev"]
+        stagnant = 0
+
+        for restart in range(1, self.max_restarts + 1):
+            if (events is not None) and events.stop_requested:
+                self.stop_reason = "stopped"
+                break
+            if (self.max_evaluations is not None) and (evaluations >= self.max_evaluations):
+                self.stop_reason = "evaluation budget"
+                break
+            if (self.max_time is not None) and (perf_counter() - start_time >= self.max_time):
+                self.stop_reason = "time budget"
+                break
+
+            previous = solution
+            start = perf_counter()
+            solution = restart_minimize(previous.x, self.restart_method)
+            stats = self._record(restart, solution, previous.x, perf_counter() - start)
+            evaluations += stats["nfev"]
+
+            # A successful (trimmed) run replaces an unsuccessful best solution, otherwise only a lower fun does
+            improvement = best.fun - solution.fun
+            if (solution.success and not best.success) or ((solution.success == best.success) and (solution.fun < best.fun)):
+                best = solution
+
+            if stats["step"] <= self.x_tolerance:
+                self.stop_reason = "converged"
+                break
+            if improvement < self.stagnation_tolerance*max(1.0, abs(best.fun)):
+                stagnant += 1
+                if stagnant >= self.patience:
+                    self.stop_reason = "stagnated"
+                    break
+            else:
+                stagnant = 0
+        else:
+            self.stop_reason = "restart budget"
+
+        if self.print_results:
+            print(self.report())
+        return best
+
+    def stats(self):
+        '''Returns the stop reason and the statistics of every run.'''
+        return {"stop_reason" : self.stop_reason,
+                "runs" : len(self.restart_stats),
+                "nfev" : sum(stats["nfev"] for stats in self.restart_stats),
+                "time" : sum(stats["time"] for stats in self.restart_stats),
+                "restart_stats" : list(self.restart_stats)}
+
+    def report(self):
+        '''Returns a short summary of the restarts.'''
+        stats = self.stats()
+        return ("Restarts: " + str(max(stats["runs"] - 1, 0)) + " restarts (" + str(stats["stop_reason"]) + "), "
+                + str(stats["nfev"]) + " function evaluations, " + "{:.2f}".format(stats["time"]) + " s")
+
+    def __str__(self):
+        return self.report()
+
+
+def hessian_function(gradient_provider):
+    '''
+    Returns a trust-constr hess function for the drag objective (CD*100) built from the drag
+    Hessian identified by LiftingLineSensitivities (None if the gradient provider does not identify one).
+    The off diagonal entries are identified the first time they are asked for at each x array.
+    '''
+    if not (isinstance(gradient_provider, LiftingLineSensitivities) and gradient_provider.identify_hessian):
+        return None
+
+    def objective_hessian(x, desired_CL, flag = "drag"):
+        hessian = gradient_provider.hessian(x)
+        if gradient_provider.dragType == "Inviscid":
+            return hessian[0]*100.0
+        elif gradient_provider.dragType == "Viscous":
+            return hessian[1]*100.0
+        return (hessian[0] + hessian[1])*100.0
+    return objective_hessian
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:44:08 2026
+
+@author: justice
+"""
+
+import os
+import json
+import uuid
+import numpy as np
+from time import time
+
+'''
+Append-only result store for the optimization results.
+
+With write_results on, every call to pitch_trim_flap_optimize_functional writes a text file
+of str(solution) plus an F_M_*.json and a distributions_* file, all timestamped to the
+second (so parallel runs collide), and post-processing a sweep means parsing hundreds of
+text files.
+
+The ResultStore keeps every run as one NPZ file in a store directory:
+    - key: aircraft, num_flaps, CL, dragType
+    - the solution x array, CD, CL, Cm, alpha, elevator, and deflection array
+    - optimizer statistics (nfev, nit, success, cache/engine counters, ...) as json
+    - the spanwise distributions from MachUpX (one array per segment and quantity)
+
+Records are never modified or overwritten. Each record gets a unique filename and is
+written to a temporary file first and then renamed, so a reader never sees a partial
+record and any number of processes can append to the same store. Running the same key
+again adds another record; the read functions can return all of them or the latest.
+'''
+
+RECORD_EXTENSION = ".npz"
+_DISTRIBUTION_PREFIX = "dist__"
+_KEY_FIELDS = ["aircraft", "num_flaps", "CL", "dragType"]
+_SCALAR_FIELDS = ["CD", "calc_CL", "calc_Cm", "alpha", "elevator", "timestamp"]
+
+# Structured array layout returned by ResultStore.table
+TABLE_DTYPE = np.dtype([("aircraft", "U64"),
+                        ("num_flaps", np.int64),
+                        ("CL", np.float64),
+                        ("dragType", "U16"),
+                        ("CD", np.float64),
+                        ("calc_CL", np.float64),
+                        ("calc_Cm", np.float64),
+                        ("alpha", np.float64),
+                        ("elevator", np.float64),
+                        ("timestamp", np.float64)])
+
+
+def _json_default(value):
+    # Lets numpy values in the optimizer statistics be written to json
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+class ResultStore:
+    '''
+    Append-only store of optimization results (one NPZ file per run).
+
+    Parameters
+    ----------
+    directory : string
+        Directory of the store. Created if it does not exist.
+    '''
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+        os.makedirs(self.directory, exist_ok = True)
+
+    def append(self, aircraft, num_flaps, CL, dragType, x, CD, calc_CL, calc_Cm, alpha, elevator, deflection_array, optimizer_stats = None, distributions = None):
+        '''
+        Adds one run to the store.
+
+        Parameters
+        ----------
+        aircraft : string
+            Name of the aircraft.
+        num_flaps : int
+            Number of flaps/control points.
+        CL : float
+            Desired lift coefficient.
+        dragType : string
+            Type of drag minimized ('Total', 'Inviscid', or 'Viscous').
+        x : array, [float]
+            The solution x array.
+        CD : float
+            Drag coefficient of the solution.
+        calc_CL : float
+            Lift coefficient calculated by MachUpX.
+        calc_Cm : float
+            Pitching moment coefficient calculated by MachUpX.
+        alpha : float
+            Angle of attack (deg).
+        elevator : float
+            Elevator (deg).
+        deflection_array : array, [[float], [float]]
+            Flap deflection distribution ([] if num_flaps = 0).
+        optimizer_stats : dictionary, optional
+            Any json serializable statistics about the run. The default is None.
+        distributions : dictionary, optional
+            The dictionary returned by MachUpX's distributions ({aircraft: {segment: {quantity: list}}}). The default is None.
+
+        Returns
+        -------
+        filename : string
+            The filename of the new record.
+        '''
+        arrays = {"aircraft" : np.array(aircraft),
+                  "num_flaps" : np.array(int(num_flaps)),
+                  "CL" : np.array(float(CL)),
+                  "dragType" : np.array(dragType),
+                  "x" : np.asarray(x, dtype = np.float64),
+                  "CD" : np.array(float(CD)),
+                  "calc_CL" : np.array(float(calc_CL)),
+                  "calc_Cm" : np.array(float(calc_Cm)),
+                  "alpha" : np.array(float(alpha)),
+                  "elevator" : np.array(float(elevator)),
+                  "deflection_array" : np.asarray(deflection_array, dtype = np.float64),
+                  "optimizer_stats" : np.array(json.dumps(optimizer_stats if optimizer_stats is not None else {}, default = _json_default)),
+                  "timestamp" : np.array(time())}
+
+        if distributions is not None:
+            for segment, quantities in distributions.get(aircraft, distributions).items():
+                if not isinstance(quantities, dict):
+                    continue
+                for quantity, values in quantities.items():
+                    try:
+                        arrays[_DISTRIBUTION_PREFIX + segment + "__" + quantity] = np.asarray(values, dtype = np.float64)
+                    except (TypeError, ValueError):
+                        pass
+
+        # Unique filename, written to a temporary file and renamed so the record appears all at once
+        name = str(aircraft) + "_" + str(num_flaps) + "_FLAPS_CL_" + str(CL) + "_" + str(dragType) + "__" + uuid.uuid4().hex
+        filename = os.path.join(self.directory, name + RECORD_EXTENSION)
+        temporary_filename = os.path.join(self.directory, "." + name + ".tmp")
+        with open(temporary_filename, "wb") as record_file:
+            np.savez(record_file, **arrays)
+        os.replace(temporary_filename, filename)
+        return filename
+
+    def filenames(self):
+        '''Returns the filenames of all records in the store.'''
+        return sorted(os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(RECORD_EXTENSION) and not name.startswith("."))
+
+    def load_record(self, filename):
+        '''
+        Reads one record.
+
+        Returns
+        -------
+        record : dictionary
+            The key fields, x, CD, calc_CL, calc_Cm, alpha, elevator, deflection_array, timestamp,
+            optimizer_stats (dictionary), distributions ({segment: {quantity: array}}), and filename.
+        '''
+        record = {"distributions" : {}, "filename" : filename}
+        with np.load(filename, allow_pickle = False) as data:
+            for name in data.files:
+                if name.startswith(_DISTRIBUTION_PREFIX):
+                    segment, quantity = name[len(_DISTRIBUTION_PREFIX):].split("__", 1)
+                    record["distributions"].setdefault(segment, {})[quantity] = data[name]
+                elif name == "optimizer_stats":
+                    record[name] = json.loads(str(data[name]))
+                elif data[name].ndim == 0:
+                    record[name] = data[name].item()
+                else:
+                    record[name] = data[name]
+        return record
+
+    def _matches(self, record, aircraft, num_flaps, CL, dragType):
+        return ((aircraft is None or record["aircraft"] == aircraft) and
+                (num_flaps is None or record["num_flaps"] == num_flaps) and
+                (CL is None or np.isclose(record["CL"], CL)) and
+                (dragType is None or record["dragType"] == dragType))
+
+    def read_all(self, aircraft = None, num_flaps = None, CL = None, dragType = None):
+        '''
+        Reads every record matching the given key fields (None matches anything), oldest first.
+
+        Returns
+        -------
+        records : list, [dictionary]
+        '''
+        records = [self.load_record(filename) for filename in self.filenames()]
+        records = [record for record in records if self._matches(record, aircraft, num_flaps, CL, dragType)]
+        return sorted(records, key = lambda record: record["timestamp"])
+
+    def read_latest(self, aircraft = None, num_flaps = None, CL = None, dragType = None):
+        '''
+        Returns the latest record for each key (aircraft, num_flaps, CL, dragType) matching the given
+        key fields, sorted by aircraft, num_flaps, dragType, and CL.
+
+        Returns
+        -------
+        records : list, [dictionary]
+        '''
+        latest = {}
+        for record in self.read_all(aircraft, num_flaps, CL, dragType):
+            latest[tuple(record[field] for field in _KEY_FIELDS)] = record
+        return [latest[key] for key in sorted(latest, key = lambda key: (key[0], key[1], key[3], key[2]))]
+
+    def keys(self):
+        '''Returns the distinct (aircraft, num_flaps, CL, dragType) keys in the store.'''
+        return [tuple(record[field] for field in _KEY_FIELDS) for record in self.read_latest()]
+
+    def table(self, aircraft = None, num_flaps = None, CL = None, dragType = None, latest = True):
+        '''
+        Returns the scalar results of the matching records as one structured array (TABLE_DTYPE).
+
+        Parameters
+        ----------
+        latest : boolean, optional
+            Whether to only include the latest record for each key. The default is True.
+        '''
+        records = self.read_latest(aircraft, num_flaps, CL, dragType) if latest else self.read_all(aircraft, num_flaps, CL, dragType)
+        table = np.zeros(len(records), dtype = TABLE_DTYPE)
+        for index, record in enumerate(records):
+            for field in _KEY_FIELDS + _SCALAR_FIELDS:
+                table[index][field] = record[field]
+        return table
+
+    def solutions(self, aircraft = None, num_flaps = None, CL = None, dragType = None, latest = True):
+        '''
+        Returns the solution x arrays of the matching records stacked into one array (same order as table).
+        '''
+        records = self.read_latest(aircraft, num_flaps, CL, dragType) if latest else self.read_all(aircraft, num_flaps, CL, dragType)
+        if len(records) == 0:
+            return np.zeros((0,0))
+        return np.vstack([record["x"] for record in records])
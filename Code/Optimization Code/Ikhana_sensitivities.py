@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:22:47 2026
+
+@author: justice
+"""
+
+import numpy as np
+from Ikhana_main_wing_derivatives import get_Ikhana_section_CD_camber, get_Ikhana_section_CD_camber_derivative
+
+'''
+Gradients of CD, CL, and Cm with respect to the x array (flaps, elevator, alpha) from a
+local lifting-line model of MachUpX.
+
+MachUpX does not expose the lifting-line Jacobian, so the sensitivities are identified
+from MachUpX solves using the structure of the lifting-line model instead:
+
+    - The section lift and moment are linear in alpha and camber (CLa and Cma are
+      constant, alpha L0 and Cm L0 are linear fits in camber) and the tail mounting angle
+      and angle of attack enter the lifting-line equations linearly (small angles). The
+      vortex strengths, and so CL and Cm, are then affine in the x array, which makes
+      dCL/dx and dCm/dx constant.
+
+    - The inviscid (induced) drag is quadratic in the vortex strengths, so it is a
+      quadratic function of the x array: dCD_inviscid/dx = g + H(x - x0).
+
+    - The viscous drag of each flap is the section drag fit (Ikhana_main_wing_functions.py)
+      times a spanwise weight (the flap's share of the wing area scaled by the local
+      dynamic pressure from the lifting-line solution). When the model is reused away from
+      x0 (refresh_radius > 0), the derivative of the section fit from
+      Ikhana_main_wing_derivatives.py is chained through that weight:
+      dCD_viscous/dx_flap = W_flap * dCD_section/dc(x_flap). At x0 the viscous gradient
+      is the central difference like the rest.
+
+The model is identified about a point x0 with central differences of size step:
+1 + 2n solves (n = num_flaps + 2) for the gradients at x0, plus one solve for each
+off diagonal entry of the drag Hessian (n(n-1)/2 for the full Hessian,
+BandedLiftingLineSensitivities only identifies the entries between nearby flaps, see
+Ikhana_high_resolution.py). The off diagonal entries are only identified the first time
+the Hessian is needed at x0 (hessian, used by the trust-constr restarts), so SLSQP never
+pays for them. These are finite difference gradients of the model, not
+exact derivatives. MachUpX's nonlinear solver and viscous fits are not exactly
+affine/quadratic, so by default (refresh_radius = 0.0) the model is identified again at
+every new x array and the gradients are the central differences at that x array. This
+costs 1 + 2n solves an iteration against SLSQP's n + 1 forward differences, for more
+accurate gradients. It is therefore off by default in the optimization
+(central_difference_gradients = False).
+
+With refresh_radius > 0 the Hessian is identified and the model is reused (the gradient
+is updated with g + H(x - x0)) until x moves further than refresh_radius from x0. The
+gradients between identifications are then model predictions that can disagree with the
+true objective, so only use it after check_sensitivities shows the model error is within
+the tolerance over that radius.
+'''
+
+# Default bandwidth of the flap-flap drag Hessian for BandedLiftingLineSensitivities
+DEFAULT_BANDWIDTH = 2
+
+
+class LiftingLineSensitivities:
+    '''
+    Lifting-line model gradients of the drag objective and the lift/moment constraints.
+
+    Parameters
+    ----------
+    engine : EvaluationEngine
+        The evaluation engine for the optimization (see Ikhana_evaluation_engine.py).
+    base_evaluate : function
+        Called as base_evaluate(x, desired_CL) and returns (CD, CL, Cm). Used for the sign of the
+        lift constraint |CL - desired_CL|, so it should go through the evaluation cache.
+    step : float, optional
+        Central difference step (deg) used for the identification solves. The default is 1e-3.
+    refresh_radius : float, optional
+        The model is identified again when any entry of x moves further than this (deg) from x0.
+        The default is 0.0 (identified again at every new x array).
+    identify_hessian : boolean, optional
+        Whether or not the off diagonal drag Hessian entries are identified when the Hessian is needed
+        (always on when refresh_radius > 0). Only needed for the trust-constr Hessian (see
+        Ikhana_restart_policy.py). The default is False.
+    '''
+    def __init__(self, engine, base_evaluate, step = 1e-3, refresh_radius = 0.0, identify_hessian = False):
+        self.engine = engine
+        self.base_evaluate = base_evaluate
+        self.step = step
+        self.refresh_radius = refresh_radius
+        self.identify_hessian = identify_hessian or (refresh_radius > 0.0)
+        self.num_flaps = engine.num_flaps
+        self.dragType = engine.dragType
+        self.x0 = None
+        self.identifications = 0
+        self.identification_solves = 0
+        self.gradient_evaluations = 0
+
+    def _solve(self, x):
+        # Returns [CD_inviscid, CD_viscous, CL, Cm] for the x array
+        forces_and_moments = self.engine.solve_forces(x)
+        CD_inviscid, CD_viscous = self.engine.drag_components(forces_and_moments)
+        CD, CL, Cm = self.engine.coefficients(forces_and_moments)
+        self.identification_solves += 1
+        return np.array([CD_inviscid, CD_viscous, CL, Cm])
+
+    def hessian_pairs(self, n):
+        '''
+        Returns the (i, j), i < j, off diagonal entries of the drag Hessian that are identified
+        (one solve each, see identify_hessian_pairs). Every pair is identified here if identify_hessian;
+        entries that are not returned are zero.
+        '''
+        if not self.identify_hessian:
+            return []
+        return [(i, j) for i in range(n) for j in range(i + 1, n)]
+
+    def identify(self, x0):
+        '''
+        Finds the constant lift/moment Jacobians, the drag gradient and Hessian diagonal, and the
+        flap viscous weights about x0. The off diagonal Hessian entries are left to identify_hessian_pairs.
+        '''
+        x0 = np.array(x0, dtype = np.float64)
+        n = len(x0)
+
+        # Step direction for the flaps is chosen so the section drag fit changes (away from its minimum)
+        steps = np.full(n, self.step)
+        if self.num_flaps > 0:
+            slopes = get_Ikhana_section_CD_camber_derivative(x0[0:self.num_flaps])
+            steps[0:self.num_flaps] = np.where(slopes < 0.0, -self.step, self.step)
+
+        base = self._solve(x0)
+        plus = np.zeros((n, 4))
+        minus = np.zeros((n, 4))
+        for i in range(n):
+            x_step = x0.copy()
+            x_step[i] += steps[i]
+            plus[i] = self._solve(x_step)
+            x_step[i] = x0[i] - steps[i]
+            minus[i] = self._solve(x_step)
+
+        # Quadratic model of the inviscid and viscous drag (gradient and Hessian about x0)
+        self.drag_gradient0 = np.zeros((2, n))
+        self.drag_hessian = np.zeros((2, n, n))
+        for i in range(n):
+            self.drag_gradient0[:,i] = (plus[i,0:2] - minus[i,0:2])/(2.0*steps[i])
+            self.drag_hessian[:,i,i] = (plus[i,0:2] - 2.0*base[0:2] + minus[i,0:2])/(steps[i]*steps[i])
+
+        # Constant (affine) lift and moment Jacobians
+        self.lift_jacobian = (plus[:,2] - minus[:,2])/(2.0*steps)
+        self.moment_jacobian = (plus[:,3] - minus[:,3])/(2.0*steps)
+
+        # Spanwise viscous weight of each flap: change in viscous CD over the change in the section fit
+        # (only used to move the gradient away from x0 when the model is reused)
+        self.viscous_weights = np.zeros(self.num_flaps)
+        if self.refresh_radius > 0.0:
+            for j in range(self.num_flaps):
+                section_change = get_Ikhana_section_CD_camber(x0[j] + steps[j]) - get_Ikhana_section_CD_camber(x0[j])
+                if section_change != 0.0:
+                    self.viscous_weights[j] = (plus[j,1] - base[1])/section_change
+
+        self.x0 = x0
+        self._base = base
+        self._plus = plus
+        self._steps = steps
+        self.hessian_identified = False
+        self.identifications += 1
+
+    def identify_hessian_pairs(self):
+        '''
+        Identifies the off diagonal drag Hessian entries (hessian_pairs) about x0, one solve each.
+        Only done once for each identification, the first time the Hessian is needed.
+        '''
+        if self.hessian_identified:
+            return
+        x0, base, plus, steps = self.x0, self._base, self._plus, self._steps
+        for i, j in self.hessian_pairs(len(x0)):
+            x_step = x0.copy()
+            x_step[i] += steps[i]
+            x_step[j] += steps[j]
+            pair = self._solve(x_step)
+            self.drag_hessian[:,i,j] = (pair[0:2] - plus[i,0:2] - plus[j,0:2] + base[0:2])/(steps[i]*steps[j])
+            self.drag_hessian[:,j,i] = self.drag_hessian[:,i,j]
+        self.hessian_identified = True
+
+    def hessian(self, x):
+        '''
+        Returns the (2 x n x n) inviscid and viscous drag Hessians (unscaled) of the model about x,
+        identifying the off diagonal entries if they have not been yet.
+        '''
+        self._update(np.asarray(x, dtype = np.float64))
+        self.identify_hessian_pairs()
+        return self.drag_hessian
+
+    def _update(self, x):
+        # Identify the model the first time and whenever x moves outside of the refresh radius (every new x for 0.0)
+        if (self.x0 is None) or (np.max(np.abs(x - self.x0)) > self.refresh_radius):
+            self.identify(x)
+
+    def drag_gradient(self, x):
+        '''
+        Returns dCD/dx for the engine's dragType (unscaled).
+        '''
+        x = np.asarray(x, dtype = np.float64)
+        self._update(x)
+        self.gradient_evaluations += 1
+
+        dx = x - self.x0
+        if np.any(dx != 0.0):
+            self.identify_hessian_pairs()    # The reused model needs the Hessian away from x0
+        inviscid = self.drag_gradient0[0] + self.drag_hessian[0].dot(dx)
+        viscous = self.drag_gradient0[1] + self.drag_hessian[1].dot(dx)
+
+        # Away from x0 the flap viscous terms come from the section fit derivative chained through the spanwise weights
+        if (self.num_flaps > 0) and np.any(dx != 0.0):
+            viscous[0:self.num_flaps] = self.viscous_weights*get_Ikhana_section_CD_camber_derivative(x[0:self.num_flaps])
+
+        if self.dragType == "Inviscid":
+            return inviscid
+        elif self.dragType == "Viscous":
+            return viscous
+        return inviscid + viscous
+
+    def lift_gradient(self, x):
+        '''Returns dCL/dx.'''
+        self._update(np.asarray(x, dtype = np.float64))
+        return self.lift_jacobian.copy()
+
+    def moment_gradient(self, x):
+        '''Returns dCm/dx.'''
+        self._update(np.asarray(x, dtype = np.float64))
+        return self.moment_jacobian.copy()
+
+    def objective_jac(self, x, desired_CL, flag = "drag"):
+        '''Gradient of the drag objective (CD*100). Same arguments as twist_cost_function.'''
+        return self.drag_gradient(x)*100.0
+
+    def constraint_jac(self, x, desired_CL, flag = "drag"):
+        '''Gradient of the lift (|CL - desired_CL|) or moment constraint. Same arguments as twist_cost_function.'''
+        if flag == "lift":
+            CD, CL, Cm = self.base_evaluate(x, desired_CL)
+            sign = 1.0 if CL >= desired_CL else -1.0
+            return sign*self.lift_gradient(x)
+        elif flag == "moment":
+            return self.moment_gradient(x)
+        return self.objective_jac(x, desired_CL)
+
+    def __str__(self):
+        return ("Lifting-line sensitivities: " + str(self.gradient_evaluations) + " gradient evaluations, "
+                + str(self.identifications) + " identifications (" + str(self.identification_solves) + " solves)")
+
+
+class BandedLiftingLineSensitivities(LiftingLineSensitivities):
+    '''
+    LiftingLineSensitivities with a banded flap-flap drag Hessian (identified when it is needed by default).
+
+    Parameters
+    ----------
+    engine : EvaluationEngine
+    base_evaluate : function
+        See LiftingLineSensitivities.
+    bandwidth : int, optional
+        Flaps further apart than this (in flap indices) are treated as not coupled in the drag Hessian. The default is 2.
+    **kwargs
+        Passed on to LiftingLineSensitivities (step, refresh_radius, identify_hessian).
+    '''
+    def __init__(self, engine, base_evaluate, bandwidth = DEFAULT_BANDWIDTH, **kwargs):
+        kwargs.setdefault("identify_hessian", True)
+        LiftingLineSensitivities.__init__(self, engine, base_evaluate, **kwargs)
+        self.bandwidth = bandwidth
+
+    def hessian_pairs(self, n):
+        '''
+        Returns the flap pairs within the bandwidth and every pair that involves the elevator
+        or angle of attack (the last two entries of the x array).
+        '''
+        if not self.identify_hessian:
+            return []
+        pairs = []
+        for i in range(n):
+            for j in range(i + 1, n):
+                if (j >= self.num_flaps) or (j - i <= self.bandwidth):
+                    pairs.append((i, j))
+        return pairs
+
+    def __str__(self):
+        return LiftingLineSensitivities.__str__(self) + ", bandwidth " + str(self.bandwidth)
+
+
+def check_sensitivities(sensitivities, x, fd_step = 1e-4, tolerance = 1e-4, print_results = True):
+    '''
+    Compares the model gradients with central finite differences on the engine. With
+    refresh_radius > 0, check at x arrays away from the identification point (up to
+    refresh_radius) to bound the error of the reused model.
+
+    Parameters
+    ----------
+    sensitivities : LiftingLineSensitivities
+    x : array, [float]
+        The x array to check the gradients at.
+    fd_step : float, optional
+        Central difference step (deg). The default is 1e-4.
+    tolerance : float, optional
+        Largest allowed absolute difference (per degree) between the model and finite difference gradients. The default is 1e-4.
+    print_results : boolean, optional
+        Whether or not to print the gradients. The default is True.
+
+    Returns
+    -------
+    max_differences : dictionary
+        Largest absolute difference for 'CD', 'CL', and 'Cm'.
+    within_tolerance : boolean
+        Whether or not every difference is within the tolerance.
+    '''
+    engine = sensitivities.engine
+    x = np.asarray(x, dtype = np.float64)
+    fd = np.zeros((3, len(x)))
+    for i in range(len(x)):
+        x_plus = x.copy()
+        x_plus[i] += fd_step
+        x_minus = x.copy()
+        x_minus[i] -= fd_step
+        fd[:,i] = (np.array(engine.evaluate(x_plus)) - np.array(engine.evaluate(x_minus)))/(2.0*fd_step)
+
+    model = np.array([sensitivities.drag_gradient(x), sensitivities.lift_gradient(x), sensitivities.moment_gradient(x)])
+    max_differences = {}
+    for row, name in enumerate(["CD", "CL", "Cm"]):
+        max_differences[name] = float(np.max(np.abs(model[row] - fd[row])))
+        if print_results:
+            print(name + " model: " + str(model[row]))
+            print(name + " finite difference: " + str(fd[row]))
+            print(name + " max difference: " + str(max_differences[name]) + "\n")
+    within_tolerance = all(difference <= tolerance for difference in max_differences.values())
+    if print_results and not within_tolerance:
+        print("Model gradients are not within the tolerance of " + str(tolerance) + "; use a smaller refresh_radius.")
+    return max_differences, within_tolerance
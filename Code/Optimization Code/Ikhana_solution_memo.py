@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:37:15 2026
+
+@author: justice
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+
+'''
+On-disk memo of finished optimizations so that the Run Code scripts do not redo work
+they have already done.
+
+Every memo entry is keyed by a configuration hash and a CL:
+    - The configuration hash is a sha256 of the scene and aircraft json contents (loaded and
+      re-dumped with sorted keys, so formatting does not matter) together with every call
+      argument that changes the answer: aircraft name, num_flaps, deflection bounds, dragType,
+      elevator_mode, and run_mult_solutions.
+    - The CL is rounded to CL_DECIMALS so that 0.1 + 0.2 and 0.3 are the same point.
+
+Only converged, trimmed results are stored (see MEMO_TRIM_TOLERANCE in
+pitch_trim_flap_optimize_functional), so an exact hit is always a usable solution.
+lookup returns either an exact hit (the stored result tuple is returned by
+pitch_trim_flap_optimize_functional without running anything) or the solution at the
+nearest memoized CL within warm_start_radius of the same configuration (used as the
+initial guess when no initial_defl was given).
+
+Each entry remembers the absolute paths of the jsons it was created from and a sha256 of
+their contents alone. If a lookup is made with the same paths but different json contents,
+every entry made from the old contents is removed (invalidation). Entries for the same
+jsons with different call arguments (num_flaps, bounds, ...) are left alone. The memo holds at most max_entries entries; the least
+recently used entry (by file modification time, which is updated on every hit) is removed
+once the memo is full.
+'''
+
+CL_DECIMALS = 9
+ENTRY_EXTENSION = ".json"
+
+
+def _load_json_contents(filename):
+    # Loads and re-dumps the json so that whitespace and key order do not change the hash
+    with open(filename) as json_file:
+        return json.dumps(json.load(json_file), sort_keys = True)
+
+
+def _airfoil_tables_contents(airfoil_tables):
+    # Interpolation method and the sha256 of every table file in the database
+    directory = getattr(airfoil_tables, "directory", airfoil_tables)
+    contents = {"method" : getattr(airfoil_tables, "method", "cubic")}
+    for name in sorted(os.listdir(directory)):
+        if (name.endswith(".npy") or name.endswith(".json")) and not name.startswith("."):
+            with open(os.path.join(directory, name), 'rb') as table_file:
+                contents[name] = hashlib.sha256(table_file.read()).hexdigest()
+    return json.dumps(contents, sort_keys = True)
+
+
+def _hash_parts(parts):
+    # sha256 of the strings in parts, separated so that ("ab", "c") and ("a", "bc") differ
+    parts_hash = hashlib.sha256()
+    for part in parts:
+        parts_hash.update(part.encode("utf-8"))
+        parts_hash.update(b"\0")
+    return parts_hash.hexdigest()
+
+
+class SolutionMemo:
+    '''
+    Size bounded on-disk memo of pitch_trim_flap_optimize_functional results.
+
+    Parameters
+    ----------
+    directory : string
+        Directory of the memo. Created if it does not exist.
+    max_entries : int, optional
+        Maximum number of memoized results kept. The default is 512.
+    warm_start_radius : float, optional
+        Largest CL difference for which a memoized solution is returned as a warm start. The default is 0.1.
+    '''
+    def __init__(self, directory, max_entries = 512, warm_start_radius = 0.1):
+        self.directory = os.path.abspath(directory)
+        self.max_entries = max_entries
+        self.warm_start_radius = warm_start_radius
+        self.hits = 0
+        self.warm_starts = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        os.makedirs(self.directory, exist_ok = True)
+
+    def configuration(self, orig_scene_filename, orig_aircraft_json_filename, aircraft_name, num_flaps, upDeflBound, lowDeflBound, dragType = "Total", elevator_mode = "twist", run_mult_solutions = False, airfoil_tables = None):
+        '''
+        Creates the configuration hash for the inputs. With airfoil_tables (an AirfoilTableDatabase
+        or its directory), the contents of every table and the interpolation method are part of the hash.
+
+        Returns
+        -------
+        config_hash : string
+            sha256 hex digest of the json contents and the call arguments.
+        sources : dictionary
+            Absolute paths ("paths") of the scene and aircraft jsons and the sha256 of their
+            contents ("contents_hash"), used for invalidation.
+        '''
+        arguments = json.dumps({"aircraft_name" : aircraft_name,
+                                "num_flaps" : int(num_flaps),
+                                "upDeflBound" : float(upDeflBound),
+                                "lowDeflBound" : float(lowDeflBound),
+                                "dragType" : dragType,
+                                "elevator_mode" : elevator_mode,
+                                "run_mult_solutions" : bool(run_mult_solutions)}, sort_keys = True)
+        json_parts = [_load_json_contents(orig_scene_filename), _load_json_contents(orig_aircraft_json_filename)]
+        parts = json_parts + [arguments]
+        if airfoil_tables is not None:
+            parts.append(_airfoil_tables_contents(airfoil_tables))
+        sources = {"paths" : [os.path.abspath(orig_scene_filename), os.path.abspath(orig_aircraft_json_filename)],
+                   "contents_hash" : _hash_parts(json_parts)}
+        return _hash_parts(parts), sources
+
+    def _entry_filename(self, config_hash, CL):
+        return os.path.join(self.directory, config_hash + "_CL_" + repr(round(float(CL), CL_DECIMALS)) + ENTRY_EXTENSION)
+
+    def _entries(self):
+        # (filename, entry) for every entry in the memo
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(ENTRY_EXTENSION) or name.startswith("."):
+                continue
+            filename = os.path.join(self.directory, name)
+            try:
+                with open(filename) as entry_file:
+                    entries.append((filename, json.load(entry_file)))
+            except (OSError, ValueError):
+                # Removed by another process or unreadable, either way it is not usable
+                continue
+        return entries
+
+    def _remove(self, filename):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+    def lookup(self, config_hash, sources, CL):
+        '''
+        Looks up a result for the configuration and CL.
+
+        Returns
+        -------
+        result : tuple or None
+            The stored return tuple of pitch_trim_flap_optimize_functional for an exact hit, otherwise None.
+        warm_start : array, [float] or None
+            The solution x array at the nearest memoized CL within warm_start_radius (None for an exact hit or if there is none).
+        '''
+        CL = round(float(CL), CL_DECIMALS)
+        nearest = None
+        nearest_distance = None
+        for filename, entry in self._entries():
+            if entry["config_hash"] != config_hash:
+                # Same jsons (by path) with different contents, the entry is out of date. A different
+                # configuration of the same jsons (e.g. another num_flaps) is a different entry.
+                entry_sources = entry.get("sources")
+                if isinstance(entry_sources, dict) and (entry_sources.get("paths") == sources["paths"]) and (entry_sources.get("contents_hash") != sources["contents_hash"]):
+                    self._remove(filename)
+                    self.invalidations += 1
+                continue
+            distance = abs(entry["CL"] - CL)
+            if nearest_distance is None or distance < nearest_distance:
+                nearest, nearest_distance = (filename, entry), distance
+
+        if nearest is not None and nearest_distance == 0.0:
+            filename, entry = nearest
+            os.utime(filename)    # Mark as recently used
+            self.hits += 1
+            return self._result(entry), None
+
+        if nearest is not None and nearest_distance <= self.warm_start_radius:
+            self.warm_starts += 1
+            self.misses += 1
+            return None, np.array(nearest[1]["x"], dtype = np.float64)
+
+        self.misses += 1
+        return None, None
+
+    def _result(self, entry):
+        # Rebuilds the pitch_trim_flap_optimize_functional return tuple from a memo entry
+        deflection_array = np.array(entry["deflection_array"], dtype = np.float64) if len(entry["deflection_array"]) > 0 else []
+        return (entry["distributions_filename"], entry["CD"], entry["calc_CL"], entry["calc_Cm"], entry["alpha"], entry["elevator"], deflection_array, np.array(entry["x"], dtype = np.float64))
+
+    def store(self, config_hash, sources, CL, result):
+        '''
+        Stores the return tuple of pitch_trim_flap_optimize_functional for the configuration and CL,
+        then removes the least recently used entries if the memo is over max_entries.
+        '''
+        distributions_filename, CD, calc_CL, calc_Cm, aoa, elevator, deflection_array, x = result
+        entry = {"config_hash" : config_hash,
+                 "sources" : sources,
+                 "CL" : round(float(CL), CL_DECIMALS),
+                 "distributions_filename" : distributions_filename,
+                 "CD" : float(CD),
+                 "calc_CL" : float(calc_CL),
+                 "calc_Cm" : float(calc_Cm),
+                 "alpha" : float(aoa),
+                 "elevator" : float(elevator),
+                 "deflection_array" : np.asarray(deflection_array, dtype = np.float64).tolist(),
+                 "x" : np.asarray(x, dtype = np.float64).tolist()}
+
+        # Written to a temporary file and renamed so other processes never read a partial entry
+        filename = self._entry_filename(config_hash, CL)
+        temporary_filename = os.path.join(self.directory, "." + os.path.basename(filename) + "." + str(os.getpid()) + ".tmp")
+        with open(temporary_filename, "w") as entry_file:
+            json.dump(entry, entry_file)
+        os.replace(temporary_filename, filename)
+        self._evict()
+
+    def _evict(self):
+        # Remove the least recently used entries until the memo fits in max_entries
+        if self.max_entries is None:
+            return
+        filenames = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(ENTRY_EXTENSION) and not name.startswith(".")]
+        if len(filenames) <= self.max_entries:
+            return
+        ages = []
+        for filename in filenames:
+            try:
+                ages.append((os.path.getmtime(filename), filename))
+            except OSError:
+                continue
+        ages.sort()
+        for mtime, filename in ages[0:max(len(ages) - self.max_entries, 0)]:
+            self._remove(filename)
+            self.evictions += 1
+
+    def clear(self):
+        '''Removes every entry from the memo.'''
+        for filename, entry in self._entries():
+            self._remove(filename)
+
+    def stats(self):
+        '''Returns the memo counters.'''
+        return {"hits" : self.hits,
+                "warm_starts" : self.warm_starts,
+                "misses" : self.misses,
+                "invalidations" : self.invalidations,
+                "evictions" : self.evictions}
+
+    def __str__(self):
+        stats = self.stats()
+        return ("Solution memo: " + str(stats["hits"]) + " hits, " + str(stats["warm_starts"]) + " warm starts, "
+                + str(stats["misses"]) + " misses, " + str(stats["invalidations"]) + " invalidated, " + str(stats["evictions"]) + " evicted")
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:37:14 2026
+
+@author: justice
+"""
+
+import numpy as np
+import scipy as sp
+import scipy.interpolate
+from Ikhana_evaluation_engine import EvaluationEngine, load_optimization_inputs, engine_kwargs
+from Ikhana_batch_evaluator import BatchEvaluator
+
+'''
+Surrogate (response surface) mode for dense CL schedules and trade studies.
+
+Instead of calling MachUpX thousands of times through the cost function, the design space
+(flap cambers, elevator, alpha) is sampled with a Latin hypercube and a fast regression
+model is fit to CD, CL, and Cm. SLSQP is then run on the surrogate, which costs almost
+nothing. The surrogate optimum is checked with a true MachUpX solve, and if it does not
+meet the tolerances the surrogate is refined with new MachUpX samples only in a small box
+around the optimum and SLSQP is run again. The global samples are shared by every CL in
+a schedule, so after the first CL each additional CL only costs the local refinement
+solves.
+
+Two models are available:
+    "quadratic" : full quadratic response surface (least squares). The lift and moment are
+                  affine and the drag is quadratic in the x array for lifting-line theory with
+                  this airfoil model, so this is the default.
+    "rbf"       : thin plate spline radial basis function (scipy.interpolate.RBFInterpolator)
+                  with a linear polynomial tail.
+
+The alpha and elevator have no bounds in the optimization, but the surrogate needs a finite
+box to sample, so they are given by alpha_bounds and elevator_bounds.
+
+The samples are solved as one batch (Ikhana_batch_evaluator.py), in this process by
+default or on a pool of worker processes if surrogate_CL_schedule is given max_workers.
+'''
+
+RESULTS_HEADER = 'CL   CD   Cm   alpha   elevator   act_CL'
+
+
+def latin_hypercube(num_samples, lower, upper, seed = None):
+    '''
+    Latin hypercube sample of a box.
+
+    Parameters
+    ----------
+    num_samples : int
+        Number of samples.
+    lower : array, [float]
+        Lower bound of each variable.
+    upper : array, [float]
+        Upper bound of each variable.
+    seed : int, optional
+        Random seed. The default is None.
+
+    Returns
+    -------
+    samples : array, [[float]]
+        (num_samples x len(lower)) array of samples. Each variable has exactly one sample in each
+        of the num_samples equal strata of its range.
+    '''
+    rng = np.random.default_rng(seed)
+    lower = np.asarray(lower, dtype = np.float64)
+    upper = np.asarray(upper, dtype = np.float64)
+    num_variables = len(lower)
+
+    unit = np.zeros((num_samples, num_variables))
+    for variable in range(num_variables):
+        unit[:,variable] = (rng.permutation(num_samples) + rng.random(num_samples))/num_samples
+    return lower + unit*(upper - lower)
+
+
+class QuadraticResponseSurface:
+    '''
+    Full quadratic least squares fit y = c + b.z + z.A.z of a scalar output, with the inputs
+    scaled to z in [-1, 1] over the sampled box.
+    '''
+    def __init__(self, lower, upper):
+        self.center = (np.asarray(upper, dtype = np.float64) + np.asarray(lower, dtype = np.float64))/2.0
+        self.scale = (np.asarray(upper, dtype = np.float64) - np.asarray(lower, dtype = np.float64))/2.0
+        self.scale[self.scale == 0.0] = 1.0
+        n = len(self.center)
+        self._upper_indices = np.triu_indices(n)
+
+    def _features(self, z):
+        quadratic = (z[:,:,None]*z[:,None,:])[:, self._upper_indices[0], self._upper_indices[1]]
+        return np.hstack([np.ones((len(z),1)), z, quadratic])
+
+    def fit(self, X, y):
+        z = (np.atleast_2d(X) - self.center)/self.scale
+        coefficients = np.linalg.lstsq(self._features(z), y, rcond = None)[0]
+        n = len(self.center)
+        self.constant = coefficients[0]
+        self.linear = coefficients[1:n + 1]
+        self.quadratic = np.zeros((n, n))
+        self.quadratic[self._upper_indices] = coefficients[n + 1:]
+        self.quadratic = (self.quadratic + self.quadratic.T)/2.0   # symmetric A with z.A.z unchanged
+        return self
+
+    def __call__(self, x):
+        z = (np.asarray(x, dtype = np.float64) - self.center)/self.scale
+        return self.constant + self.linear.dot(z) + z.dot(self.quadratic).dot(z)
+
+    def gradient(self, x):
+        z = (np.asarray(x, dtype = np.float64) - self.center)/self.scale
+        return (self.linear + 2.0*self.quadratic.dot(z))/self.scale
+
+
+class RBFResponseSurface:
+    '''
+    Thin plate spline radial basis function fit of a scalar output (scipy.interpolate.RBFInterpolator),
+    with the inputs scaled to [-1, 1] over the sampled box. Gradients are central differences on the
+    surrogate (no MachUpX calls).
+    '''
+    def __init__(self, lower, upper, smoothing = 1e-10):
+        self.center = (np.asarray(upper, dtype = np.float64) + np.asarray(lower, dtype = np.float64))/2.0
+        self.scale = (np.asarray(upper, dtype = np.float64) - np.asarray(lower, dtype = np.float64))/2.0
+        self.scale[self.scale == 0.0] = 1.0
+        self.smoothing = smoothing
+
+    def fit(self, X, y):
+        z = (np.atleast_2d(X) - self.center)/self.scale
+        self._interpolator = sp.interpolate.RBFInterpolator(z, y, kernel = "thin_plate_spline", smoothing = self.smoothing, degree = 1)
+        return self
+
+    def __call__(self, x):
+        z = (np.asarray(x, dtype = np.float64) - self.center)/self.scale
+        return float(self._interpolator(z[None,:])[0])
+
+    def gradient(self, x, step = 1e-6):
+        x = np.asarray(x, dtype = np.float64)
+        gradient = np.zeros(len(x))
+        for i in range(len(x)):
+            x_plus = x.copy()
+            x_plus[i] += step*self.scale[i]
+            x_minus = x.copy()
+            x_minus[i] -= step*self.scale[i]
+            gradient[i] = (self(x_plus) - self(x_minus))/(2.0*step*self.scale[i])
+        return gradient
+
+
+class DragPolarSurrogate:
+    '''
+    Surrogates of CD, CL, and Cm over a box of the x array, trained from MachUpX evaluations.
+
+    Parameters
+    ----------
+    engine : EvaluationEngine
+        Engine used for the MachUpX evaluations (see Ikhana_evaluation_engine.py).
+    lower : array, [float]
+        Lower bound of the sampled box (flaps, elevator, alpha).
+    upper : array, [float]
+        Upper bound of the sampled box.
+    model : string, optional
+        'quadratic' or 'rbf'. The default is "quadratic".
+    seed : int, optional
+        Random seed for the Latin hypercube samples. The default is 0.
+    evaluator : BatchEvaluator, optional
+        Evaluator for the samples. The default is None (a serial BatchEvaluator on engine).
+    '''
+    def __init__(self, engine, lower, upper, model = "quadratic", seed = 0, evaluator = None):
+        if (model != "quadratic") and (model != "rbf"):
+            raise ValueError("Invalid model entered! Must be either 'quadratic' (default) or 'rbf'.")
+        self.engine = engine
+        self.evaluator = evaluator if evaluator is not None else BatchEvaluator(mode = "serial", engine = engine)
+        self.lower = np.asarray(lower, dtype = np.float64)
+        self.upper = np.asarray(upper, dtype = np.float64)
+        self.model = model
+        self.seed = seed
+        self.X = np.zeros((0, len(self.lower)))
+        self.Y = np.zeros((0, 3))
+        self.solves = 0
+
+    def default_num_samples(self):
+        '''Three times the number of terms in a full quadratic of the x array.'''
+        n = len(self.lower)
+        return 3*(n + 1)*(n + 2)//2
+
+    def sample(self, num_samples, lower = None, upper = None):
+        '''
+        Evaluates a Latin hypercube sample of the box (or of a smaller box given by lower/upper)
+        with MachUpX and adds it to the training data.
+        '''
+        lower = self.lower if lower is None else lower
+        upper = self.upper if upper is None else upper
+        X = latin_hypercube(num_samples, lower, upper, seed = self.seed + len(self.X))
+        Y = self.evaluator.evaluate(X)
+        self.solves += num_samples
+        self.X = np.vstack([self.X, X])
+        self.Y = np.vstack([self.Y, Y])
+        return X, Y
+
+    def fit(self, X = None, Y = None, lower = None, upper = None):
+        '''
+        Fits the CD, CL, and Cm surrogates (to all of the training data unless X, Y are given).
+        '''
+        X = self.X if X is None else X
+        Y = self.Y if Y is None else Y
+        lower = self.lower if lower is None else lower
+        upper = self.upper if upper is None else upper
+        surrogate_type = QuadraticResponseSurface if self.model == "quadratic" else RBFResponseSurface
+        self.CD, self.CL, self.Cm = [surrogate_type(lower, upper).fit(X, Y[:,column]) for column in range(3)]
+        return self
+
+    def optimize(self, CL_to_set, x0, lower, upper):
+        '''
+        Runs SLSQP on the surrogate: minimize CD*100 with CL = CL_to_set and Cm = 0 inside the box.
+
+        Returns
+        -------
+        solution : OptimizeResult object
+        '''
+        constr = [{"type" : "eq", "fun" : lambda x: self.Cm(x), "jac" : lambda x: self.Cm.gradient(x)},
+                  {"type" : "eq", "fun" : lambda x: self.CL(x) - CL_to_set, "jac" : lambda x: self.CL.gradient(x)}]
+        bnds = sp.optimize.Bounds(lower, upper, keep_feasible = True)
+        x0 = np.clip(x0, lower, upper)
+        return sp.optimize.minimize(lambda x: self.CD(x)*100.0, x0, jac = lambda x: self.CD.gradient(x)*100.0, method = "SLSQP", bounds = bnds, constraints = constr)
+
+
+def surrogate_optimize_CL(surrogate, CL_to_set, x0 = None, refine_iterations = 4, refine_fraction = 0.2, refine_samples = None, CL_tolerance = 1e-3, Cm_tolerance = 1e-3, CD_tolerance = 1e-5, print_results = False):
+    '''
+    Optimizes one CL on the surrogate, then verifies the optimum with MachUpX and refines the
+    surrogate near the optimum until the true CL, Cm, and the predicted CD meet the tolerances.
+
+    Parameters
+    ----------
+    surrogate : DragPolarSurrogate
+        A surrogate that has been sampled and fit.
+    CL_to_set : float
+        Desired lift coefficient.
+    x0 : array, [float], optional
+        Initial guess for SLSQP on the surrogate. The default is None (center of the box).
+    refine_iterations : int, optional
+        Maximum number of local refinements. The default is 4.
+    refine_fraction : float, optional
+        Size of the local box as a fraction of the full box. Halved every refinement. The default is 0.2.
+    refine_samples : int, optional
+        MachUpX samples per refinement. The default is None (surrogate.default_num_samples()).
+    CL_tolerance : float, optional
+        Allowed |CL - CL_to_set| from the true MachUpX solve. The default is 1e-3.
+    Cm_tolerance : float, optional
+        Allowed |Cm| from the true MachUpX solve. The default is 1e-3.
+    CD_tolerance : float, optional
+        Allowed difference between the surrogate and true CD. The default is 1e-5.
+    print_results : boolean, optional
+        Whether or not to print each verification. The default is False.
+
+    Returns
+    -------
+    x : array, [float]
+        The optimized x array.
+    true_values : tuple, (float, float, float)
+        (CD, CL, Cm) from MachUpX at x.
+    converged : boolean
+        Whether the tolerances were met.
+    '''
+    if x0 is None:
+        x0 = (surrogate.lower + surrogate.upper)/2.0
+    if refine_samples is None:
+        refine_samples = surrogate.default_num_samples()
+
+    lower, upper = surrogate.lower, surrogate.upper
+    model = surrogate
+    x = np.asarray(x0, dtype = np.float64)
+    fraction = refine_fraction
+    converged = False
+    for refinement in range(refine_iterations + 1):
+        x = model.optimize(CL_to_set, x, lower, upper).x
+
+        # Verify with a true MachUpX solve
+        CD, CL, Cm = surrogate.engine.evaluate(x)
+        surrogate.solves += 1
+        CD_error = abs(model.CD(x) - CD)
+        if print_results:
+            print("CL " + str(CL_to_set) + " surrogate check " + str(refinement) + ": CD " + str(CD) + " (surrogate error " + str(CD_error) + "), CL " + str(CL) + ", Cm " + str(Cm))
+        if (abs(CL - CL_to_set) <= CL_tolerance) and (abs(Cm) <= Cm_tolerance) and (CD_error <= CD_tolerance):
+            converged = True
+            break
+        if refinement == refine_iterations:
+            break
+
+        # Refine: new MachUpX samples in a small box around the optimum, local fit on the samples in that box
+        half_width = fraction*(surrogate.upper - surrogate.lower)/2.0
+        lower = np.maximum(x - half_width, surrogate.lower)
+        upper = np.minimum(x + half_width, surrogate.upper)
+        surrogate.sample(refine_samples, lower, upper)
+        inside = np.all((surrogate.X >= lower) & (surrogate.X <= upper), axis = 1)
+        model = DragPolarSurrogate(surrogate.engine, lower, upper, surrogate.model, surrogate.seed, surrogate.evaluator)
+        model.fit(surrogate.X[inside], surrogate.Y[inside], lower, upper)
+        fraction /= 2.0
+
+    return x, (CD, CL, Cm), converged
+
+
+def surrogate_CL_schedule(scene_filename, aircraft_json, aircraft_name, num_flaps, CL_list, upDeflBound, lowDeflBound, elevator_bounds = (-20.0, 20.0), alpha_bounds = (-5.0, 15.0), num_samples = None, model = "quadratic", dragType = "Total", seed = 0, max_workers = None, print_results = True, **refine_kwargs):
+    '''
+    Optimizes a whole CL schedule with one shared surrogate.
+
+    Parameters
+    ----------
+    scene_filename : string
+        Filename of the aircraft scene json.
+    aircraft_json : string
+        Filename of the aircraft json.
+    aircraft_name : string
+        Name of the aircraft as given for the 'tag' in the aircraft scene json.
+    num_flaps : int
+        Desired number of flaps/control points to be used.
+    CL_list : list, [float]
+        Lift coefficients to optimize.
+    upDeflBound : float
+        Upper bound on the flap deflections.
+    lowDeflBound : float
+        Lower bound on the flap deflections.
+    elevator_bounds : tuple, (float, float), optional
+        Sampled range of the elevator (deg). The default is (-20.0, 20.0).
+    alpha_bounds : tuple, (float, float), optional
+        Sampled range of the angle of attack (deg). The default is (-5.0, 15.0).
+    num_samples : int, optional
+        Number of global MachUpX samples. The default is None (three times the number of quadratic terms).
+    model : string, optional
+        'quadratic' or 'rbf'. The default is "quadratic".
+    dragType : string, optional
+        What type of Drag to use ('Total', 'Inviscid', or 'Viscous'). The default is "Total".
+    seed : int, optional
+        Random seed for the samples. The default is 0.
+    max_workers : int, optional
+        Number of worker processes for the MachUpX samples. The default is None (samples solved in this process).
+    print_results : boolean, optional
+        Whether or not to print progress. The default is True.
+    **refine_kwargs
+        Passed to surrogate_optimize_CL (refine_iterations, tolerances, ...).
+
+    Returns
+    -------
+    results : array, [[float]]
+        (len(CL_list) x 6) array of CL, CD, Cm, alpha, elevator, act_CL (true MachUpX values).
+    solutions : array, [[float]]
+        (len(CL_list) x num_flaps+2) array of the solution x arrays.
+    converged : array, [bool]
+        Whether each CL met the tolerances.
+    surrogate : DragPolarSurrogate
+        The global surrogate (with all of the samples).
+    '''
+    scene_dict, aircraft_dict, scene_state_dict = load_optimization_inputs(scene_filename, aircraft_json, aircraft_name, num_flaps)
+    evaluation_kwargs = engine_kwargs(scene_dict, aircraft_dict, scene_state_dict, aircraft_name, num_flaps, dragType)
+    engine = EvaluationEngine(**evaluation_kwargs)
+    evaluator = BatchEvaluator(evaluation_kwargs, max_workers = max_workers) if max_workers is not None else None
+
+    lower = np.concatenate([np.full(num_flaps, lowDeflBound), [elevator_bounds[0], alpha_bounds[0]]])
+    upper = np.concatenate([np.full(num_flaps, upDeflBound), [elevator_bounds[1], alpha_bounds[1]]])
+    surrogate = DragPolarSurrogate(engine, lower, upper, model, seed, evaluator)
+    if num_samples is None:
+        num_samples = surrogate.default_num_samples()
+
+    if print_results:
+        print("Sampling " + str(num_samples) + " design points with MachUpX...")
+    surrogate.sample(num_samples)
+    surrogate.fit()
+
+    results = np.zeros((len(CL_list), 6))
+    solutions = np.zeros((len(CL_list), num_flaps + 2))
+    converged = np.zeros(len(CL_list), dtype = bool)
+    x0 = None
+    for index, CL in enumerate(CL_list):
+        x, (CD, act_CL, act_Cm), converged[index] = surrogate_optimize_CL(surrogate, CL, x0, print_results = print_results, **refine_kwargs)
+        results[index,:] = [CL, CD, act_Cm, x[num_flaps + 1], x[num_flaps], act_CL]
+        solutions[index,:] = x
+        x0 = x
+
+    if evaluator is not None:
+        evaluator.close()
+
+    if print_results:
+        print("Surrogate schedule finished: " + str(surrogate.solves) + " MachUpX solves for " + str(len(CL_list)) + " CL's, "
+              + str(int(np.sum(converged))) + " within tolerance")
+
+    return results, solutions, converged, surrogate
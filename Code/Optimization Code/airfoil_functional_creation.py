@@ -5,9 +5,9 @@ Created on Mon Apr 25 13:50:03 2022
 
 @author: justice
 """
-from CRM_horizontal_stabilizer_functions import *
-from CRM_main_wing_functions import *
-from Ikhana_main_wing_functions import *
+from Ikhana_main_wing_functions import get_Ikhana_CL, get_Ikhana_CD, get_Ikhana_Cm
+from Ikhana_main_wing_functions_vectorized import get_Ikhana_CL_vectorized, get_Ikhana_CD_vectorized, get_Ikhana_Cm_vectorized
+from Ikhana_airfoil_tables import AirfoilTableDatabase
 
 '''
 This code is used by to get to create a dictionary used by MachUpX that uses functions
@@ -15,15 +15,32 @@ to get CL, CD, and Cm. Passing in functions cannot be set up in the aircraft jso
 so it is necessary to read in the aircraft json (making it a dictionary) and then replace 
 the airfoils section of the dictionary with output of this function, which now has the 
 CL, CD, Cm functions inside of the dictionary.
+
+The CRM airfoil functions (CRM_main_wing_functions.py and CRM_horizontal_stabilizer_functions.py)
+are only imported when create_CRM_airfoils_function_dict is called, so importing this file
+(which every optimization and worker process does) does not need or load them.
 '''
 
-def create_Ikhana_airfoils_function_dict():
+def create_Ikhana_airfoils_function_dict(vectorized = True):
+    '''
+    Parameters
+    ----------
+    vectorized : boolean, optional
+        Whether to use the vectorized (single polynomial) airfoil functions from
+        Ikhana_main_wing_functions_vectorized.py or the original functions. Both give the
+        same values. The default is True.
+    '''
+    if vectorized:
+        CL_function, CD_function, Cm_function = get_Ikhana_CL_vectorized, get_Ikhana_CD_vectorized, get_Ikhana_Cm_vectorized
+    else:
+        CL_function, CD_function, Cm_function = get_Ikhana_CL, get_Ikhana_CD, get_Ikhana_Cm
+    
     return {
         "Ikhana_NACA_0010_main": {
 		    "type" : "functional",
-            "CL" : get_Ikhana_CL,
-            "CD" : get_Ikhana_CD,
-            "Cm" : get_Ikhana_Cm,
+            "CL" : CL_function,
+            "CD" : CD_function,
+            "Cm" : Cm_function,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr0_xfoil.txt"
 			    }
@@ -42,284 +59,315 @@ def create_Ikhana_airfoils_function_dict():
 
 
 def create_CRM_airfoils_function_dict():
+    import CRM_main_wing_functions as wing              # Imported here, only needed for the CRM
+    import CRM_horizontal_stabilizer_functions as tail
+
     return {
 	    "uCRM-9_w0": {
 		    "type": "functional",
-		    "CL" : wr_0_CL,
-            "CD" : wr_0_CD,
-            "Cm" : wr_0_Cm,
+		    "CL" : wing.wr_0_CL,
+            "CD" : wing.wr_0_CD,
+            "Cm" : wing.wr_0_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr0_xfoil.txt"
 			    }
 	    },
 	    "uCRM-9_w10": {
 		    "type": "functional",
-		    "CL" : wr_10_CL,
-            "CD" : wr_10_CD,
-            "Cm" : wr_10_Cm,
+		    "CL" : wing.wr_10_CL,
+            "CD" : wing.wr_10_CD,
+            "Cm" : wing.wr_10_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr10_xfoil.txt"
 		    }
 	    },
 	    "uCRM-9_w15": {
 		    "type": "functional",
-		    "CL" : wr_15_CL,
-            "CD" : wr_15_CD,
-            "Cm" : wr_15_Cm,
+		    "CL" : wing.wr_15_CL,
+            "CD" : wing.wr_15_CD,
+            "Cm" : wing.wr_15_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr15_xfoil.txt"
 		    }
 	    },
 	    "uCRM-9_w20": {
 		    "type": "functional",
-		    "CL" : wr_20_CL,
-            "CD" : wr_20_CD,
-            "Cm" : wr_20_Cm,
+		    "CL" : wing.wr_20_CL,
+            "CD" : wing.wr_20_CD,
+            "Cm" : wing.wr_20_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr20_xfoil.txt"
 		    }
 	    },
 	    "uCRM-9_w25": {
 		    "type": "functional",
-		    "CL" : wr_25_CL,
-            "CD" : wr_25_CD,
-            "Cm" : wr_25_Cm,
+		    "CL" : wing.wr_25_CL,
+            "CD" : wing.wr_25_CD,
+            "Cm" : wing.wr_25_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr25_xfoil.txt"
 		    }
 	    },
 	    "uCRM-9_w30": {
 		    "type": "functional",
-		    "CL" : wr_30_CL,
-            "CD" : wr_30_CD,
-            "Cm" : wr_30_Cm,
+		    "CL" : wing.wr_30_CL,
+            "CD" : wing.wr_30_CD,
+            "Cm" : wing.wr_30_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr30_xfoil.txt"
 		    }
 	    },
 	    "uCRM-9_w35": {
 		    "type": "functional",
-		    "CL" : wr_35_CL,
-            "CD" : wr_35_CD,
-            "Cm" : wr_35_Cm,
+		    "CL" : wing.wr_35_CL,
+            "CD" : wing.wr_35_CD,
+            "Cm" : wing.wr_35_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr35_xfoil.txt"
 		    }
 	    },
 	    "uCRM-9_w37": {
 		    "type": "functional",
-		    "CL" : wr_37_CL,
-            "CD" : wr_37_CD,
-            "Cm" : wr_37_Cm,
+		    "CL" : wing.wr_37_CL,
+            "CD" : wing.wr_37_CD,
+            "Cm" : wing.wr_37_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr37_xfoil.txt"
 		    }
 	    },
 	    "uCRM-9_w40": {
 		    "type": "functional",
-		    "CL" : wr_40_CL,
-            "CD" : wr_40_CD,
-            "Cm" : wr_40_Cm,
+		    "CL" : wing.wr_40_CL,
+            "CD" : wing.wr_40_CD,
+            "Cm" : wing.wr_40_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr40_xfoil.txt"
 		    }
 	    },
 	    "uCRM-9_w45": {
 		    "type": "functional",
-		    "CL" : wr_45_CL,
-            "CD" : wr_45_CD,
-            "Cm" : wr_45_Cm,
+		    "CL" : wing.wr_45_CL,
+            "CD" : wing.wr_45_CD,
+            "Cm" : wing.wr_45_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr45_xfoil.txt"
 		    }
 	    },
 	    "uCRM-9_w50": {
 		    "type": "functional",
-		    "CL" : wr_50_CL,
-            "CD" : wr_50_CD,
-            "Cm" : wr_50_Cm,
+		    "CL" : wing.wr_50_CL,
+            "CD" : wing.wr_50_CD,
+            "Cm" : wing.wr_50_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr50_xfoil.txt"
 		    }
 	    },
 	    "uCRM-9_w55": {
 		    "type": "functional",
-		    "CL" : wr_55_CL,
-            "CD" : wr_55_CD,
-            "Cm" : wr_55_Cm,
+		    "CL" : wing.wr_55_CL,
+            "CD" : wing.wr_55_CD,
+            "Cm" : wing.wr_55_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr55_xfoil.txt"
 		    }
 	    },
 	    "uCRM-9_w60": {
 		    "type": "functional",
-		    "CL" : wr_60_CL,
-            "CD" : wr_60_CD,
-            "Cm" : wr_60_Cm,
+		    "CL" : wing.wr_60_CL,
+            "CD" : wing.wr_60_CD,
+            "Cm" : wing.wr_60_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr60_xfoil.txt"
 		    }
 	    },
 	    "uCRM-9_w65": {
 		    "type": "functional",
-		    "CL" : wr_65_CL,
-            "CD" : wr_65_CD,
-            "Cm" : wr_65_Cm,
+		    "CL" : wing.wr_65_CL,
+            "CD" : wing.wr_65_CD,
+            "Cm" : wing.wr_65_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr65_xfoil.txt"
 		    }
 	    },
 	    "uCRM-9_w70": {
 		    "type": "functional",
-		    "CL" : wr_70_CL,
-            "CD" : wr_70_CD,
-            "Cm" : wr_70_Cm,
+		    "CL" : wing.wr_70_CL,
+            "CD" : wing.wr_70_CD,
+            "Cm" : wing.wr_70_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr70_xfoil.txt"
 		    }
 	    },
 	    "uCRM-9_w75": {
 		    "type": "functional",
-		    "CL" : wr_75_CL,
-            "CD" : wr_75_CD,
-            "Cm" : wr_75_Cm,
+		    "CL" : wing.wr_75_CL,
+            "CD" : wing.wr_75_CD,
+            "Cm" : wing.wr_75_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr75_xfoil.txt"
 		    }
 	    },
 	    "uCRM-9_w80": {
 		    "type": "functional",
-		    "CL" : wr_80_CL,
-            "CD" : wr_80_CD,
-            "Cm" : wr_80_Cm,
+		    "CL" : wing.wr_80_CL,
+            "CD" : wing.wr_80_CD,
+            "Cm" : wing.wr_80_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr80_xfoil.txt"
 		    }
 	    },
 	    "uCRM-9_w85": {
 		    "type": "functional",
-		    "CL" : wr_85_CL,
-            "CD" : wr_85_CD,
-            "Cm" : wr_85_Cm,
+		    "CL" : wing.wr_85_CL,
+            "CD" : wing.wr_85_CD,
+            "Cm" : wing.wr_85_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr85_xfoil.txt"
 		    }
 	    },
 	    "uCRM-9_w90": {
 		    "type": "functional",
-		    "CL" : wr_90_CL,
-            "CD" : wr_90_CD,
-            "Cm" : wr_90_Cm,
+		    "CL" : wing.wr_90_CL,
+            "CD" : wing.wr_90_CD,
+            "Cm" : wing.wr_90_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr90_xfoil.txt"
 		    }
 	    },
 	    "uCRM-9_w95": {
 		    "type": "functional",
-		    "CL" : wr_95_CL,
-            "CD" : wr_95_CD,
-            "Cm" : wr_95_Cm,
+		    "CL" : wing.wr_95_CL,
+            "CD" : wing.wr_95_CD,
+            "Cm" : wing.wr_95_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr95_xfoil.txt"
 		    }
 	    },
 	    "uCRM-9_w100": {
 		    "type": "functional",
-		    "CL" : wr_100_CL,
-            "CD" : wr_100_CD,
-            "Cm" : wr_100_Cm,
+		    "CL" : wing.wr_100_CL,
+            "CD" : wing.wr_100_CD,
+            "Cm" : wing.wr_100_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/uCRM-9_wr100_xfoil.txt"
 		    }
 	    },
         "uCRM-9_h1692": {
 		   "type": "functional",
-		    "CL" : h1692_CL,
-            "CD" : h1692_CD,
-            "Cm" : h1692_Cm,
+		    "CL" : tail.h1692_CL,
+            "CD" : tail.h1692_CD,
+            "Cm" : tail.h1692_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/h1692.txt"
 		    }
 	    },
         "uCRM-9_h20": {
 		    "type": "functional",
-		    "CL" : h20_CL,
-            "CD" : h20_CD,
-            "Cm" : h20_Cm,
+		    "CL" : tail.h20_CL,
+            "CD" : tail.h20_CD,
+            "Cm" : tail.h20_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/h20.txt"
 		    }
 	    },
         "uCRM-9_h30": {
 		    "type": "functional",
-		    "CL" : h30_CL,
-            "CD" : h30_CD,
-            "Cm" : h30_Cm,
+		    "CL" : tail.h30_CL,
+            "CD" : tail.h30_CD,
+            "Cm" : tail.h30_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/h30.txt"
 		    }
 	    },
         "uCRM-9_h40": {
 		    "type": "functional",
-		    "CL" : h40_CL,
-            "CD" : h40_CD,
-            "Cm" : h40_Cm,
+		    "CL" : tail.h40_CL,
+            "CD" : tail.h40_CD,
+            "Cm" : tail.h40_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/h40.txt"
 		    }
 	    },
         "uCRM-9_h50": {
 		    "type": "functional",
-		    "CL" : h50_CL,
-            "CD" : h50_CD,
-            "Cm" : h50_Cm,
+		    "CL" : tail.h50_CL,
+            "CD" : tail.h50_CD,
+            "Cm" : tail.h50_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/h50.txt"
 		    }
 	    },
         "uCRM-9_h60": {
 		    "type": "functional",
-		    "CL" : h60_CL,
-            "CD" : h60_CD,
-            "Cm" : h60_Cm,
+		    "CL" : tail.h60_CL,
+            "CD" : tail.h60_CD,
+            "Cm" : tail.h60_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/h60.txt"
 		    }
 	    },
         "uCRM-9_h70": {
 		    "type": "functional",
-		    "CL" : h70_CL,
-            "CD" : h70_CD,
-            "Cm" : h70_Cm,
+		    "CL" : tail.h70_CL,
+            "CD" : tail.h70_CD,
+            "Cm" : tail.h70_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/h70.txt"
 		    }
 	    },
         "uCRM-9_h80": {
 		    "type": "functional",
-		    "CL" : h80_CL,
-            "CD" : h80_CD,
-            "Cm" : h80_Cm,
+		    "CL" : tail.h80_CL,
+            "CD" : tail.h80_CD,
+            "Cm" : tail.h80_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/h80.txt"
 		    }
 	    },
         "uCRM-9_h90": {
 		    "type": "functional",
-		    "CL" : h90_CL,
-            "CD" : h90_CD,
-            "Cm" : h90_Cm,
+		    "CL" : tail.h90_CL,
+            "CD" : tail.h90_CD,
+            "Cm" : tail.h90_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/h90.txt"
 		    }
 	    },
         "uCRM-9_h100": {
 		    "type": "functional",
-		    "CL" : h100_CL,
-            "CD" : h100_CD,
-            "Cm" : h100_Cm,
+		    "CL" : tail.h100_CL,
+            "CD" : tail.h100_CD,
+            "Cm" : tail.h100_Cm,
 		    "geometry" : {
 			    "outline_points" : "AirfoilDatabase/airfoils/h100.txt"
 		    }
 	    }
-    }
\ No newline at end of file
+    }
+
+
+def create_airfoils_table_dict(airfoil_tables, base_airfoils = None):
+    '''
+    Creates the airfoils dictionary from a table database (see Ikhana_airfoil_tables.py).
+    Every airfoil in the database becomes a functional airfoil with the generic table
+    callbacks instead of its own functions. This is for tabulated airfoil data, not for
+    speed: the table callbacks are slower than create_Ikhana_airfoils_function_dict's
+    vectorized functions (see Ikhana_airfoil_benchmark.py).
+
+    Parameters
+    ----------
+    airfoil_tables : AirfoilTableDatabase or string
+        The database, or its directory (cubic interpolation). The directory must exist and hold at least one table.
+    base_airfoils : dictionary, optional
+        Airfoils dictionary (for example from create_Ikhana_airfoils_function_dict) whose
+        airfoils are replaced by the tables with the same name; the other airfoils are kept
+        and the geometry of a replaced airfoil is kept if the table has none. The default is
+        None (only the airfoils in the database).
+    '''
+    if not isinstance(airfoil_tables, AirfoilTableDatabase):
+        airfoil_tables = AirfoilTableDatabase(airfoil_tables)
+
+    airfoils = dict(base_airfoils) if base_airfoils is not None else {}
+    for name in airfoil_tables.names():
+        base_geometry = airfoils[name].get("geometry") if isinstance(airfoils.get(name), dict) else None
+        airfoils[name] = airfoil_tables.airfoil(name, None if airfoil_tables.geometry(name) is not None else base_geometry)
+    return airfoils
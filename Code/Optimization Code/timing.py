@@ -10,6 +10,10 @@ answered Sep 10 '12 at 2:03 by Nicojo
 Used to display the runtime for each of the run code files. It also gives a method
 for getting the current time with secondsToStr(), which is used to differentiate
 the multiple output files generated during each run.
+
+Importing this file does nothing else (it used to print the start banner and register the
+end banner on import, which every worker process in the pools repeated). The run code
+files call start_program_log() to print the start banner and the runtime at exit.
 """
 
 import atexit
@@ -36,6 +40,12 @@ def endlog():
     elapsed = end-start
     log("End Program", secondsToStr(elapsed))
 
-start = time()
-atexit.register(endlog)
-log("Start Program")
\ No newline at end of file
+start = None
+
+def start_program_log():
+    global start
+    if start is not None:
+        return
+    start = time()
+    atexit.register(endlog)
+    log("Start Program")
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:20:44 2026
+
+@author: justice
+"""
+import sys
+sys.path.insert(0, '/home/justice/Documents/Thesis/Base-Optimization-Code')
+from Ikhana_benchmark_suite import run_benchmarks, save_results, load_results, compare_results
+
+# "record" saves a new baseline, "compare" runs the suite and checks it against the baseline
+mode = "compare"
+baseline_filename = "Ikhana_benchmark_baseline.json"
+new_results_filename = "Ikhana_benchmark_latest.json"
+
+# Benchmark configuration
+cases = None             # None runs every case (Ikhana.json and Ikhana_rectangular.json)
+include_sweeps = True    # The 9 point sweeps take most of the time
+repeats = 1
+time_tolerance = 0.10    # Fraction slower than the baseline that counts as a regression
+
+if __name__ == "__main__":
+    results = run_benchmarks(cases = cases, include_sweeps = include_sweeps, repeats = repeats)
+    save_results(results, new_results_filename)
+
+    if mode == "record":
+        save_results(results, baseline_filename)
+        print("Saved baseline: " + baseline_filename)
+    else:
+        regressions = compare_results(results, load_results(baseline_filename), time_tolerance = time_tolerance)
+        sys.exit(1 if regressions else 0)
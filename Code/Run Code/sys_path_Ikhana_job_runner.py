@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 09:12:27 2026
+
+@author: justice
+"""
+import sys
+sys.path.insert(0, '/home/justice/Documents/Thesis/Base-Optimization-Code')
+from Ikhana_job_runner import run_job_runner, submit_job
+
+# "serve" keeps watching the queue, "submit" puts the example job below in the queue
+mode = "serve"
+queue_directory = "Ikhana_job_queue"
+store_directory = "Ikhana_result_store"
+
+# Runner configuration
+max_workers = None       # None uses every CPU
+socket_port = None       # e.g. 8765 to also accept jobs over a socket
+stop_when_empty = False
+
+# Example job
+scene_filename = "Ikhana_scene_input.json"
+aircraft_json = "Ikhana.json"
+aircraft_name = "Ikhana"
+num_flaps = 2
+CL_range = (0.1, 0.9, 0.1)
+upDeflBound = 25.0
+lowDeflBound = -25.0
+
+if __name__ == "__main__":
+    if mode == "submit":
+        job_id = submit_job(queue_directory, scene_filename, aircraft_json, aircraft_name, num_flaps, CL_range, upDeflBound, lowDeflBound, dragType = "Total")
+        print("Submitted job " + job_id)
+    else:
+        run_job_runner(queue_directory, store_directory, max_workers = max_workers, socket_port = socket_port, stop_when_empty = stop_when_empty)
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 18:40:13 2026
+
+@author: justice
+"""
+import sys
+sys.path.insert(0, '/home/justice/Documents/Thesis/Base-Optimization-Code')
+from Ikhana_multipoint import multipoint_optimize
+
+'''
+One flap schedule for a mission profile: the flap deflections are shared by every CL and
+each CL is pitch trimmed with its own elevator and angle of attack. The weights are the
+fraction of the mission flown at each CL (see Ikhana_multipoint.py).
+'''
+
+scene_filename = "Ikhana_scene_input.json"
+aircraft_json = "Ikhana.json"
+aircraft_name = "Ikhana"
+num_flaps = 2
+upperFlapBound = 25.0
+lowerFlapBound = -25.0
+
+# Mission profile
+CL_targets = [0.3, 0.5, 0.7]
+weights = [0.2, 0.6, 0.2]
+
+# Workers for the point solves and gradients (None uses every CPU)
+max_workers = None
+
+if __name__ == "__main__":
+    results, deflection_array, weighted_CD, solution_array = multipoint_optimize(scene_filename, aircraft_json, aircraft_name, num_flaps, CL_targets, upperFlapBound, lowerFlapBound,
+                                                                                 weights = weights, run_mult_solutions = True, max_workers = max_workers)
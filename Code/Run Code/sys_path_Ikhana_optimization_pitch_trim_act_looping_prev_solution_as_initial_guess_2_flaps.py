@@ -9,8 +9,8 @@ import numpy as np
 import matplotlib.pyplot as plt
 import sys
 sys.path.insert(0, '/home/justice/Documents/Thesis/Base-Optimization-Code')
-from Ikhana_updated_twist_optimization_conditional_functional import pitch_trim_flap_optimize_functional
-from timing import secondsToStr
+from Ikhana_continuation import continuation_CL_sweep, results_to_table, RESULTS_HEADER
+from timing import secondsToStr, start_program_log
 
 '''
 This code uses the MachUpX/SLSQP optimization code to determing the trimmed drag coefficient
@@ -66,6 +66,11 @@ jump to another parabolic function at some intermediate CL (indicating a differe
 By going up then down it helped get all of the CD values on the same parabolic curve
 and in the same solution valley.
 
+The up/down passes are now done by continuation_CL_sweep in Ikhana_continuation.py. It
+predicts each initial guess by extrapolating the previous two solutions instead of just
+re-using the last one, and it skips the down pass for any CL whose down prediction is
+already within tolerance of the up solution.
+
 '''
 
 
@@ -90,153 +95,89 @@ flap_schedule_graph_filename = deflection_title + ".png"
 aoa_graph_title = aoa_title + ".png"
 hs_graph_title = horizontal_stabilizer_title + ".png"
 
-# Initialize an array to store all results, previous solutions, and if the solution changed on the second time through
-results = np.zeros((9,6))
-previous_solution_array = np.zeros((9,num_flaps+2))
-has_changed = np.zeros((9,1)) # 0 indicates no change, 1111 indicates change
-
-#--------------------------------  Going "Up"  --------------------------------
-# Go through from CL 0.1 to 0.9.
-#  For CL 0.1 use initial guess of all 0's. After that, 
-#  use the previous CL's solution as the initial guess.
-for lift_coeff in range(1,10):
-    CL = lift_coeff/10
-    index = lift_coeff - 1
-    print("---------- Running CL: " + str(CL) + " ----------")
-    
-    if lift_coeff == 1:
-        # Run with NO initial deflections (ie: they will be assumed to be zero)
-        dist_filename, CD, act_CL, act_Cm, aoa, elevator, deflections, solution_array = pitch_trim_flap_optimize_functional(scene_filename, aircraft_json, aircraft_name, num_flaps, CL, upperFlapBound, lowerFlapBound, run_mult_solutions=(True))
-        prev_solution = solution_array
-        previous_solution_array[index,:] = solution_array
-    else:
-        # Run with initial deflections set to the previous solution (Start at last solution as initial guess)
-        dist_filename, CD, act_CL, act_Cm, aoa, elevator, deflections, solution_array = pitch_trim_flap_optimize_functional(scene_filename, aircraft_json, aircraft_name, num_flaps, CL, upperFlapBound, lowerFlapBound, run_mult_solutions=(True), initial_defl=(prev_solution))
-        prev_solution = solution_array
-        previous_solution_array[index,:] = solution_array
-    
-    # Store results
-    results[index][0] = CL
-    results[index][1] = CD
-    results[index][2] = act_Cm
-    results[index][3] = aoa
-    results[index][4] = elevator
-    results[index][5] = act_CL
-    
-    # Store deflections for CL 0.1-0.9
-    if (lift_coeff == 1): # Create the all_deflections array
-        rows, cols = np.shape(deflections)
-        all_deflections = np.zeros((rows, 10))
-        all_deflections[:,0:2] = deflections
-    else: # Add to the all_deflections array
-        # Need to go one above the index (ie: lift_coeff)
-        # all_deflectins goes: Span Loc   0.1   0.2   0.3   0.4   0.5   0.6   0.7   0.8   0.9
-        all_deflections[:,lift_coeff] = deflections[:,1]
-  
-# Make and save copies of the original results and deflections
-results_from_going_up = results.copy()
-deflections_going_up = all_deflections.copy()
-orig_prev_solutions_array = previous_solution_array.copy()
-
-results_up_title = title + "__UP"
-deflections_up_title = results_up_title + "__deflections"
-prev_sol_title = results_up_title + "__orig_solutions"
-
-np.savetxt(results_up_title ,results_from_going_up, header='CL   CD   Cm   alpha   elevator   act_CL')
-np.savetxt(deflections_up_title, deflections_going_up, header='Span Loc   0.1   0.2   0.3   0.4   0.5   0.6   0.7   0.8   0.9')
-np.savetxt(prev_sol_title, orig_prev_solutions_array, header='Flaps...  Elevator Alpha')
-
-
-
-#-------------------------------  Going "Down"  -------------------------------
-# Now go from CL 0.9 to CL 0.1 using the "previous" CL's solution as the initial guess.
-#  Work way down, if the solution is better than that from going up, then update the results.
-#  Also, update the hasChanged array so I know which ones were updated.
-for down_num in range(9,1,-1):
-    CL = (down_num - 1)/10.0
-    down_index = down_num - 1
-    CL_index = down_num - 2
-    
-    # Get results from CL above the CL being run (ie: results for CL 0.9 used for running CL 0.8)
-    # Need to use down_index because that is down_num - 1 which will give the prev solution for down_num
-    prev_results = previous_solution_array[down_index,:]
-    dist_filename, CD, act_CL, act_Cm, aoa, elevator, deflections, solution_array = pitch_trim_flap_optimize_functional(scene_filename, aircraft_json, aircraft_name, num_flaps, CL, upperFlapBound, lowerFlapBound, run_mult_solutions=(True), initial_defl=(prev_results))
-    
-    # If CD is lower, replace results & deflections
-    if (CD < results[CL_index][1]):
-        results[CL_index][0] = CL
-        results[CL_index][1] = CD
-        results[CL_index][2] = act_Cm
-        results[CL_index][3] = aoa
-        results[CL_index][4] = elevator
-        results[CL_index][5] = act_CL
-        
-        # Update all_deflections.
-        # Need to go one above the CL_index to get the proper location (ie: down_index)
-        # all_deflectins goes: Span Loc   0.1   0.2   0.3   0.4   0.5   0.6   0.7   0.8   0.9
-        all_deflections[:,down_index] = deflections[:,1]
-        
-        # Update the previous solutions array
-        previous_solution_array[CL_index,:] = solution_array
-        
-        # update the has_changed array to indicate there was a change
-        has_changed[CL_index] = 1111
-
-#------------------------------------------------------------------------------
-#------------------------  Print & Save Results/Plots  ------------------------
-#------------------------------------------------------------------------------
-
-print('CL   CD   Cm   alpha   elevator   act_CL')
-print(results)
-np.savetxt(title, results, header='CL   CD   Cm   alpha   elevator   act_CL')
-np.savetxt(deflection_title, all_deflections, header='Span Loc   0.1   0.2   0.3   0.4   0.5   0.6   0.7   0.8   0.9')
-np.savetxt(solution_array_title, previous_solution_array, header='Flaps...  Elevator Alpha')
-np.savetxt(changed_title, has_changed, header="CL  Status")
-
-# Print out the CL and CD arrays
-print('\n------------------------------------')
-print("\nCL\n")
-print(results[:,0])
-print("\nCD\n")
-print(results[:,1])
-
-# Plot CD v CL
-plt.figure(0)
-plt.plot(results[:,0], results[:,1])
-plt.title(title)
-plt.xlabel("CL")
-plt.ylabel("CD")
-plt.savefig(CL_CD_graph_filename)
-
-# Plot Camber schedule for all CL's (0.1-0.9)
-plt.figure(1)
-plt.plot(all_deflections[:,0], all_deflections[:,1], label = 'CL 0.1')
-plt.plot(all_deflections[:,0], all_deflections[:,2], label = 'CL 0.2')
-plt.plot(all_deflections[:,0], all_deflections[:,3], label = 'CL 0.3')
-plt.plot(all_deflections[:,0], all_deflections[:,4], label = 'CL 0.4')
-plt.plot(all_deflections[:,0], all_deflections[:,5], label = 'CL 0.5')
-plt.plot(all_deflections[:,0], all_deflections[:,6], label = 'CL 0.6')
-plt.plot(all_deflections[:,0], all_deflections[:,7], label = 'CL 0.7')
-plt.plot(all_deflections[:,0], all_deflections[:,8], label = 'CL 0.8')
-plt.plot(all_deflections[:,0], all_deflections[:,9], label = 'CL 0.9')
-plt.title(title)
-plt.xlabel('Span')
-plt.ylabel("Camber")
-plt.legend(loc='right')
-plt.savefig(flap_schedule_graph_filename)
-
-# Plot CL v Alpha 
-plt.figure(2)
-plt.plot(results[:,0], results[:,3])
-plt.title(aoa_title)
-plt.xlabel("CL")
-plt.ylabel("Alpha, deg")
-plt.savefig(aoa_graph_title)
-
-# Plot CL v Horizontal stabilizer deflections
-plt.figure(3)
-plt.plot(results[:,0], results[:,4])
-plt.title(horizontal_stabilizer_title)
-plt.xlabel("CL")
-plt.ylabel("Horizontal Stabilizer, deg")
-plt.savefig(hs_graph_title)
\ No newline at end of file
+# CL's to run (0.1 - 0.9)
+CL_list = [lift_coeff/10 for lift_coeff in range(1,10)]
+
+# Multi-start search at each CL (e.g. 8) instead of the down pass. None keeps the up/down passes.
+num_starts = None
+
+# The sweep state is saved here after every CL. If the run is stopped, running the script again resumes
+#  from the last completed CL (the filename has no time stamp so the next run can find it).
+checkpoint_filename = str(num_flaps) + "_Flaps_" + aircraft_name + "_CL_0.1_0.9__CHECKPOINT.npz"
+
+if __name__ == "__main__":
+    start_program_log()
+    #---------------------------  Going "Up" and "Down"  ---------------------------
+    # Run the continuation (see Ikhana_continuation.py). The up pass predicts each initial guess from the
+    #  previous two solutions, the down pass skips CL's whose prediction is already on top of the up solution.
+    results_struct, previous_solution_array, all_deflections, results_up_struct, orig_prev_solutions_array, deflections_going_up = continuation_CL_sweep(scene_filename, aircraft_json, aircraft_name, num_flaps, CL_list, upperFlapBound, lowerFlapBound, run_mult_solutions=(True), num_starts=num_starts, checkpoint_filename=checkpoint_filename)
+
+    results = results_to_table(results_struct)
+    has_changed = np.where(results_struct["changed"], 1111, 0).reshape(-1,1) # 0 indicates no change, 1111 indicates change
+
+    # Save the results, deflections, and solutions from going up
+    results_up_title = title + "__UP"
+    deflections_up_title = results_up_title + "__deflections"
+    prev_sol_title = results_up_title + "__orig_solutions"
+    np.savetxt(results_up_title, results_to_table(results_up_struct), header=RESULTS_HEADER)
+    np.savetxt(deflections_up_title, deflections_going_up, header='Span Loc   0.1   0.2   0.3   0.4   0.5   0.6   0.7   0.8   0.9')
+    np.savetxt(prev_sol_title, orig_prev_solutions_array, header='Flaps...  Elevator Alpha')
+
+    #------------------------------------------------------------------------------
+    #------------------------  Print & Save Results/Plots  ------------------------
+    #------------------------------------------------------------------------------
+
+    print(RESULTS_HEADER)
+    print(results)
+    np.savetxt(title, results, header=RESULTS_HEADER)
+    np.savetxt(deflection_title, all_deflections, header='Span Loc   0.1   0.2   0.3   0.4   0.5   0.6   0.7   0.8   0.9')
+    np.savetxt(solution_array_title, previous_solution_array, header='Flaps...  Elevator Alpha')
+    np.savetxt(changed_title, has_changed, header="CL  Status")
+
+    # Print out the CL and CD arrays
+    print('\n------------------------------------')
+    print("\nCL\n")
+    print(results[:,0])
+    print("\nCD\n")
+    print(results[:,1])
+
+    # Plot CD v CL
+    plt.figure(0)
+    plt.plot(results[:,0], results[:,1])
+    plt.title(title)
+    plt.xlabel("CL")
+    plt.ylabel("CD")
+    plt.savefig(CL_CD_graph_filename)
+
+    # Plot Camber schedule for all CL's (0.1-0.9)
+    plt.figure(1)
+    plt.plot(all_deflections[:,0], all_deflections[:,1], label = 'CL 0.1')
+    plt.plot(all_deflections[:,0], all_deflections[:,2], label = 'CL 0.2')
+    plt.plot(all_deflections[:,0], all_deflections[:,3], label = 'CL 0.3')
+    plt.plot(all_deflections[:,0], all_deflections[:,4], label = 'CL 0.4')
+    plt.plot(all_deflections[:,0], all_deflections[:,5], label = 'CL 0.5')
+    plt.plot(all_deflections[:,0], all_deflections[:,6], label = 'CL 0.6')
+    plt.plot(all_deflections[:,0], all_deflections[:,7], label = 'CL 0.7')
+    plt.plot(all_deflections[:,0], all_deflections[:,8], label = 'CL 0.8')
+    plt.plot(all_deflections[:,0], all_deflections[:,9], label = 'CL 0.9')
+    plt.title(title)
+    plt.xlabel('Span')
+    plt.ylabel("Camber")
+    plt.legend(loc='right')
+    plt.savefig(flap_schedule_graph_filename)
+
+    # Plot CL v Alpha 
+    plt.figure(2)
+    plt.plot(results[:,0], results[:,3])
+    plt.title(aoa_title)
+    plt.xlabel("CL")
+    plt.ylabel("Alpha, deg")
+    plt.savefig(aoa_graph_title)
+
+    # Plot CL v Horizontal stabilizer deflections
+    plt.figure(3)
+    plt.plot(results[:,0], results[:,4])
+    plt.title(horizontal_stabilizer_title)
+    plt.xlabel("CL")
+    plt.ylabel("Horizontal Stabilizer, deg")
+    plt.savefig(hs_graph_title)
\ No newline at end of file